@@ -0,0 +1,241 @@
+from collections import namedtuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import awards, rollups, summaries, traits
+from .models import Action, ActivityEvaluation
+
+# Map de scoring de base - utilisé si le frontend n'envoie pas de HP calculés
+FALLBACK_SCORING_MAP = {
+    1: {'xp': 50, 'traits': {'Résilience': 30, 'Discipline': 50}},
+    2: {'xp': 40, 'traits': {'Discipline': 40}},
+    3: {'xp': 60, 'traits': {'Discipline': 35, 'Apprentissage': 50}},
+    4: {'xp': 45, 'traits': {'Discipline': 45}},
+    5: {'xp': 35, 'traits': {'Discipline': 35}},
+    6: {'xp': 70, 'traits': {'Discipline': 50, 'Accomplissement': 40}},
+    7: {'xp': 55, 'traits': {'Discipline': 45}},
+    8: {'xp': 30, 'traits': {'Discipline': 30}},
+    9: {'xp': 50, 'traits': {'Discipline': 40, 'Ambition': 30}},
+    10: {'xp': 60, 'traits': {'Discipline': 50}},
+    11: {'xp': 40, 'traits': {'Apprentissage': 40}},
+    12: {'xp': 35, 'traits': {'Discipline': 35}},
+    13: {'xp': 65, 'traits': {'Discipline': 50, 'Ambition': 40}},
+    14: {'xp': 45, 'traits': {'Discipline': 40}},
+    15: {'xp': 50, 'traits': {'Discipline': 50}},
+    16: {'xp': 55, 'traits': {'Discipline': 45, 'Ambition': 35}},
+    17: {'xp': 40, 'traits': {'Résilience': 35}},
+    18: {'xp': 45, 'traits': {'Discipline': 45}},
+    19: {'xp': 70, 'traits': {'Discipline': 60, 'Ambition': 50}},
+    20: {'xp': 50, 'traits': {'Discipline': 50}},
+    21: {'xp': 60, 'traits': {'Discipline': 50, 'Apprentissage': 40}},
+    22: {'xp': 55, 'traits': {'Discipline': 45, 'Ambition': 35}},
+    23: {'xp': 75, 'traits': {'Discipline': 60, 'Accomplissement': 50}},
+}
+
+PLANNING_HP_REWARDS = {
+    'Discipline': 25,
+    'Organisation': 20,
+    'Exécution': 20,
+    'Accomplissement': 15,
+    'Ambition': 10
+}
+
+VALIDATE_DAY_XP = 100
+
+BATCH_MAX_EVENTS = 100
+
+# Résultat d'un événement : réponse JSON, XP / points à créditer, Action à enregistrer
+Applied = namedtuple('Applied', ['result', 'xp', 'points', 'action'])
+
+
+class ActivityError(ValueError):
+    """Événement invalide (message renvoyé tel quel au client)"""
+
+
+def daily_activities(user, data):
+    """✅ Activités quotidiennes (HP calculés par le frontend, sinon FALLBACK_SCORING_MAP)"""
+    activities = data.get('activities', [])
+    if not activities:
+        raise ActivityError('Aucune activité fournie')
+
+    total_xp = 0
+    eval_description = f"Activités quotidiennes: {len(activities)} activités"
+
+    evaluation = ActivityEvaluation.objects.create(
+        user=user,
+        description=eval_description,
+        is_valid=True,
+        ai_feedback="Activités quotidiennes enregistrées"
+    )
+
+    trait_awards = []
+    for activity in activities:
+        activity_id = activity.get('id')
+        activity_name = activity.get('name', f'Activité {activity_id}')
+
+        # ✅ NOUVEAU: Si le frontend envoie les HP calculés (pour sommeil/sieste avec barèmes)
+        if 'hp' in activity and 'traits' in activity:
+            hp_total = activity.get('hp', 0)
+            traits_from_frontend = activity.get('traits', [])
+
+            # Calculer la somme des HP de base des traits
+            base_hp_sum = sum(t.get('hp', 0) for t in traits_from_frontend)
+
+            # Appliquer le ratio aux traits
+            for trait_info in traits_from_frontend:
+                trait_name = trait_info.get('name')
+                base_trait_hp = trait_info.get('hp', 0)
+
+                if trait_name and base_hp_sum > 0:
+                    # Calculer le HP proportionnel basé sur le HP total calculé
+                    # Exemple: Si sommeil devrait donner 200 HP base mais donne 150 HP réel
+                    # Et un trait vaut 120 HP base, il recevra (120/200) * 150 = 90 HP
+                    hp_amount = int((base_trait_hp / base_hp_sum) * hp_total)
+                    trait_awards.append((trait_name, hp_amount, f"{activity_name}: {trait_name}"))
+
+        # ✅ ANCIEN: Fallback pour les activités qui utilisent le scoring map
+        elif activity_id in FALLBACK_SCORING_MAP:
+            scoring = FALLBACK_SCORING_MAP[activity_id]
+            total_xp += scoring['xp']
+
+            for trait_name, hp_amount in scoring['traits'].items():
+                trait_awards.append((trait_name, hp_amount, f"{activity_name}: {trait_name}"))
+
+    # ✅ Tous les traits en une fois (liens + HP utilisateur + total HP du classement)
+    traits_hp_gained = traits.award_traits(user, evaluation, trait_awards)
+
+    result = {
+        'message': 'Activités enregistrées',
+        'total_xp': total_xp,
+        'traits_hp': traits_hp_gained,
+        'evaluation_id': evaluation.id
+    }
+    action = Action(user=user, action_type='quotidien', description=eval_description, points=0)
+    return Applied(result, total_xp, total_xp, action)
+
+
+def time_block(user, data):
+    """✅ Bloc de temps terminé"""
+    title = data.get('title', 'Sans titre')
+    xp_amount = data.get('xp_amount', 30)
+
+    evaluation = ActivityEvaluation.objects.create(
+        user=user,
+        description=f"Bloc de temps: {title}",
+        is_valid=True,
+        xp_awarded=xp_amount,
+        ai_feedback="Bloc de temps enregistré"
+    )
+
+    action = Action(user=user, action_type='time_block', description=f"Bloc: {title}", points=xp_amount)
+    return Applied({'total_xp': xp_amount, 'evaluation_id': evaluation.id}, xp_amount, xp_amount, action)
+
+
+def toggle_time_block(user, data):
+    """✅ Changement d'état d'un bloc de temps (trace seulement)"""
+    status = data.get('status', 'completed')
+    action = Action(user=user, action_type='time_block_toggled', description=f"Bloc de temps: {status}", points=0)
+    return Applied({'status': status}, 0, 0, action)
+
+
+def validate_day(user, data=None):
+    """✅ Journée validée : bonus XP fixe"""
+    action = Action(user=user, action_type='day_validated', description="Journée validée", points=VALIDATE_DAY_XP)
+    return Applied({'total_xp': VALIDATE_DAY_XP}, VALIDATE_DAY_XP, VALIDATE_DAY_XP, action)
+
+
+def validate_planning(user, data=None):
+    """✅ Planning de la journée validé : HP fixes sur 5 traits"""
+    evaluation = ActivityEvaluation.objects.create(
+        user=user,
+        description="Planning validé",
+        is_valid=True,
+        xp_awarded=0,
+        ai_feedback="Planning de la journée validé"
+    )
+
+    traits_hp_gained = traits.award_traits(
+        user, evaluation,
+        [(trait_name, hp_amount, f"Planning validé: {trait_name}") for trait_name, hp_amount in PLANNING_HP_REWARDS.items()]
+    )
+
+    result = {
+        'hp_gained': sum(traits_hp_gained.values()),
+        'traits_hp': traits_hp_gained,
+        'evaluation_id': evaluation.id
+    }
+    action = Action(user=user, action_type='day_validated', description="Planning validé", points=0)
+    return Applied(result, 0, 0, action)
+
+
+EVENT_HANDLERS = {
+    'activity': daily_activities,
+    'time_block': time_block,
+    'toggle': toggle_time_block,
+    'validate_day': validate_day,
+    'planning': validate_planning,
+}
+
+
+def finalize(user, applied):
+    """✅ Crédite l'XP cumulée en une écriture et enregistre les Actions en un bulk_create
+
+    bulk_create ne déclenche pas post_save : compteur XP du jour et streak sont alimentés ici.
+    Retourne le profil à jour.
+    """
+    xp = sum(item.xp for item in applied)
+    profile = awards.award_xp(user, xp, points=sum(item.points for item in applied))
+
+    actions = [item.action for item in applied]
+    if actions:
+        today = timezone.localdate()
+        for action in actions:
+            action.local_date = today
+        Action.objects.bulk_create(actions)
+        # XP créditée au profil (une activité quotidienne a une Action à 0 point mais rapporte de l'XP)
+        rollups.add_daily(user.id, today, xp_gained=xp, action_count=len(actions))
+        summaries.record_active_day(user.id, today)
+    return profile
+
+
+def apply(user, handler, data):
+    """Applique un seul événement (endpoints historiques) et retourne (résultat, profil)"""
+    with transaction.atomic():
+        item = handler(user, data)
+        profile = finalize(user, [item])
+    return item.result, profile
+
+
+def apply_batch(user, events):
+    """✅ Applique une liste ordonnée d'événements hétérogènes dans une seule transaction
+
+    Chaque événement a son propre savepoint : un événement invalide est signalé dans
+    son résultat sans annuler les autres. XP et Actions sont écrits une seule fois à la fin.
+    Retourne (résultats par événement, profil à jour).
+    """
+    results = []
+    applied = []
+
+    with transaction.atomic():
+        for index, event in enumerate(events):
+            event_type = event.get('type') if isinstance(event, dict) else None
+            handler = EVENT_HANDLERS.get(event_type)
+            if handler is None:
+                results.append({'index': index, 'type': event_type, 'success': False,
+                                'error': f"Type d'événement inconnu: {event_type}"})
+                continue
+
+            try:
+                with transaction.atomic():
+                    item = handler(user, event.get('data') or {})
+            except Exception as e:
+                results.append({'index': index, 'type': event_type, 'success': False, 'error': str(e)})
+                continue
+
+            applied.append(item)
+            results.append({'index': index, 'type': event_type, 'success': True, **item.result})
+
+        profile = finalize(user, applied)
+
+    return results, profile
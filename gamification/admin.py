@@ -7,6 +7,7 @@ from .models import (
     UserPersonalityTrait, ActivityEvaluation, EvaluationTraitLink,
     ActivityArtifact, Resource
 )
+from . import leveling
 
 # ============================================================================
 # CONSTANTS & UTILITIES
@@ -64,9 +65,7 @@ DOMAINE_COLORS = {
 
 def get_galaxy_info(level):
     """Retourne la galaxie et le niveau dans la galaxie"""
-    galaxy = ((level - 1) // 100) + 1
-    level_in_galaxy = ((level - 1) % 100) + 1
-    return galaxy, level_in_galaxy
+    return leveling.galaxy(level), leveling.level_in_galaxy(level)
 
 
 def get_badge_html(text, color):
@@ -0,0 +1,338 @@
+import hashlib
+import json
+import os
+import re
+import time
+import traceback
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import cache, caches
+
+from . import llm, prescorer, replay
+
+# À incrémenter à chaque modification du prompt (clé des résultats mis en cache / rejoués)
+PROMPT_VERSION = 1
+
+# Format de réponse attendu pour une activité (partagé par le prompt unitaire et le prompt par lot)
+RESULT_FORMAT = """{{
+"isValid": true,
+"xpAmount": 100,
+"qualityScore": 0.8,
+"feedback": "Analyse courte",
+"personalityTraits": [
+{{"name": "Discipline", "hpAmount": 35, "relevance": "Effort soutenu"}}
+],
+"detections": {{
+"booksRead": 0,
+"academicArticles": 0,
+"projectsWorked": 0,
+"onlineCourses": 0,
+"socialContributions": 0,
+"networkingEvents": 0
+}}
+}}"""
+
+EVALUATION_PROMPT = """Analyse cette activité et retourne UNIQUEMENT du JSON (pas de texte avant/après):
+
+Activité: {description}
+
+Retourne ce JSON valide:
+""" + RESULT_FORMAT
+
+BATCH_PROMPT = """Analyse chacune de ces {count} activités séparément et retourne UNIQUEMENT un tableau JSON
+(pas de texte avant/après) contenant exactement {count} objets, dans le même ordre que les activités.
+
+{activities}
+
+Chaque objet du tableau a ce format, avec "index" égal au numéro de l'activité:
+""" + RESULT_FORMAT.replace('{{\n"isValid"', '{{\n"index": 1,\n"isValid"', 1)
+
+
+class AIError(Exception):
+    """Échec de l'évaluation IA (message renvoyé au client avec `status`)"""
+
+    def __init__(self, message, status=400, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class ParseError(AIError):
+    """Réponse du modèle sans JSON exploitable"""
+
+
+def ai_settings():
+    return getattr(settings, 'AI_SETTINGS', {})
+
+
+def build_prompt(description):
+    return EVALUATION_PROMPT.format(description=description)
+
+
+def complete(prompt):
+    """✅ Envoie le prompt au fournisseur (Perplexity) et retourne le texte de la réponse
+
+    Passe par le client partagé (connexions réutilisées, tentatives, disjoncteur).
+    """
+    api_key = _api_key()
+    started = time.monotonic()
+    try:
+        content = llm.get_client(ai_settings()).chat(prompt, api_key)
+    except llm.ProviderError as e:
+        raise _provider_error(e)
+    _record(prompt, content, time.monotonic() - started)
+    return content
+
+
+def complete_stream(prompt):
+    """✅ Comme complete(), mais générateur des fragments de la réponse au fil de l'eau"""
+    api_key = _api_key()
+    started = time.monotonic()
+    chunks = []
+    try:
+        for chunk in llm.get_client(ai_settings()).stream_chat(prompt, api_key):
+            chunks.append(chunk)
+            yield chunk
+    except llm.ProviderError as e:
+        raise _provider_error(e)
+    _record(prompt, ''.join(chunks), time.monotonic() - started)
+
+
+def _record(prompt, content, latency):
+    """Enregistre l'échange dans la cassette AI_SETTINGS['RECORD_CASSETTE'] (rejeu / benchmark)"""
+    path = ai_settings().get('RECORD_CASSETTE')
+    if path:
+        try:
+            replay.cassette(path).append(prompt, content, latency)
+        except OSError:
+            traceback.print_exc()
+
+
+def _api_key():
+    api_key = os.getenv('PERPLEXITY_API_KEY')
+    if not api_key:
+        raise AIError('PERPLEXITY_API_KEY not configured')
+    return api_key
+
+
+def _provider_error(error):
+    return AIError(str(error), status=error.status, retry_after=getattr(error, 'retry_after', None))
+
+
+def extract_json(content):
+    """Premier objet JSON de la réponse (le modèle ajoute parfois du texte autour)"""
+    json_match = re.search(r'\{.*\}', content, re.DOTALL)
+    if not json_match:
+        raise ParseError('Could not parse AI response')
+    try:
+        return json.loads(json_match.group())
+    except ValueError:
+        raise ParseError('Could not parse AI response')
+
+
+def to_result(evaluation_data):
+    """✅ Convertit la réponse du modèle au format attendu par le frontend"""
+    total_xp = evaluation_data.get('xpAmount', 50) if evaluation_data.get('isValid') else 0
+
+    traits_for_frontend = []
+    traits_hp_dict = {}
+    for trait_data in evaluation_data.get('personalityTraits', []):
+        trait_name = trait_data.get('name')
+        hp_amount = trait_data.get('hpAmount', 0)
+        traits_for_frontend.append({
+            'name': trait_name,
+            'hp_amount': hp_amount,  # Note: hp_amount (pas hpAmount) pour le frontend
+            'relevance': trait_data.get('relevance', '')
+        })
+        traits_hp_dict[trait_name] = hp_amount
+
+    return {
+        'total_xp': total_xp,
+        'traits_hp': traits_hp_dict,  # Pour l'affichage du total HP
+        'personality_traits': traits_for_frontend,  # Pour l'enregistrement ultérieur
+        'detections': evaluation_data.get('detections', {}),
+        'quality_score': evaluation_data.get('qualityScore', 0.5),
+        'feedback': evaluation_data.get('feedback', ''),
+        'is_valid': evaluation_data.get('isValid', True),
+    }
+
+
+# ==================== CACHE DES RÉSULTATS ====================
+
+RESULT_CACHE_ALIAS = 'ai'
+STATS_KEYS = {'hits': 'ai:cache:hits', 'misses': 'ai:cache:misses'}
+
+
+def normalize_description(description):
+    """Forme canonique d'une description : casse, espaces et ponctuation finale ignorés"""
+    text = unicodedata.normalize('NFKC', str(description)).casefold()
+    return ' '.join(text.split()).strip(' .!?…')
+
+
+def result_key(description):
+    """Clé adressée par contenu : description normalisée + version du prompt + modèle"""
+    model = ai_settings().get('MODEL', 'sonar')
+    digest = hashlib.sha256(f'{PROMPT_VERSION}:{model}:{normalize_description(description)}'.encode()).hexdigest()
+    return f'eval:{digest}'
+
+
+def _result_cache():
+    return caches[RESULT_CACHE_ALIAS] if RESULT_CACHE_ALIAS in settings.CACHES else cache
+
+
+def _count(name):
+    key = STATS_KEYS[name]
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def cached_evaluation(description):
+    """Résultat déjà calculé pour cette description (None sinon), compte hits / misses"""
+    result = _result_cache().get(result_key(description))
+    _count('hits' if result is not None else 'misses')
+    return result
+
+
+def cache_stats():
+    """✅ Compteurs du cache des évaluations (partagés entre workers via le cache par défaut)"""
+    hits, misses = (cache.get(key) or 0 for key in STATS_KEYS.values())
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': round(hits / total, 4) if total else 0.0}
+
+
+def prescored_evaluation(description):
+    """Estimation par mots-clés si sa confiance atteint PRESCORE_THRESHOLD (None sinon)"""
+    estimate = prescorer.score(description)
+    if estimate.confidence < ai_settings().get('PRESCORE_THRESHOLD', 0.75):
+        return None
+    return {**estimate.result, 'confidence': estimate.confidence}
+
+
+def quick_evaluation(description):
+    """✅ Résultat obtenu sans appel au fournisseur : pré-score par mots-clés, puis cache"""
+    result = prescored_evaluation(description)
+    if result is not None:
+        return {**result, 'cached': False, 'source': 'keywords'}
+    result = cached_evaluation(description)
+    if result is not None:
+        return {**result, 'cached': True, 'source': 'cache'}
+    return None
+
+
+def evaluate(description, use_cache=True):
+    """✅ Évalue une description d'activité (analyse seule, rien n'est enregistré en base)
+
+    Une description évidente pour le pré-score par mots-clés, ou déjà évaluée (à la casse /
+    aux espaces près), est servie sans appel au fournisseur ; les échecs ne sont jamais
+    mis en cache.
+    """
+    if use_cache:
+        result = quick_evaluation(description)
+        if result is not None:
+            return result
+
+    result = to_result(extract_json(complete(build_prompt(description))))
+    _result_cache().set(result_key(description), result)
+    return {**result, 'cached': False, 'source': 'llm'}
+
+
+def stream_evaluation(description):
+    """✅ Évaluation en flux : générateur d'événements (nom, données)
+
+    ('token', texte) pour chaque fragment de la réponse du modèle, puis un dernier
+    événement ('result', évaluation au format de evaluate()) ou ('error', {error, status}).
+    Un pré-score confiant ou un résultat en cache donne directement 'result'.
+    """
+    try:
+        result = quick_evaluation(description)
+        if result is None:
+            chunks = []
+            for chunk in complete_stream(build_prompt(description)):
+                chunks.append(chunk)
+                yield 'token', chunk
+            result = to_result(extract_json(''.join(chunks)))
+            _result_cache().set(result_key(description), result)
+            result = {**result, 'cached': False, 'source': 'llm'}
+    except AIError as e:
+        yield 'error', {'error': str(e), 'status': e.status, 'retry_after': e.retry_after}
+        return
+    yield 'result', result
+
+
+# ==================== ÉVALUATION PAR LOT ====================
+
+def build_batch_prompt(descriptions):
+    activities = '\n'.join(f'[{index}] {description}' for index, description in enumerate(descriptions, 1))
+    return BATCH_PROMPT.format(count=len(descriptions), activities=activities)
+
+
+def extract_json_list(content, count):
+    """Tableau de `count` évaluations (ordre de l'attribut "index" s'il est complet)"""
+    json_match = re.search(r'\[.*\]', content, re.DOTALL)
+    if not json_match:
+        raise ParseError('Could not parse AI batch response')
+    try:
+        items = json.loads(json_match.group())
+    except ValueError:
+        raise ParseError('Could not parse AI batch response')
+    if not isinstance(items, list) or len(items) != count or not all(isinstance(item, dict) for item in items):
+        raise ParseError('Could not parse AI batch response')
+
+    indexes = [item.get('index') for item in items]
+    if all(isinstance(index, int) for index in indexes) and sorted(indexes) == list(range(1, count + 1)):
+        items = sorted(items, key=lambda item: item['index'])
+    return items
+
+
+def _item(index, description):
+    """Évaluation unitaire d'un élément du lot (erreur rapportée dans l'élément)"""
+    try:
+        return {'index': index, 'success': True, **evaluate(description, use_cache=False)}
+    except AIError as e:
+        return {'index': index, 'success': False, 'error': str(e)}
+
+
+def evaluate_batch(descriptions):
+    """✅ Évalue plusieurs descriptions en un seul appel au fournisseur
+
+    Les descriptions pré-scorées, déjà en cache ou en double ne sont pas renvoyées au modèle.
+    Si la réponse groupée est inexploitable (tableau absent ou de mauvaise taille), chaque
+    description est évaluée séparément ; une erreur du fournisseur sur l'appel groupé est propagée.
+    Retourne une liste alignée sur `descriptions` ('index' = position dans la liste).
+    """
+    results = [None] * len(descriptions)
+    pending = {}
+    for index, description in enumerate(descriptions):
+        quick = quick_evaluation(description)
+        if quick is not None:
+            results[index] = {'index': index, 'success': True, **quick}
+        else:
+            pending.setdefault(result_key(description), (description, []))[1].append(index)
+
+    groups = list(pending.values())
+    if len(groups) == 1:
+        description, indexes = groups[0]
+        item = _item(indexes[0], description)
+        for index in indexes:
+            results[index] = {**item, 'index': index}
+    elif groups:
+        try:
+            items = extract_json_list(complete(build_batch_prompt([d for d, _ in groups])), len(groups))
+        except ParseError as e:
+            print(f"⚠️  Réponse groupée inexploitable ({e}) : évaluation une par une")
+            evaluated = [_item(indexes[0], description) for description, indexes in groups]
+        else:
+            evaluated = []
+            for (description, _), item in zip(groups, items):
+                result = to_result(item)
+                _result_cache().set(result_key(description), result)
+                evaluated.append({'success': True, **result, 'cached': False, 'source': 'llm'})
+        for (_, indexes), item in zip(groups, evaluated):
+            for index in indexes:
+                results[index] = {**item, 'index': index}
+
+    return results
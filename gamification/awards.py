@@ -0,0 +1,31 @@
+from django.db import transaction
+
+from . import leveling
+from .models import UserProfile
+
+# Colonnes nécessaires au calcul et à la synchro du classement (pas les images ni les JSON)
+PROFILE_FIELDS = ('id', 'user_id', 'level', 'experience_points', 'total_points', 'badges_count')
+
+
+def award_xp(user, xp, points=0):
+    """✅ Ajoute XP / points à un profil sans perte de mise à jour concurrente
+
+    La ligne est verrouillée (select_for_update) le temps de recalculer le niveau, puis
+    seules les colonnes modifiées sont écrites. post_save répercute le résultat dans le
+    classement. Retourne le profil à jour (colonnes de PROFILE_FIELDS chargées).
+    """
+    with transaction.atomic():
+        try:
+            profile = UserProfile.objects.select_for_update().only(*PROFILE_FIELDS).get(user=user)
+        except UserProfile.DoesNotExist:
+            UserProfile.objects.get_or_create(user=user)
+            profile = UserProfile.objects.select_for_update().only(*PROFILE_FIELDS).get(user=user)
+
+        if not xp and not points:
+            return profile
+
+        profile.experience_points += xp
+        profile.total_points += points
+        profile.level = leveling.level_for_xp(profile.experience_points)
+        profile.save(update_fields=['experience_points', 'total_points', 'level', 'updated_at'])
+    return profile
@@ -0,0 +1,105 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Nombre d'activités d'un prompt par lot (ai.BATCH_PROMPT)
+BATCH_COUNT = re.compile(r'Analyse chacune de ces (\d+) activités')
+TOKEN = re.compile(r'\S+\s*|\s+')
+
+
+def default_reply(prompt):
+    """Réponse plausible du modèle : une évaluation, ou un tableau pour un prompt par lot"""
+    evaluation = {
+        'isValid': True,
+        'xpAmount': 60,
+        'qualityScore': 0.7,
+        'feedback': 'Évaluation du fournisseur local',
+        'personalityTraits': [{'name': 'Discipline', 'hpAmount': 20, 'relevance': 'Régularité'}],
+        'detections': {'booksRead': 0, 'academicArticles': 0, 'projectsWorked': 0,
+                       'onlineCourses': 0, 'socialContributions': 0, 'networkingEvents': 0},
+    }
+    batch = BATCH_COUNT.search(prompt)
+    if batch:
+        return json.dumps([{'index': index, **evaluation} for index in range(1, int(batch.group(1)) + 1)])
+    return 'Voici l\'analyse : ' + json.dumps(evaluation, ensure_ascii=False)
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    """API chat/completions compatible OpenAI (réponse complète ou flux SSE si "stream")"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        prompt = payload.get('messages', [{}])[-1].get('content', '')
+        status, content = self.server.respond(prompt)
+
+        if status != 200:
+            self._send_json(status, {'error': {'message': content or 'Erreur simulée'}})
+        elif payload.get('stream'):
+            self._stream(content)
+        else:
+            self._send_json(200, {'choices': [{'message': {'role': 'assistant', 'content': content}}]})
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, content):
+        # Pas de Content-Length : la fin du flux est signalée par la fermeture de la connexion
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        try:
+            for token in TOKEN.findall(content):
+                time.sleep(self.server.token_delay)
+                chunk = {'choices': [{'index': 0, 'delta': {'content': token}}]}
+                self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode())
+                self.wfile.flush()
+            self.wfile.write(b'data: [DONE]\n\n')
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Flux abandonné par le client
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeProvider(ThreadingHTTPServer):
+    """✅ Fournisseur LLM local pour le développement et les tests hors ligne
+
+    `reply` : texte de réponse, ou fonction prompt -> texte ; `token_delay` : pause (s)
+    entre deux fragments du flux, pour simuler la génération du modèle.
+    """
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), reply=default_reply, token_delay=0.0):
+        super().__init__(address, FakeProviderHandler)
+        self.reply = reply
+        self.token_delay = token_delay
+
+    def respond(self, prompt):
+        """(statut HTTP, texte) de la réponse au prompt"""
+        return 200, self.reply(prompt) if callable(self.reply) else self.reply
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/chat/completions'
+
+    def start(self):
+        """Sert les requêtes dans un thread de fond ; retourne le serveur"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
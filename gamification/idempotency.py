@@ -0,0 +1,74 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+HEADER = 'Idempotency-Key'
+IN_FLIGHT = 'in-flight'
+
+# Durée maximale de traitement d'une requête avant qu'une nouvelle tentative soit acceptée
+LOCK_TIMEOUT = 60
+
+
+def _cache_key(request, name, key):
+    digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+    return f'idem:{request.user.id}:{name}:{digest}'
+
+
+def idempotent(view_func):
+    """✅ Rejoue la réponse d'une requête POST déjà traitée avec le même Idempotency-Key
+
+    - première requête : la clé est réservée (cache.add), la vue s'exécute, la réponse
+      2xx est conservée IDEMPOTENCY_TTL secondes (sinon la clé est libérée pour réessayer)
+    - même clé, même corps : réponse stockée rejouée sans toucher à la base
+    - même clé pendant le traitement : 409 ; même clé avec un autre corps : 422
+    Sans en-tête, la vue s'exécute normalement.
+    """
+    name = view_func.__name__
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or not request.user.is_authenticated:
+            return view_func(request, *args, **kwargs)
+        if len(key) > 255:
+            return JsonResponse({'success': False, 'error': f'{HEADER} trop long (max 255)'}, status=400)
+
+        cache_key = _cache_key(request, name, key)
+        fingerprint = hashlib.sha256(request.body).hexdigest()
+
+        stored = cache.get(cache_key)
+        if stored is None and cache.add(cache_key, IN_FLIGHT, timeout=LOCK_TIMEOUT):
+            try:
+                response = view_func(request, *args, **kwargs)
+            except Exception:
+                cache.delete(cache_key)
+                raise
+
+            if 200 <= response.status_code < 300:
+                cache.set(
+                    cache_key,
+                    (fingerprint, response.status_code, response.content, response.get('Content-Type')),
+                    timeout=getattr(settings, 'IDEMPOTENCY_TTL', 24 * 3600),
+                )
+            else:
+                cache.delete(cache_key)
+            return response
+
+        if stored is None or stored == IN_FLIGHT:
+            return JsonResponse({'success': False, 'error': 'Requête déjà en cours de traitement'}, status=409)
+
+        stored_fingerprint, status, content, content_type = stored
+        if stored_fingerprint != fingerprint:
+            return JsonResponse({
+                'success': False,
+                'error': f'{HEADER} déjà utilisé avec un autre contenu'
+            }, status=422)
+
+        response = HttpResponse(content, status=status, content_type=content_type)
+        response['Idempotent-Replayed'] = 'true'
+        return response
+
+    return wrapper
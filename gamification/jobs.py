@@ -0,0 +1,100 @@
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+
+from . import ai
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+_executor = None
+
+
+def _key(job_id):
+    return f'ai:job:{job_id}'
+
+
+def _save(job):
+    cache.set(_key(job['id']), job, timeout=ai.ai_settings().get('JOB_TTL', 3600))
+
+
+def get(job_id):
+    """État d'un job (None s'il est inconnu ou expiré)"""
+    return cache.get(_key(job_id))
+
+
+def _thread_pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=ai.ai_settings().get('JOB_THREADS', 4), thread_name_prefix='ai-job'
+        )
+    return _executor
+
+
+def submit(user_id, description):
+    """✅ Enregistre un job d'évaluation et le confie au backend configuré
+
+    `description` : texte d'une activité, ou liste de textes (évaluation par lot, résultat
+    {'results': [...]}). Retourne immédiatement le job (statut 'pending') : l'appel au
+    fournisseur IA se fait hors du worker web ('celery' ou 'thread'), ou tout de suite en
+    mode 'eager' (défaut sans cache partagé : l'état du job doit être lisible par tous
+    les workers). Une description pré-scorée ou déjà évaluée donne un job terminé sans
+    passer par le backend.
+    """
+    job = {
+        'id': uuid.uuid4().hex,
+        'user_id': user_id,
+        'status': PENDING,
+        'result': None,
+        'error': None,
+        'created_at': time.time(),
+        'finished_at': None,
+    }
+
+    quick = ai.quick_evaluation(description) if isinstance(description, str) else None
+    if quick is not None:
+        job.update(status=DONE, result=quick, finished_at=job['created_at'])
+    _save(job)
+    if job['status'] == DONE:
+        return job
+
+    backend = ai.ai_settings().get('JOB_BACKEND', 'eager')
+    if backend == 'celery':
+        from .tasks import evaluate_activity
+        evaluate_activity.delay(job['id'], description)
+    elif backend == 'thread':
+        _thread_pool().submit(run, job['id'], description)
+    else:
+        run(job['id'], description)
+        return get(job['id'])
+    return job
+
+
+def run(job_id, description):
+    """Exécute un job : évaluation IA puis résultat (ou erreur) dans le cache"""
+    job = get(job_id)
+    if job is None:
+        return
+    job['status'] = RUNNING
+    _save(job)
+
+    try:
+        if isinstance(description, list):
+            job['result'] = {'results': ai.evaluate_batch(description)}
+        else:
+            job['result'] = ai.evaluate(description, use_cache=False)
+        job['status'] = DONE
+    except ai.AIError as e:
+        job['status'], job['error'], job['error_status'] = FAILED, str(e), e.status
+        job['retry_after'] = e.retry_after
+    except Exception as e:
+        traceback.print_exc()
+        job['status'], job['error'], job['error_status'] = FAILED, str(e), 400
+    job['finished_at'] = time.time()
+    _save(job)
@@ -0,0 +1,181 @@
+# Tables de détection par mots-clés (anciennement dans templates/challenges.html)
+
+# Traits détectables : clé -> (nom, catégorie, HP de base, XP de base)
+TRAITS = {
+    # cognitive
+    'analyticThinking': ('Pense Analytique', 'cognitive', 50, 40),
+    'logicalThinking': ('Pense Logique', 'cognitive', 60, 35),
+    'criticalThinking': ('Pense Critique', 'cognitive', 80, 50),
+    'strategicThinking': ('Pense Stratégique', 'cognitive', 150, 75),
+    'systemicThinking': ('Pense Systémique', 'cognitive', 150, 70),
+    'abstractThinking': ('Pense Abstraite', 'cognitive', 80, 45),
+    'intuitiveThinking': ('Pense Intuitive', 'cognitive', 80, 40),
+    'intellectualCreativity': ('Créativité Intellectuelle', 'cognitive', 100, 80),
+    'intellectualCuriosity': ('Curiosité Intellectuelle', 'cognitive', 20, 30),
+    'longTermVision': ('Vision Long Terme', 'cognitive', 100, 60),
+    'mentalFlexibility': ('Flexibilité Mentale', 'cognitive', 80, 50),
+    'cognitiveRigidity': ('Rigidité Cognitive', 'cognitive', -150, -30),
+    'learningCapacity': ("Capacité d'Apprentissage", 'cognitive', 100, 60),
+    'lucidity': ('Lucidité', 'cognitive', 80, 45),
+    'syntheticMind': ('Esprit de Synthèse', 'cognitive', 100, 55),
+    # emotional
+    'emotionalStability': ('Stabilité Émotionnelle', 'emotional', 80, 40),
+    'emotionalInstability': ('Instabilité Émotionnelle', 'emotional', -100, -20),
+    'resilience': ('Résilience', 'emotional', 200, 100),
+    'composure': ('Sang-Froid', 'emotional', 150, 80),
+    'emotionalSensitivity': ('Sensibilité Émotionnelle', 'emotional', 50, 30),
+    'emotionalImpulsivity': ('Impulsivité Émotionnelle', 'emotional', -80, -15),
+    'selfMastery': ('Maîtrise de Soi', 'emotional', 80, 50),
+    'stressTolerance': ('Tolérance au Stress', 'emotional', 80, 50),
+    'emotionalVulnerability': ('Vulnérabilité Émotionnelle', 'emotional', 100, 45),
+    'stoicism': ('Stoïcisme', 'emotional', 80, 40),
+    'emotionalDetachment': ('Détachement Émotionnel', 'emotional', 80, 35),
+    'anxiety': ('Anxiété', 'emotional', -80, -15),
+    'irritability': ('Irritabilité', 'emotional', -100, -20),
+    # behavioral
+    'discipline': ('Discipline', 'behavioral', 30, 35),
+    'selfControl': ('Autocontrôle', 'behavioral', 40, 30),
+    'perseverance': ('Persévérance', 'behavioral', 100, 70),
+    'rigor': ('Rigueur', 'behavioral', 60, 45),
+    'organization': ('Organisation', 'behavioral', 100, 55),
+    'reliability': ('Fiabilité', 'behavioral', 80, 50),
+    'senseOfDuty': ('Sens du Devoir', 'behavioral', 80, 45),
+    'accountability': ('Responsabilité', 'behavioral', 100, 60),
+    'prudence': ('Prudence', 'behavioral', 50, 35),
+    'timeManagement': ('Gestion du Temps', 'behavioral', 80, 45),
+    'executionCapacity': ("Capacité d'Exécution", 'behavioral', 100, 75),
+    # social
+    'sociability': ('Sociabilité', 'social', 50, 40),
+    'assertiveness': ('Assertivité', 'social', 80, 50),
+    'charisma': ('Charisme', 'social', 100, 70),
+    'influence': ('Influence', 'social', 100, 80),
+    'diplomacy': ('Diplomatique', 'social', 100, 60),
+    'cooperation': ('Coopération', 'social', 80, 50),
+    'relationalEmpathy': ('Empathie Relationnelle', 'social', 80, 50),
+    'competitiveness': ('Compétitivité', 'social', 80, 60),
+    'individualism': ('Individualisme', 'social', 100, 55),
+    'socialDominance': ('Dominance Sociale', 'social', 80, 60),
+    'inverseSocialDominance': ('Dominance Inverse', 'social', 100, 50),
+    'socialAlienation': ('Aliénation Sociale', 'social', -100, -25),
+    'excessiveSubmission': ('Soumission Excessive', 'social', -80, -20),
+    'socialPassivity': ('Passivité Sociale', 'social', -60, -15),
+    'socialTrust': ('Confiance Sociale', 'social', 100, 60),
+    # moral
+    'intellectualIntegrity': ('Intégrité Intellectuelle', 'moral', 26, 40),
+    'loyalty': ('Loyauté', 'moral', 100, 60),
+    'honor': ('Honneur', 'moral', 150, 80),
+    # learning
+    'learning': ('Apprentissage', 'learning', 20, 40),
+    'learningAbility': ("Capacité d'Apprentissage", 'learning', 100, 80),
+    'recognizedExpertise': ('Expertise Reconnue', 'learning', 200, 150),
+    'versatility': ('Polyvalence', 'learning', 300, 120),
+    # achievement
+    'accomplishment': ('Accomplissement', 'achievement', 40, 60),
+    'determination': ('Détermination', 'achievement', 30, 50),
+    'ambition': ('Ambition', 'achievement', 50, 70),
+    'innovation': ('Innovation', 'achievement', 100, 120),
+    # existential
+    'strongIndividuality': ('Individualité Forte', 'existential', 120, 70),
+    'selfAwareness': ('Conscience de Soi', 'existential', 80, 60),
+    'personalGrowth': ('Croissance Personnelle', 'existential', 100, 80),
+    'senseOfPurpose': ('Sens & Purpose', 'existential', 150, 100),
+    # leadership
+    'naturalLeadership': ('Leadership Naturel', 'leadership', 100, 90),
+    'strategicVision': ('Vision Stratégique', 'leadership', 150, 100),
+    'mentoring': ('Mentorat', 'leadership', 100, 100),
+    'organizationalCreativity': ('Créativité Organisationnelle', 'leadership', 150, 110),
+    # affective
+    'emotionalEmpathy': ('Empathie Émotionnelle', 'affective', 80, 50),
+    'compassion': ('Compassion', 'affective', 100, 70),
+    'pride': ('Fierté', 'affective', 80, 50),
+}
+
+# Artéfacts : clé de détection -> mots-clés (un nombre juste avant compte pour autant)
+ARTEFACT_KEYWORDS = {
+    'booksRead': ['livre', 'bouquin', 'lu', 'reading', 'book'],
+    'academicArticles': ['article', 'academic', 'journal', 'paper', 'recherche', 'étude'],
+    'projectsWorked': ['projet', 'project', 'github', 'code', 'développé', 'créé'],
+    'onlineCourses': ['cours', 'course', 'formation', 'training', 'udemy', 'coursera', 'mooc'],
+    'socialContributions': ['contribution', 'social', 'community', 'bénévolat', 'aide', 'support'],
+    'networkingEvents': ['networking', 'événement', 'conférence', 'meetup', 'forum'],
+}
+
+# Traits : clé de TRAITS -> mots-clés
+TRAIT_KEYWORDS = {
+    'analyticThinking': ['analyse', 'données', 'pattern', 'dashboard', 'pivot', 'segmenter'],
+    'logicalThinking': ['logique', 'argument', 'raisonnement', 'coherent'],
+    'criticalThinking': ['question', 'critique', 'challenge', 'contredire'],
+    'strategicThinking': ['stratégie', 'plan', 'roadmap', 'objectif'],
+    'systemicThinking': ['système', 'architecture', 'interconnexion'],
+    'abstractThinking': ['concept', 'théorie', 'abstrait', 'framework'],
+    'intuitiveThinking': ['intuition', 'instinct', 'insight'],
+    'intellectualCreativity': ['créative', 'innovation', 'idée originale'],
+    'intellectualCuriosity': ['livre', 'article', 'exploration'],
+    'longTermVision': ['5 ans', '10 ans', 'legacy'],
+    'mentalFlexibility': ['pivot', 'adapter', 'changement'],
+    'cognitiveRigidity': ['refuser', 'blocage', 'résistance'],
+    'learningCapacity': ['certification', 'skill', 'maîtrise'],
+    'lucidity': ['auto-évaluation', '360', 'feedback'],
+    'syntheticMind': ['résumé', 'synthèse', 'documentation'],
+    'emotionalStability': ['calme', 'serein', 'composé'],
+    'emotionalInstability': ['fluctuation', 'instable'],
+    'resilience': ['rebond', 'surmont', 'adversité'],
+    'composure': ['pression', 'crise', 'sang-froid'],
+    'emotionalSensitivity': ['empathie', 'émotion'],
+    'emotionalImpulsivity': ['impulsif', 'regretté'],
+    'selfMastery': ['contrôle', 'discipline'],
+    'stressTolerance': ['stress', 'deadline'],
+    'emotionalVulnerability': ['vulnérable', 'fragilité'],
+    'stoicism': ['stoïque', 'acceptation'],
+    'emotionalDetachment': ['détachement', 'objectif'],
+    'anxiety': ['anxiété', 'peur'],
+    'irritability': ['colère', 'irritable'],
+    'discipline': ['routine', 'objectif'],
+    'selfControl': ['contrôle', 'impulse'],
+    'perseverance': ['obstacle', 'persistent'],
+    'rigor': ['détail', 'standard', 'qualité'],
+    'organization': ['système', 'structure'],
+    'reliability': ['promesse', 'deadline', 'fiable'],
+    'senseOfDuty': ['devoir', 'responsabilité'],
+    'accountability': ['erreur', 'correction'],
+    'prudence': ['risque', 'prévention'],
+    'timeManagement': ['temps', 'calendrier'],
+    'executionCapacity': ['projet livré', 'exécution'],
+    'sociability': ['social', 'interaction', 'networking'],
+    'assertiveness': ['limite', 'frontalement'],
+    'charisma': ['captive', 'inspirant'],
+    'influence': ['convaincu', 'rallie'],
+    'diplomacy': ['conflit', 'tactful'],
+    'cooperation': ['collaboratif', 'synergy'],
+    'relationalEmpathy': ['soutien', 'émotion'],
+    'competitiveness': ['compétition', 'gagner'],
+    'individualism': ['unconventional', 'unique'],
+    'socialDominance': ['leadership', 'autorité'],
+    'inverseSocialDominance': ['modestie', 'humble'],
+    'socialAlienation': ['isolement'],
+    'excessiveSubmission': ['soumis', 'passif'],
+    'socialPassivity': ['retrait'],
+    'socialTrust': ['confiance', 'loyauté'],
+    'intellectualIntegrity': ['transparence', 'intégrité'],
+    'loyalty': ['loyal', 'défendre'],
+    'honor': ['honneur', 'dignité'],
+    'learning': ['livre lu', 'article'],
+    'learningAbility': ['certification', 'compétence'],
+    'recognizedExpertise': ['expert', 'spécialiste'],
+    'versatility': ['multidisciplinaire', 'polyvalent'],
+    'accomplishment': ['accomplissement', 'réussite'],
+    'determination': ['challenge', 'impossible'],
+    'ambition': ['objectif majeur'],
+    'innovation': ['première', 'produit lancé'],
+    'strongIndividuality': ['unique', 'personnel'],
+    'selfAwareness': ['introspection', 'shadow'],
+    'personalGrowth': ['transformation', 'croissance'],
+    'senseOfPurpose': ['mission', 'legacy'],
+    'naturalLeadership': ['leadership', 'équipe suit'],
+    'strategicVision': ['vision', 'plan ambitieux'],
+    'mentoring': ['mentor', 'développé'],
+    'organizationalCreativity': ['culture', 'processus innovant'],
+    'emotionalEmpathy': ['émotion validée', 'support'],
+    'compassion': ['aide', 'souffrance'],
+    'pride': ['fierté', 'accompli'],
+}
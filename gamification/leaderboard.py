@@ -0,0 +1,188 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from . import leveling
+from .models import LeaderboardEntry, LevelHistogram, UserProfile, UserPersonalityTrait, UserDailyStats
+
+
+def _profile_fields(profile):
+    return {
+        'profile': profile,
+        'level': profile.level,
+        'experience_points': profile.experience_points,
+        'total_points': profile.total_points,
+        'badges_count': profile.badges_count,
+    }
+
+
+def _total_hp(user_id):
+    return UserPersonalityTrait.objects.filter(user_id=user_id).aggregate(total=Sum('hp'))['total'] or 0
+
+
+def _shift_level(level, delta):
+    """Ajoute delta joueurs à la case `level` de l'histogramme (UPDATE, sinon INSERT)"""
+    if LevelHistogram.objects.filter(level=level).update(users=F('users') + delta):
+        return
+    try:
+        with transaction.atomic():
+            LevelHistogram.objects.create(level=level, users=delta)
+    except IntegrityError:
+        LevelHistogram.objects.filter(level=level).update(users=F('users') + delta)
+
+
+def sync_profile(profile):
+    """✅ Copie XP / niveau / points du profil dans son entrée de classement
+
+    L'histogramme des niveaux n'est touché que si le niveau change.
+    """
+    fields = _profile_fields(profile)
+    with transaction.atomic():
+        old_level = (
+            LeaderboardEntry.objects.select_for_update()
+            .filter(user_id=profile.user_id)
+            .values_list('level', flat=True)
+            .first()
+        )
+        if old_level is None:
+            LeaderboardEntry.objects.create(user_id=profile.user_id, total_hp=_total_hp(profile.user_id), **fields)
+            _shift_level(profile.level, 1)
+            return
+
+        LeaderboardEntry.objects.filter(user_id=profile.user_id).update(**fields)
+        if old_level != profile.level:
+            _shift_level(old_level, -1)
+            _shift_level(profile.level, 1)
+
+
+def remove_entry(entry):
+    """Retire une entrée supprimée de l'histogramme des niveaux"""
+    LevelHistogram.objects.filter(level=entry.level).update(users=F('users') - 1)
+
+
+def add_hp(user, hp_delta):
+    """✅ Incrémente atomiquement le total HP d'un utilisateur dans le classement"""
+    if not hp_delta:
+        return
+    updated = LeaderboardEntry.objects.filter(user=user).update(total_hp=F('total_hp') + hp_delta)
+    if not updated:
+        rebuild_entry(user)
+
+
+def rebuild_entry(user):
+    """Recalcule entièrement l'entrée d'un utilisateur depuis le profil et ses traits"""
+    profile, _ = UserProfile.objects.get_or_create(user=user)
+    sync_profile(profile)
+    LeaderboardEntry.objects.filter(user=user).update(total_hp=_total_hp(user.id))
+
+
+def rebuild_histogram():
+    """Recalcule l'histogramme des niveaux depuis les entrées du classement"""
+    counts = LeaderboardEntry.objects.values('level').annotate(users=Count('id')).order_by()
+    with transaction.atomic():
+        LevelHistogram.objects.all().delete()
+        LevelHistogram.objects.bulk_create([LevelHistogram(level=row['level'], users=row['users']) for row in counts])
+
+
+def rebuild():
+    """Reconstruit tout le classement et l'histogramme des niveaux"""
+    hp_by_user = dict(
+        UserPersonalityTrait.objects.values('user_id')
+        .annotate(total=Sum('hp'))
+        .values_list('user_id', 'total')
+    )
+
+    entries = [
+        LeaderboardEntry(user_id=profile.user_id, total_hp=hp_by_user.get(profile.user_id) or 0,
+                         **_profile_fields(profile))
+        for profile in UserProfile.objects.all()
+    ]
+
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        LeaderboardEntry.objects.bulk_create(entries, batch_size=1000)
+        rebuild_histogram()
+    return len(entries)
+
+
+def top_entries(limit=50):
+    """✅ Top N du classement : une seule lecture indexée sur -experience_points"""
+    return LeaderboardEntry.objects.select_related('user', 'profile').order_by('-experience_points')[:limit]
+
+
+def window_ranking(days, limit=50):
+    """✅ Classement sur les N derniers jours (aujourd'hui inclus) depuis les compteurs journaliers
+
+    Retourne une liste de (entrée, points) triée par points décroissants : une agrégation
+    groupée sur l'index (day, user) + une lecture des entrées concernées. Les joueurs sans
+    activité sur la période complètent la liste avec 0 point, comme auparavant.
+    """
+    start = timezone.localdate() - timedelta(days=days - 1)
+    totals = list(
+        UserDailyStats.objects.filter(day__gte=start)
+        .values('user_id')
+        .annotate(points=Sum('xp_gained'))
+        .order_by('-points', 'user_id')
+        .values_list('user_id', 'points')[:limit]
+    )
+
+    entries = LeaderboardEntry.objects.select_related('user', 'profile')
+    by_user = entries.in_bulk([user_id for user_id, _ in totals], field_name='user_id')
+    ranking = [(by_user[user_id], points or 0) for user_id, points in totals if user_id in by_user]
+
+    if len(ranking) < limit:
+        ranking += [
+            (entry, 0)
+            for entry in entries.exclude(user_id__in=by_user.keys()).order_by('-experience_points')[:limit - len(ranking)]
+        ]
+    return ranking
+
+
+def user_rank(user, approximate=None):
+    """✅ Rang, nombre de joueurs et percentile d'un utilisateur
+
+    - Mode exact : une agrégation sur l'histogramme (≤ 1000 cases) + un comptage limité
+      aux joueurs du même niveau via l'index (level, experience_points).
+    - Mode approché : la position dans le niveau est interpolée linéairement entre les
+      seuils XP du niveau, sans toucher aux entrées. Activé automatiquement au-delà de
+      RANK_SETTINGS['APPROXIMATE_ABOVE_USERS'] joueurs si `approximate` vaut None.
+    """
+    try:
+        entry = LeaderboardEntry.objects.only('level', 'experience_points').get(user=user)
+    except LeaderboardEntry.DoesNotExist:
+        rebuild_entry(user)
+        entry = LeaderboardEntry.objects.only('level', 'experience_points').get(user=user)
+
+    stats = LevelHistogram.objects.aggregate(
+        total=Sum('users'),
+        above=Sum('users', filter=Q(level__gt=entry.level)),
+        same=Sum('users', filter=Q(level=entry.level)),
+    )
+    total_users = stats['total'] or 0
+    above = stats['above'] or 0
+
+    if approximate is None:
+        threshold = getattr(settings, 'RANK_SETTINGS', {}).get('APPROXIMATE_ABOVE_USERS')
+        approximate = bool(threshold) and total_users > threshold
+
+    if approximate:
+        floor, ceiling = leveling.xp_for_level(entry.level), leveling.xp_for_level(entry.level + 1)
+        progress = min(max((entry.experience_points - floor) / (ceiling - floor), 0.0), 1.0)
+        same_level_ahead = int(round(max((stats['same'] or 1) - 1, 0) * (1 - progress)))
+    else:
+        same_level_ahead = LeaderboardEntry.objects.filter(
+            level=entry.level, experience_points__gt=entry.experience_points
+        ).count()
+
+    rank = above + same_level_ahead + 1
+    percentile = ((total_users - rank) / total_users * 100) if total_users > 0 else 0
+    return {
+        'rank': rank,
+        'total_users': total_users,
+        'percentile': percentile,
+        'experience_points': entry.experience_points,
+        'approximate': approximate,
+    }
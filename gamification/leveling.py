@@ -0,0 +1,117 @@
+from bisect import bisect_right
+
+from django.conf import settings
+
+MAX_LEVEL = settings.GAMIFICATION_SETTINGS.get('MAX_LEVEL', 1000)
+LEVELS_PER_GALAXY = settings.GAMIFICATION_SETTINGS.get('LEVELS_PER_GALAXY', 100)
+
+
+class XPCurve:
+    """✅ Courbe XP versionnée : coût de chaque niveau + découpage en galaxies
+
+    Les seuils cumulés sont précalculés une fois par process. `thresholds[i]` est
+    l'XP cumulée du niveau i + 1, pour i = 0 .. max_level (la dernière case sert
+    de plafond au niveau maximum).
+    """
+
+    def __init__(self, version, level_cost, max_level=MAX_LEVEL, levels_per_galaxy=LEVELS_PER_GALAXY):
+        self.version = version
+        self.level_cost = level_cost
+        self.max_level = max_level
+        self.levels_per_galaxy = levels_per_galaxy
+
+        thresholds = [0]
+        for level in range(1, max_level + 1):
+            thresholds.append(thresholds[-1] + level_cost(level))
+        self.thresholds = thresholds
+
+    def xp_for_level(self, level):
+        """XP cumulée nécessaire pour atteindre `level` (borné à 1 .. max_level + 1)"""
+        return self.thresholds[min(max(level, 1), self.max_level + 1) - 1]
+
+    def level_for_xp(self, total_xp):
+        """Niveau (1 - max_level) correspondant à un total XP, par recherche dichotomique"""
+        return min(max(1, bisect_right(self.thresholds, total_xp)), self.max_level)
+
+    def galaxy(self, level):
+        return ((level - 1) // self.levels_per_galaxy) + 1
+
+    def level_in_galaxy(self, level):
+        return ((level - 1) % self.levels_per_galaxy) + 1
+
+    def galaxy_levels(self, galaxy):
+        return (galaxy - 1) * self.levels_per_galaxy + 1, galaxy * self.levels_per_galaxy
+
+
+def _cost_v1(level):
+    """v1 : passer du niveau l au niveau l + 1 coûte l * (l + 1) * 50 XP"""
+    return level * (level + 1) * 50
+
+
+# Ne jamais modifier une version publiée : en ajouter une nouvelle, lancer
+# `manage.py relevel_profiles --curve N`, puis basculer XP_CURVE_VERSION.
+XP_CURVES = {
+    1: XPCurve(1, _cost_v1),
+}
+
+CURRENT_CURVE = XP_CURVES[settings.GAMIFICATION_SETTINGS.get('XP_CURVE_VERSION', 1)]
+
+# LEVEL_THRESHOLDS[i] = XP cumulée du niveau i + 1 selon la courbe courante
+LEVEL_THRESHOLDS = CURRENT_CURVE.thresholds[:CURRENT_CURVE.max_level]
+
+
+def get_curve(version=None):
+    """Courbe XP d'une version donnée (la courbe courante par défaut)"""
+    if version is None:
+        return CURRENT_CURVE
+    return XP_CURVES[version]
+
+
+def xp_for_level(level):
+    """✅ XP cumulée nécessaire pour atteindre `level`"""
+    return CURRENT_CURVE.xp_for_level(level)
+
+
+def level_for_xp(total_xp):
+    """✅ Niveau (1 - MAX_LEVEL) correspondant à un total XP, par recherche dichotomique"""
+    return CURRENT_CURVE.level_for_xp(total_xp)
+
+
+def xp_to_next_level(total_xp):
+    """XP restante avant le niveau suivant (0 au niveau maximum)"""
+    level = level_for_xp(total_xp)
+    if level >= CURRENT_CURVE.max_level:
+        return 0
+    return xp_for_level(level + 1) - total_xp
+
+
+def galaxy(level):
+    """Galaxie (1-10) d'un niveau"""
+    return CURRENT_CURVE.galaxy(level)
+
+
+def level_in_galaxy(level):
+    """Niveau dans la galaxie (1-100)"""
+    return CURRENT_CURVE.level_in_galaxy(level)
+
+
+def galaxy_levels(galaxy):
+    """Premier et dernier niveau d'une galaxie"""
+    return CURRENT_CURVE.galaxy_levels(galaxy)
+
+
+def level_progress(total_xp):
+    """✅ État de progression complet pour un total XP"""
+    level = level_for_xp(total_xp)
+    current_level_xp = xp_for_level(level)
+    next_level_xp = xp_for_level(level + 1) if level < CURRENT_CURVE.max_level else current_level_xp
+
+    return {
+        'level': level,
+        'galaxy': galaxy(level),
+        'level_in_galaxy': level_in_galaxy(level),
+        'current_level_xp': current_level_xp,
+        'next_level_xp': next_level_xp,
+        'xp_in_level': total_xp - current_level_xp,
+        'xp_to_next_level': max(next_level_xp - total_xp, 0),
+    }
@@ -0,0 +1,241 @@
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Statuts du fournisseur considérés comme transitoires (nouvelle tentative)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+DEFAULTS = {
+    'API_URL': 'https://api.perplexity.ai/chat/completions',
+    'MODEL': 'sonar',
+    'TIMEOUT': 30,
+    'CONNECT_TIMEOUT': 5,
+    'POOL_SIZE': 10,
+    'MAX_RETRIES': 2,
+    'BACKOFF_BASE': 0.5,
+    'BACKOFF_MAX': 8,
+    'BREAKER_THRESHOLD': 5,
+    'BREAKER_COOLDOWN': 30,
+    'MAX_CONCURRENCY': 8,
+    'ADMISSION_WAIT': 0.5,
+    'OVERLOAD_RETRY_AFTER': 5,
+}
+
+
+class ProviderError(Exception):
+    """Échec d'un appel au fournisseur LLM (`status` : code HTTP à renvoyer au client)"""
+
+    def __init__(self, message, status=502):
+        super().__init__(message)
+        self.status = status
+
+
+class CircuitOpenError(ProviderError):
+    """Le fournisseur a échoué trop souvent : appel refusé sans tentative réseau"""
+
+    def __init__(self, retry_after):
+        super().__init__('Service IA temporairement indisponible', status=503)
+        self.retry_after = retry_after
+
+
+class OverloadedError(ProviderError):
+    """Trop d'appels simultanés au fournisseur dans ce process : requête refusée sans attendre"""
+
+    def __init__(self, retry_after):
+        super().__init__('Service IA saturé, réessayez dans quelques secondes', status=503)
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """✅ Borne le nombre d'appels simultanés au fournisseur dans le process
+
+    Une requête attend au plus `wait` secondes qu'une place se libère, puis est refusée
+    (OverloadedError) : les threads du worker ne s'accumulent pas derrière un fournisseur lent.
+    """
+
+    def __init__(self, limit, wait, retry_after):
+        self.limit = limit
+        self.wait = wait
+        self.retry_after = retry_after
+        self.rejected = 0
+        self._semaphore = threading.BoundedSemaphore(limit)
+
+    @contextmanager
+    def slot(self):
+        if not self._semaphore.acquire(timeout=self.wait):
+            self.rejected += 1
+            raise OverloadedError(retry_after=self.retry_after)
+        try:
+            yield
+        finally:
+            self._semaphore.release()
+
+
+class CircuitBreaker:
+    """✅ Disjoncteur : ouvert après `threshold` échecs consécutifs, pendant `cooldown` secondes
+
+    À l'expiration, un seul appel d'essai passe (semi-ouvert) : un succès referme le
+    disjoncteur, un échec le rouvre pour une nouvelle période.
+    """
+
+    def __init__(self, threshold, cooldown, clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + self.cooldown - self.clock()
+            if remaining > 0 or self._trial:
+                raise CircuitOpenError(retry_after=max(1, int(remaining + 0.999)))
+            self._trial = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = self.clock()
+            self._trial = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if self.clock() >= self.opened_at + self.cooldown else 'open'
+
+
+class LLMClient:
+    """✅ Client HTTP du fournisseur LLM : connexions keep-alive réutilisées, tentatives
+    bornées avec backoff exponentiel + jitter, disjoncteur et nombre d'appels simultanés
+    partagés par le process
+    """
+
+    def __init__(self, config=None, sleep=time.sleep):
+        self.config = {**DEFAULTS, **(config or {})}
+        self.sleep = sleep
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.config['POOL_SIZE'])
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.breaker = CircuitBreaker(self.config['BREAKER_THRESHOLD'], self.config['BREAKER_COOLDOWN'])
+        self.limiter = ConcurrencyLimiter(
+            self.config['MAX_CONCURRENCY'], self.config['ADMISSION_WAIT'], self.config['OVERLOAD_RETRY_AFTER']
+        )
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.config['BACKOFF_MAX'])
+        # Full jitter : entre 0 et base * 2^attempt, plafonné
+        return random.uniform(0, min(self.config['BACKOFF_MAX'], self.config['BACKOFF_BASE'] * 2 ** attempt))
+
+    def _send(self, payload, api_key, stream=False):
+        """POST JSON avec tentatives ; retourne la réponse 200 ou lève ProviderError"""
+        self.breaker.before_call()
+
+        error = None
+        for attempt in range(self.config['MAX_RETRIES'] + 1):
+            if attempt:
+                self.sleep(self._backoff(attempt - 1, getattr(error, 'retry_after', None)))
+            try:
+                response = self.session.post(
+                    self.config['API_URL'],
+                    json=payload,
+                    headers={'Authorization': f'Bearer {api_key}'},
+                    timeout=(self.config['CONNECT_TIMEOUT'], self.config['TIMEOUT']),
+                    stream=stream,
+                )
+            except requests.ConnectionError as e:
+                # Connexion impossible, délai de connexion dépassé (ConnectTimeout) ou connexion
+                # keep-alive fermée : la requête n'a pas été traitée, elle peut être rejouée
+                error = ProviderError(f'API unreachable: {e.__class__.__name__}', status=504)
+                continue
+            except requests.RequestException as e:
+                # ReadTimeout et autres : le fournisseur a peut-être déjà reçu (et facturé) la requête,
+                # la rejouer multiplierait l'attente par MAX_RETRIES + 1
+                self.breaker.record_failure()
+                raise ProviderError(f'API unreachable: {e.__class__.__name__}', status=504)
+
+            if response.status_code == 200:
+                self.breaker.record_success()
+                return response
+
+            response.close()
+            error = ProviderError(f'API error: {response.status_code}', status=400)
+            if response.status_code not in RETRY_STATUSES:
+                # Erreur de la requête elle-même (clé invalide, payload refusé) : pas de nouvelle tentative
+                self.breaker.record_success()
+                raise error
+            retry_after = response.headers.get('Retry-After')
+            error.retry_after = float(retry_after) if retry_after and retry_after.isdigit() else None
+
+        self.breaker.record_failure()
+        raise error
+
+    def post(self, payload, api_key):
+        """POST JSON avec tentatives ; retourne la réponse 200 décodée ou lève ProviderError"""
+        with self.limiter.slot():
+            return self._send(payload, api_key).json()
+
+    def chat(self, prompt, api_key):
+        """✅ Une complétion : retourne le texte du premier choix"""
+        payload = {'model': self.config['MODEL'], 'messages': [{'role': 'user', 'content': prompt}]}
+        return self.post(payload, api_key)['choices'][0]['message']['content']
+
+    def stream_chat(self, prompt, api_key):
+        """✅ Une complétion en streaming : générateur des fragments de texte du premier choix
+
+        Les tentatives ne portent que sur l'ouverture du flux ; une coupure en cours de
+        réponse lève ProviderError (504) sans rejouer la requête.
+        """
+        payload = {'model': self.config['MODEL'], 'messages': [{'role': 'user', 'content': prompt}], 'stream': True}
+        # La place est occupée jusqu'à la fin (ou l'abandon) du flux
+        with self.limiter.slot():
+            response = self._send(payload, api_key, stream=True)
+            try:
+                for line in response.iter_lines(decode_unicode=True):
+                    # Format SSE compatible OpenAI : "data: {...}" ... "data: [DONE]"
+                    if not line or not line.startswith('data:'):
+                        continue
+                    data = line[len('data:'):].strip()
+                    if data == '[DONE]':
+                        return
+                    try:
+                        delta = json.loads(data)['choices'][0].get('delta', {}).get('content')
+                    except (ValueError, KeyError, IndexError):
+                        continue
+                    if delta:
+                        yield delta
+            except requests.RequestException as e:
+                raise ProviderError(f'API stream interrupted: {e.__class__.__name__}', status=504)
+            finally:
+                response.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client(config):
+    """Client partagé du process, recréé si la configuration change"""
+    global _client
+    with _client_lock:
+        if _client is None or _client.config != {**DEFAULTS, **config}:
+            _client = LLMClient(config)
+        return _client
@@ -0,0 +1,73 @@
+import itertools
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from gamification import ai, llm, replay
+from gamification.fakeprovider import BATCH_COUNT
+
+
+class Command(BaseCommand):
+    help = ("Rejoue une cassette d'échanges IA (AI_RECORD_CASSETTE) contre un fournisseur local sous charge : "
+            "débit, latences p50/p95, taux d'échec d'extraction JSON")
+
+    def add_arguments(self, parser):
+        parser.add_argument('cassette', help="Fichier .jsonl.gz enregistré via AI_SETTINGS['RECORD_CASSETTE']")
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--latency', type=float, default=None,
+                            help="Latence fixe du fournisseur (s) ; par défaut, latence enregistrée")
+        parser.add_argument('--jitter', type=float, default=0.0)
+        parser.add_argument('--error-rate', type=float, default=0.0)
+        parser.add_argument('--corrupt-rate', type=float, default=0.0)
+        parser.add_argument('--retries', type=int, default=None,
+                            help="Tentatives du client (par défaut AI_SETTINGS['MAX_RETRIES'])")
+        parser.add_argument('--max-concurrency', type=int, default=None,
+                            help="Appels simultanés admis par le client (par défaut --concurrency : pas de rejet)")
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--json', action='store_true', help="Résultat en JSON")
+
+    def handle(self, *args, **options):
+        try:
+            cassette = replay.Cassette(options['cassette'])
+            prompts = [entry['prompt'] for entry in cassette.entries()]
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cassette illisible : {e}')
+        if not prompts:
+            raise CommandError('Cassette vide')
+
+        provider = replay.ReplayProvider(
+            cassette, latency=options['latency'], jitter=options['jitter'], error_rate=options['error_rate'],
+            corrupt_rate=options['corrupt_rate'], seed=options['seed'],
+        ).start()
+        config = {**ai.ai_settings(), 'API_URL': provider.url}
+        config['POOL_SIZE'] = max(config.get('POOL_SIZE', llm.DEFAULTS['POOL_SIZE']), options['concurrency'])
+        config['MAX_CONCURRENCY'] = options['max_concurrency'] or options['concurrency']
+        if options['retries'] is not None:
+            config['MAX_RETRIES'] = options['retries']
+        client = llm.LLMClient(config)
+
+        def evaluate(prompt):
+            # Même traitement que l'évaluation réelle : appel, extraction du JSON, conversion
+            batch = BATCH_COUNT.search(prompt)
+            content = client.chat(prompt, 'replay')
+            if batch:
+                return [ai.to_result(item) for item in ai.extract_json_list(content, int(batch.group(1)))]
+            return ai.to_result(ai.extract_json(content))
+
+        try:
+            workload = list(itertools.islice(itertools.cycle(prompts), options['requests']))
+            stats = replay.run_load(workload, evaluate, options['concurrency'])
+        finally:
+            provider.stop()
+        stats['breaker'] = client.breaker.state
+
+        if options['json']:
+            self.stdout.write(json.dumps(stats))
+            return
+        self.stdout.write(f"Requêtes: {stats['requests']} (concurrence {stats['concurrency']}, "
+                          f"{len(set(prompts))} prompts distincts)")
+        self.stdout.write(f"Débit: {stats['throughput']} req/s sur {stats['elapsed']} s")
+        self.stdout.write(f"Latence p50: {stats['p50'] * 1000:.1f} ms | p95: {stats['p95'] * 1000:.1f} ms")
+        self.stdout.write(f"Échecs d'extraction JSON: {stats['parse_failures']} ({stats['parse_failure_rate']:.2%})")
+        self.stdout.write(f"Autres erreurs: {stats['error_rate']:.2%} {stats['errors'] or ''}".rstrip())
+        self.stdout.write(f"Disjoncteur: {stats['breaker']}")
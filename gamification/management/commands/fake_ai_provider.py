@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from gamification.fakeprovider import FakeProvider
+
+
+class Command(BaseCommand):
+    help = "Lance un fournisseur IA local (API compatible OpenAI, streaming compris) pour travailler hors ligne"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--token-delay', type=float, default=0.05,
+                            help="Pause (s) entre deux fragments de la réponse en streaming")
+
+    def handle(self, *args, **options):
+        server = FakeProvider((options['host'], options['port']), token_delay=options['token_delay'])
+        self.stdout.write(f'Fournisseur local sur {server.url}')
+        self.stdout.write(f'  PERPLEXITY_API_URL={server.url} PERPLEXITY_API_KEY=local python manage.py runserver')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from gamification import traits
+
+
+class Command(BaseCommand):
+    help = "Fusionne les traits de personnalité qui ne diffèrent que par les accents ou la casse"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Compte les doublons sans rien fusionner")
+
+    def handle(self, *args, **options):
+        groups, removed = traits.merge_duplicates(dry_run=options['dry_run'])
+
+        prefix = '[dry-run] ' if options['dry_run'] else ''
+        self.stdout.write(f'{prefix}Groupes de doublons: {groups}')
+        self.stdout.write(f'{prefix}Traits à supprimer: {removed}' if options['dry_run']
+                          else f'Traits supprimés: {removed}')
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS('✅ Fusion terminée'))
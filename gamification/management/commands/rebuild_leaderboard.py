@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from gamification import leaderboard
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit le classement matérialisé (XP, HP totaux, histogramme des niveaux) depuis les profils et les traits'
+
+    def handle(self, *args, **options):
+        count = leaderboard.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Classement reconstruit: {count} entrées')
+        )
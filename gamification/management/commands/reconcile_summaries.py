@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from gamification import summaries
+
+
+class Command(BaseCommand):
+    help = "Corrige les écarts entre les résumés utilisateurs / HP du classement et l'historique"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Compte les écarts sans rien corriger")
+
+    def handle(self, *args, **options):
+        drifted, missing, hp_drifted = summaries.reconcile(dry_run=options['dry_run'])
+
+        prefix = '[dry-run] ' if options['dry_run'] else ''
+        self.stdout.write(f'{prefix}Résumés en écart: {drifted}')
+        self.stdout.write(f'{prefix}Résumés manquants: {missing}')
+        self.stdout.write(f'{prefix}Totaux HP en écart: {hp_drifted}')
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS('✅ Réconciliation terminée'))
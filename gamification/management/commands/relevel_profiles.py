@@ -0,0 +1,108 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from gamification import leaderboard, leveling, usercache
+from gamification.models import LeaderboardEntry, UserProfile
+
+try:
+    import numpy as np
+except ImportError:  # numpy absent : recherche dichotomique en Python, même résultat
+    np = None
+
+
+class Command(BaseCommand):
+    help = 'Recalcule le niveau de tous les profils selon une version de la courbe XP (par lots, bulk_update)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--curve', type=int, default=None,
+                            help='Version de la courbe XP (défaut : XP_CURVE_VERSION)')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--dry-run', action='store_true',
+                            help="N'écrit rien, affiche seulement les changements de niveau et de galaxie")
+
+    def handle(self, *args, **options):
+        try:
+            curve = leveling.get_curve(options['curve'])
+        except KeyError:
+            raise CommandError(f"Courbe XP inconnue: v{options['curve']} (disponibles: {sorted(leveling.XP_CURVES)})")
+
+        current = leveling.get_curve()
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+        thresholds = np.asarray(curve.thresholds, dtype=np.int64) if np is not None else None
+
+        scanned = level_changes = galaxy_up = galaxy_down = 0
+        last_id = 0
+
+        # Parcours par clé (id > dernier id) : pas d'OFFSET, mémoire bornée par lot
+        while True:
+            chunk = list(
+                UserProfile.objects.filter(id__gt=last_id)
+                .order_by('id')
+                .only('id', 'user_id', 'level', 'experience_points')[:chunk_size]
+            )
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            scanned += len(chunk)
+
+            new_levels = self._compute_levels(curve, thresholds, [p.experience_points for p in chunk])
+
+            changed = {}
+            for profile, new_level in zip(chunk, new_levels):
+                if new_level == profile.level:
+                    continue
+                old_galaxy, new_galaxy = current.galaxy(profile.level), curve.galaxy(new_level)
+                if new_galaxy > old_galaxy:
+                    galaxy_up += 1
+                elif new_galaxy < old_galaxy:
+                    galaxy_down += 1
+                profile.level = new_level
+                changed[profile.user_id] = profile
+
+            level_changes += len(changed)
+            if changed and not dry_run:
+                self._write_chunk(changed)
+
+        prefix = '[dry-run] ' if dry_run else ''
+        self.stdout.write(f'{prefix}Courbe XP v{curve.version}: {scanned} profils analysés')
+        self.stdout.write(f'{prefix}Niveaux modifiés: {level_changes}')
+        self.stdout.write(
+            f'{prefix}Changements de galaxie: {galaxy_up + galaxy_down} '
+            f'(montée: {galaxy_up}, descente: {galaxy_down})'
+        )
+
+        if dry_run:
+            return
+
+        # bulk_update ne déclenche pas post_save : l'histogramme est recalculé une seule fois
+        leaderboard.rebuild_histogram()
+        self.stdout.write(self.style.SUCCESS(f'✅ {level_changes} profils re-nivelés'))
+        if curve is not current:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️ Pensez à définir XP_CURVE_VERSION={curve.version} avant de redémarrer les serveurs'
+            ))
+
+    @staticmethod
+    def _compute_levels(curve, thresholds, xps):
+        """Niveaux d'un lot : un seul searchsorted vectorisé sur les seuils cumulés"""
+        if thresholds is None:
+            return [curve.level_for_xp(xp) for xp in xps]
+        levels = np.searchsorted(thresholds, np.asarray(xps, dtype=np.int64), side='right')
+        return np.clip(levels, 1, curve.max_level).tolist()
+
+    @staticmethod
+    def _write_chunk(changed):
+        """Écrit les nouveaux niveaux d'un lot (profils + entrées de classement) et invalide
+        le cache des réponses de ces utilisateurs"""
+        entries = list(LeaderboardEntry.objects.filter(user_id__in=changed.keys()).only('id', 'user_id', 'level'))
+        for entry in entries:
+            entry.level = changed[entry.user_id].level
+
+        with transaction.atomic():
+            UserProfile.objects.bulk_update(changed.values(), ['level'])
+            LeaderboardEntry.objects.bulk_update(entries, ['level'])
+
+        # Réponses profil / tableau de bord en cache : l'ancien niveau ne doit plus être servi
+        for user_id in changed:
+            usercache.bump_user_version(user_id)
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.8 on 2026-10-18 05:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum
+
+
+def populate_leaderboard(apps, schema_editor):
+    UserProfile = apps.get_model('gamification', 'UserProfile')
+    UserPersonalityTrait = apps.get_model('gamification', 'UserPersonalityTrait')
+    LeaderboardEntry = apps.get_model('gamification', 'LeaderboardEntry')
+
+    hp_by_user = dict(
+        UserPersonalityTrait.objects.values('user_id').annotate(total=Sum('hp')).values_list('user_id', 'total')
+    )
+    LeaderboardEntry.objects.bulk_create([
+        LeaderboardEntry(
+            user_id=profile.user_id,
+            profile=profile,
+            level=profile.level,
+            experience_points=profile.experience_points,
+            total_points=profile.total_points,
+            badges_count=profile.badges_count,
+            total_hp=hp_by_user.get(profile.user_id) or 0,
+        )
+        for profile in UserProfile.objects.all()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('gamification', '0004_checkedresource'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.IntegerField(default=1)),
+                ('experience_points', models.IntegerField(default=0)),
+                ('total_points', models.IntegerField(default=0)),
+                ('total_hp', models.IntegerField(default=0)),
+                ('badges_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entry', to='gamification.userprofile')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='gamification_leaderboard_entry', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Entrée du Classement',
+                'verbose_name_plural': 'Entrées du Classement',
+                'ordering': ['-experience_points'],
+                'indexes': [models.Index(fields=['-experience_points'], name='gamificatio_experie_953619_idx')],
+            },
+        ),
+        migrations.RunPython(populate_leaderboard, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.8 on 2026-10-18 05:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+
+
+def populate_daily_stats(apps, schema_editor):
+    Action = apps.get_model('gamification', 'Action')
+    UserDailyStats = apps.get_model('gamification', 'UserDailyStats')
+
+    rows = (
+        Action.objects.annotate(day=TruncDate('created_at'))
+        .values('user_id', 'day')
+        .annotate(xp=Sum('points'))
+    )
+    UserDailyStats.objects.bulk_create([
+        UserDailyStats(user_id=row['user_id'], day=row['day'], xp_gained=row['xp'] or 0)
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('gamification', '0005_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('xp_gained', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gamification_daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Statistiques Journalières',
+                'verbose_name_plural': 'Statistiques Journalières',
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['day', 'user'], name='gamificatio_day_9f8e88_idx')],
+                'unique_together': {('user', 'day')},
+            },
+        ),
+        migrations.RunPython(populate_daily_stats, migrations.RunPython.noop),
+    ]
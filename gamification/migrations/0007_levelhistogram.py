@@ -0,0 +1,42 @@
+# Generated by Django 4.2.8 on 2026-10-18 05:36
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_histogram(apps, schema_editor):
+    LeaderboardEntry = apps.get_model('gamification', 'LeaderboardEntry')
+    LevelHistogram = apps.get_model('gamification', 'LevelHistogram')
+
+    counts = LeaderboardEntry.objects.values('level').annotate(users=Count('id')).order_by()
+    LevelHistogram.objects.bulk_create([
+        LevelHistogram(level=row['level'], users=row['users']) for row in counts
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0006_userdailystats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LevelHistogram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.IntegerField(unique=True)),
+                ('users', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Histogramme des Niveaux',
+                'verbose_name_plural': 'Histogramme des Niveaux',
+                'ordering': ['-level'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['level', 'experience_points'], name='gamificatio_level_be4aca_idx'),
+        ),
+        migrations.RunPython(populate_histogram, migrations.RunPython.noop),
+    ]
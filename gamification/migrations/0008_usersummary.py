@@ -0,0 +1,74 @@
+# Generated by Django 4.2.8 on 2026-10-18 05:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Q, Sum
+
+DETECTION_FIELDS = (
+    'books_read', 'academic_articles', 'projects_worked',
+    'online_courses', 'social_contributions', 'networking_events',
+)
+
+
+def populate_summaries(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserSummary = apps.get_model('gamification', 'UserSummary')
+    ActivityEvaluation = apps.get_model('gamification', 'ActivityEvaluation')
+    StudySession = apps.get_model('gamification', 'StudySession')
+    UserChallenge = apps.get_model('gamification', 'UserChallenge')
+
+    def grouped(queryset, **aggregates):
+        return {row.pop('user_id'): row for row in queryset.values('user_id').annotate(**aggregates).order_by()}
+
+    sources = [
+        grouped(ActivityEvaluation.objects.all(), evaluations_count=Count('id'),
+                **{field: Sum(field) for field in DETECTION_FIELDS}),
+        grouped(StudySession.objects.all(), study_sessions_count=Count('id'), study_minutes=Sum('duration_minutes')),
+        grouped(UserChallenge.objects.all(),
+                active_challenges=Count('id', filter=Q(status='active')),
+                completed_challenges=Count('id', filter=Q(status='completed'))),
+    ]
+
+    summaries = []
+    for user_id in User.objects.values_list('id', flat=True):
+        values = {}
+        for source in sources:
+            values.update({k: v or 0 for k, v in source.get(user_id, {}).items()})
+        summaries.append(UserSummary(user_id=user_id, **values))
+    UserSummary.objects.bulk_create(summaries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('gamification', '0007_levelhistogram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('evaluations_count', models.IntegerField(default=0)),
+                ('books_read', models.IntegerField(default=0)),
+                ('academic_articles', models.IntegerField(default=0)),
+                ('projects_worked', models.IntegerField(default=0)),
+                ('online_courses', models.IntegerField(default=0)),
+                ('social_contributions', models.IntegerField(default=0)),
+                ('networking_events', models.IntegerField(default=0)),
+                ('active_challenges', models.IntegerField(default=0)),
+                ('completed_challenges', models.IntegerField(default=0)),
+                ('study_sessions_count', models.IntegerField(default=0)),
+                ('study_minutes', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='gamification_summary', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Résumé Utilisateur',
+                'verbose_name_plural': 'Résumés Utilisateurs',
+            },
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
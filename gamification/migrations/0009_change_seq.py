@@ -0,0 +1,36 @@
+# Generated by Django 4.2.8 on 2026-10-18 05:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0008_usersummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activityevaluation',
+            name='change_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userpersonalitytrait',
+            name='change_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='usersummary',
+            name='change_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='activityevaluation',
+            index=models.Index(fields=['user', 'change_seq'], name='gamificatio_user_id_4d8caf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userpersonalitytrait',
+            index=models.Index(fields=['user', 'change_seq'], name='gamificatio_user_id_455b83_idx'),
+        ),
+    ]
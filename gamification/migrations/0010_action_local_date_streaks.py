@@ -0,0 +1,74 @@
+# Generated by Django 4.2.8 on 2026-10-18 05:56
+
+from datetime import timedelta
+from itertools import groupby
+
+from django.db import migrations, models
+from django.utils import timezone
+import django.utils.timezone
+
+
+def populate_local_dates_and_streaks(apps, schema_editor):
+    Action = apps.get_model('gamification', 'Action')
+    UserSummary = apps.get_model('gamification', 'UserSummary')
+
+    batch = []
+    for action in Action.objects.only('id', 'created_at').order_by('id').iterator(chunk_size=2000):
+        action.local_date = timezone.localdate(action.created_at)
+        batch.append(action)
+        if len(batch) >= 1000:
+            Action.objects.bulk_update(batch, ['local_date'])
+            batch = []
+    Action.objects.bulk_update(batch, ['local_date'])
+
+    summaries = {summary.user_id: summary for summary in UserSummary.objects.all()}
+    active_days = Action.objects.values_list('user_id', 'local_date').distinct().order_by('user_id', 'local_date')
+    for user_id, rows in groupby(active_days.iterator(), key=lambda row: row[0]):
+        summary = summaries.get(user_id)
+        if summary is None:
+            continue
+        current = longest = 0
+        previous = None
+        for _, day in rows:
+            current = current + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+            longest = max(longest, current)
+            previous = day
+        summary.current_streak, summary.longest_streak, summary.last_active_day = current, longest, previous
+    UserSummary.objects.bulk_update(
+        list(summaries.values()), ['current_streak', 'longest_streak', 'last_active_day'], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0009_change_seq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='action',
+            name='local_date',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+        migrations.AddField(
+            model_name='usersummary',
+            name='current_streak',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='usersummary',
+            name='last_active_day',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='usersummary',
+            name='longest_streak',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='action',
+            index=models.Index(fields=['user', 'local_date'], name='gamificatio_user_id_8aad9c_idx'),
+        ),
+        migrations.RunPython(populate_local_dates_and_streaks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.8 on 2026-10-18 05:57
+
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def populate_daily_counters(apps, schema_editor):
+    Action = apps.get_model('gamification', 'Action')
+    EvaluationTraitLink = apps.get_model('gamification', 'EvaluationTraitLink')
+    StudySession = apps.get_model('gamification', 'StudySession')
+    UserDailyStats = apps.get_model('gamification', 'UserDailyStats')
+
+    counters = {}
+    sources = [
+        (Action.objects.values('user_id', day=F('local_date')), 'action_count', Count('id')),
+        (EvaluationTraitLink.objects.values(user_id=F('evaluation__user_id'),
+                                            day=TruncDate('evaluation__created_at')),
+         'hp_gained', Sum('hp_awarded')),
+        (StudySession.objects.values('user_id', day=TruncDate('started_at')), 'study_minutes', Sum('duration_minutes')),
+    ]
+    for queryset, field, aggregate in sources:
+        for row in queryset.annotate(total=aggregate).order_by():
+            counters.setdefault((row['user_id'], row['day']), {})[field] = row['total'] or 0
+
+    existing = []
+    for stats in UserDailyStats.objects.all().iterator(chunk_size=2000):
+        values = counters.pop((stats.user_id, stats.day), None)
+        if values:
+            for field, value in values.items():
+                setattr(stats, field, value)
+            existing.append(stats)
+    UserDailyStats.objects.bulk_update(existing, ['action_count', 'hp_gained', 'study_minutes'], batch_size=1000)
+    UserDailyStats.objects.bulk_create([
+        UserDailyStats(user_id=user_id, day=day, **values) for (user_id, day), values in counters.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0010_action_local_date_streaks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userdailystats',
+            name='action_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userdailystats',
+            name='hp_gained',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userdailystats',
+            name='study_minutes',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(populate_daily_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.8 on 2026-10-18 06:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0011_daily_stats_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['niveau', 'id'], name='gamificatio_niveau_ddfeae_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['type', 'niveau', 'id'], name='gamificatio_type_901c6a_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.8 on 2026-10-18 06:30
+
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+
+def populate_evaluation_totals(apps, schema_editor):
+    ActivityEvaluation = apps.get_model('gamification', 'ActivityEvaluation')
+    EvaluationTraitLink = apps.get_model('gamification', 'EvaluationTraitLink')
+    UserSummary = apps.get_model('gamification', 'UserSummary')
+
+    totals = {}
+    for row in ActivityEvaluation.objects.values('user_id').annotate(total=Sum('xp_awarded')).order_by():
+        totals.setdefault(row['user_id'], {})['evaluations_xp'] = row['total'] or 0
+    for row in (EvaluationTraitLink.objects.values(user_id=F('evaluation__user_id'))
+                .annotate(total=Sum('hp_awarded')).order_by()):
+        totals.setdefault(row['user_id'], {})['evaluations_hp'] = row['total'] or 0
+
+    summaries = []
+    for summary in UserSummary.objects.all().iterator(chunk_size=2000):
+        values = totals.get(summary.user_id)
+        if values:
+            for field, value in values.items():
+                setattr(summary, field, value)
+            summaries.append(summary)
+    UserSummary.objects.bulk_update(summaries, ['evaluations_xp', 'evaluations_hp'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0012_resource_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usersummary',
+            name='evaluations_hp',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='usersummary',
+            name='evaluations_xp',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(populate_evaluation_totals, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,12 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 
+from . import leveling
+
 # ==================== USER PROFILE ====================
 
 class UserProfile(models.Model):
@@ -48,12 +50,12 @@ class UserProfile(models.Model):
     @property
     def galaxy(self):
         """Retourne la galaxie (1-10)"""
-        return ((self.level - 1) // 100) + 1
+        return leveling.galaxy(self.level)
 
     @property
     def level_in_galaxy(self):
         """Retourne le niveau dans la galaxie (1-100)"""
-        return ((self.level - 1) % 100) + 1
+        return leveling.level_in_galaxy(self.level)
 
     @property
     def galaxy_name(self):
@@ -102,6 +104,48 @@ class UserProfile(models.Model):
                 print(f"Erreur suppression couverture: {e}")
 
 
+# ==================== LEADERBOARD ENTRY ====================
+
+class LeaderboardEntry(models.Model):
+    """Classement matérialisé : une ligne par profil, tenue à jour à chaque variation d'XP ou de HP"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='gamification_leaderboard_entry')
+    profile = models.OneToOneField(UserProfile, on_delete=models.CASCADE, related_name='leaderboard_entry')
+    level = models.IntegerField(default=1)
+    experience_points = models.IntegerField(default=0)
+    total_points = models.IntegerField(default=0)
+    total_hp = models.IntegerField(default=0)
+    badges_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Entrée du Classement"
+        verbose_name_plural = "Entrées du Classement"
+        ordering = ['-experience_points']
+        indexes = [
+            models.Index(fields=['-experience_points']),
+            models.Index(fields=['level', 'experience_points']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.experience_points} XP / {self.total_hp} HP"
+
+
+# ==================== LEVEL HISTOGRAM ====================
+
+class LevelHistogram(models.Model):
+    """Nombre de joueurs par niveau (1000 cases max) - sert au calcul du rang sans scanner les profils"""
+    level = models.IntegerField(unique=True)
+    users = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Histogramme des Niveaux"
+        verbose_name_plural = "Histogramme des Niveaux"
+        ordering = ['-level']
+
+    def __str__(self):
+        return f"Level {self.level}: {self.users} joueurs"
+
+
 # ==================== SKILL ====================
 
 class Skill(models.Model):
@@ -317,6 +361,8 @@ class Action(models.Model):
     description = models.TextField(blank=True)
     points = models.IntegerField(default=10, validators=[MinValueValidator(0)])
     created_at = models.DateTimeField(auto_now_add=True)
+    # Jour local (TIME_ZONE) de l'action : streaks et recalculs sans conversion de fuseau
+    local_date = models.DateField(default=timezone.localdate)
 
     class Meta:
         verbose_name = "Action"
@@ -324,12 +370,91 @@ class Action(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['user', 'local_date']),
         ]
 
     def __str__(self):
         return f"{self.user.username} - {self.action_type}"
 
 
+# ==================== USER DAILY STATS ====================
+
+class UserDailyStats(models.Model):
+    """Compteurs journaliers par utilisateur (XP, HP, actions, minutes d'étude), alimentés à l'écriture"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='gamification_daily_stats')
+    day = models.DateField()
+    xp_gained = models.IntegerField(default=0)
+    hp_gained = models.IntegerField(default=0)
+    action_count = models.IntegerField(default=0)
+    study_minutes = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Statistiques Journalières"
+        verbose_name_plural = "Statistiques Journalières"
+        unique_together = ('user', 'day')
+        ordering = ['-day']
+        indexes = [
+            models.Index(fields=['day', 'user']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.day}: +{self.xp_gained}XP"
+
+
+# ==================== USER SUMMARY ====================
+
+class UserSummary(models.Model):
+    """Compteurs cumulés par utilisateur (détections, défis, sessions), tenus à jour à l'écriture
+
+    Le total HP reste porté par LeaderboardEntry. `manage.py reconcile_summaries` corrige les écarts.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='gamification_summary')
+
+    evaluations_count = models.IntegerField(default=0)
+    # Totaux à vie des évaluations IA : XP attribués et HP des traits détectés
+    evaluations_xp = models.IntegerField(default=0)
+    evaluations_hp = models.IntegerField(default=0)
+    books_read = models.IntegerField(default=0)
+    academic_articles = models.IntegerField(default=0)
+    projects_worked = models.IntegerField(default=0)
+    online_courses = models.IntegerField(default=0)
+    social_contributions = models.IntegerField(default=0)
+    networking_events = models.IntegerField(default=0)
+
+    active_challenges = models.IntegerField(default=0)
+    completed_challenges = models.IntegerField(default=0)
+    study_sessions_count = models.IntegerField(default=0)
+    study_minutes = models.IntegerField(default=0)
+
+    # Streak : jours consécutifs avec au moins une action, jusqu'à last_active_day inclus
+    current_streak = models.IntegerField(default=0)
+    longest_streak = models.IntegerField(default=0)
+    last_active_day = models.DateField(null=True, blank=True)
+
+    # Séquence de changements : incrémentée à chaque évaluation / trait modifié (sync incrémental)
+    change_seq = models.BigIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Résumé Utilisateur"
+        verbose_name_plural = "Résumés Utilisateurs"
+
+    def __str__(self):
+        return f"{self.user.username} - {self.evaluations_count} évaluations"
+
+    def detections(self):
+        """Détections cumulées au format de l'API (camelCase)"""
+        return {
+            'booksRead': self.books_read,
+            'academicArticles': self.academic_articles,
+            'projectsWorked': self.projects_worked,
+            'onlineCourses': self.online_courses,
+            'socialContributions': self.social_contributions,
+            'networkingEvents': self.networking_events
+        }
+
+
 # ==================== PERSONALITY TRAIT ====================
 
 class PersonalityTrait(models.Model):
@@ -374,6 +499,7 @@ class UserPersonalityTrait(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='gamification_personality_traits')
     trait = models.ForeignKey(PersonalityTrait, on_delete=models.CASCADE, related_name='gamification_user_stats')
     hp = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+    change_seq = models.BigIntegerField(default=0)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -384,6 +510,7 @@ class UserPersonalityTrait(models.Model):
         indexes = [
             models.Index(fields=['user', '-hp']),
             models.Index(fields=['trait']),
+            models.Index(fields=['user', 'change_seq']),
         ]
 
     def __str__(self):
@@ -409,6 +536,7 @@ class ActivityEvaluation(models.Model):
     social_contributions = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     networking_events = models.IntegerField(default=0, validators=[MinValueValidator(0)])
 
+    change_seq = models.BigIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -419,6 +547,7 @@ class ActivityEvaluation(models.Model):
         indexes = [
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['-created_at']),
+            models.Index(fields=['user', 'change_seq']),
         ]
 
     def __str__(self):
@@ -532,6 +661,9 @@ class Resource(models.Model):
             models.Index(fields=['niveau', 'domaine']),
             models.Index(fields=['type']),
             models.Index(fields=['is_active']),
+            # Pagination par clé (niveau, id), globale ou par type
+            models.Index(fields=['niveau', 'id']),
+            models.Index(fields=['type', 'niveau', 'id']),
         ]
 
     def __str__(self):
@@ -540,12 +672,12 @@ class Resource(models.Model):
     @property
     def galaxy(self):
         """Retourne la galaxie requise (1-10)"""
-        return ((self.niveau - 1) // 100) + 1
+        return leveling.galaxy(self.niveau)
 
     @property
     def level_in_galaxy(self):
         """Retourne le niveau dans la galaxie (1-100)"""
-        return ((self.niveau - 1) % 100) + 1
+        return leveling.level_in_galaxy(self.niveau)
 
 
 class StudySubject(models.Model):
@@ -610,7 +742,175 @@ def save_user_profile(sender, instance, **kwargs):
     """Sauvegarde le profil quand le User est sauvegardé"""
     if hasattr(instance, 'profile'):
         instance.profile.save()
-        
+
+
+@receiver(post_save, sender=UserProfile)
+def sync_leaderboard_entry(sender, instance, **kwargs):
+    """Répercute XP / niveau / points du profil dans le classement matérialisé"""
+    from .leaderboard import sync_profile
+    sync_profile(instance)
+
+
+@receiver(post_delete, sender=LeaderboardEntry)
+def remove_leaderboard_entry(sender, instance, **kwargs):
+    """Retire le joueur supprimé de l'histogramme des niveaux"""
+    from .leaderboard import remove_entry
+    remove_entry(instance)
+
+
+@receiver(post_save, sender=Action)
+def record_daily_action(sender, instance, created, **kwargs):
+    """Ajoute une nouvelle action et ses points aux compteurs du jour"""
+    if created:
+        from .rollups import add_daily
+        add_daily(instance.user_id, instance.local_date, xp_gained=instance.points, action_count=1)
+
+
+@receiver(post_save, sender=Action)
+def record_streak(sender, instance, created, **kwargs):
+    """Prolonge (ou redémarre) la streak de l'utilisateur"""
+    if created:
+        from .summaries import record_active_day
+        record_active_day(instance.user_id, instance.local_date)
+
+
+@receiver(pre_save, sender=ActivityEvaluation)
+@receiver(pre_save, sender=EvaluationTraitLink)
+@receiver(pre_save, sender=StudySession)
+def remember_stored_row(sender, instance, update_fields=None, **kwargs):
+    """Garde la ligne enregistrée avant une modification : post_save en retire la contribution"""
+    from .summaries import TRACKED_FIELDS
+    instance._stored_row = None
+    if instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None:
+        updated = {sender._meta.get_field(name).attname for name in update_fields}
+        if updated.isdisjoint(TRACKED_FIELDS[sender]):
+            return
+    instance._stored_row = sender.objects.filter(pk=instance.pk).first()
+
+
+def _stored_if_changed(instance):
+    """Ligne enregistrée avant la modification, si celle-ci change la contribution aux compteurs"""
+    from .summaries import changed
+    stored = getattr(instance, '_stored_row', None)
+    return stored if stored is not None and changed(stored, instance) else None
+
+
+@receiver(post_save, sender=ActivityEvaluation)
+def summary_add_evaluation(sender, instance, created, **kwargs):
+    """Ajoute une nouvelle évaluation au résumé ; une modification y remplace l'ancienne contribution"""
+    from .summaries import add_evaluation
+    stored = None if created else _stored_if_changed(instance)
+    if stored is not None:
+        add_evaluation(stored, sign=-1)
+    if created or stored is not None:
+        add_evaluation(instance)
+
+
+@receiver(post_delete, sender=ActivityEvaluation)
+def summary_remove_evaluation(sender, instance, **kwargs):
+    from .summaries import add_evaluation
+    add_evaluation(instance, sign=-1)
+
+
+@receiver(post_save, sender=EvaluationTraitLink)
+def summary_add_trait_link(sender, instance, created, **kwargs):
+    """Ajoute les HP d'un lien créé ou modifié hors award_traits (admin, API) au total des évaluations"""
+    from .summaries import add_trait_link
+    stored = None if created else _stored_if_changed(instance)
+    if stored is not None:
+        add_trait_link(stored, sign=-1)
+    if created or stored is not None:
+        add_trait_link(instance)
+
+
+@receiver(post_delete, sender=EvaluationTraitLink)
+def summary_remove_trait_link(sender, instance, **kwargs):
+    from .summaries import add_trait_link
+    add_trait_link(instance, sign=-1)
+
+
+@receiver(post_save, sender=StudySession)
+def summary_add_study_session(sender, instance, created, **kwargs):
+    """Ajoute une nouvelle session d'étude au résumé ; une modification y remplace l'ancienne contribution"""
+    from .summaries import add_study_session
+    stored = None if created else _stored_if_changed(instance)
+    if stored is not None:
+        add_study_session(stored, sign=-1)
+    if created or stored is not None:
+        add_study_session(instance)
+
+
+@receiver(post_delete, sender=StudySession)
+def summary_remove_study_session(sender, instance, **kwargs):
+    from .summaries import add_study_session
+    add_study_session(instance, sign=-1)
+
+
+@receiver(post_save, sender=StudySession)
+def record_daily_study(sender, instance, created, **kwargs):
+    """Ajoute les minutes d'une session au jour local de son début (déplacées si elle est modifiée)"""
+    from .rollups import add_daily
+    stored = None if created else _stored_if_changed(instance)
+    if stored is not None:
+        add_daily(stored.user_id, timezone.localdate(stored.started_at), create=False,
+                  study_minutes=-stored.duration_minutes)
+    if created or stored is not None:
+        add_daily(instance.user_id, timezone.localdate(instance.started_at), study_minutes=instance.duration_minutes)
+
+
+@receiver(post_delete, sender=StudySession)
+def remove_daily_study(sender, instance, **kwargs):
+    from .rollups import add_daily
+    add_daily(instance.user_id, timezone.localdate(instance.started_at), create=False,
+              study_minutes=-instance.duration_minutes)
+
+
+@receiver(post_save, sender=UserChallenge)
+def summary_refresh_challenges(sender, instance, **kwargs):
+    """Recompte les défis de l'utilisateur (création ou changement de statut)"""
+    from .summaries import refresh_challenges
+    refresh_challenges(instance.user_id)
+
+
+@receiver(post_delete, sender=UserChallenge)
+def summary_refresh_challenges_on_delete(sender, instance, **kwargs):
+    from .summaries import refresh_challenges
+    refresh_challenges(instance.user_id, create=False)
+
+
+@receiver(pre_save, sender=ActivityEvaluation)
+@receiver(pre_save, sender=UserPersonalityTrait)
+def stamp_change_seq(sender, instance, **kwargs):
+    """Estampille la ligne avec le prochain numéro de la séquence de changements de l'utilisateur"""
+    from .summaries import next_change_seq
+    instance.change_seq = next_change_seq(instance.user_id)
+
+
+@receiver(post_save, sender=EvaluationTraitLink)
+def restamp_evaluation(sender, instance, created, **kwargs):
+    """Un trait ajouté à une évaluation la fait réapparaître dans le prochain sync"""
+    from .summaries import next_change_seq
+    evaluation = instance.evaluation
+    ActivityEvaluation.objects.filter(pk=evaluation.pk).update(change_seq=next_change_seq(evaluation.user_id))
+
+
+@receiver(post_save, sender=PersonalityTrait)
+@receiver(post_delete, sender=PersonalityTrait)
+def invalidate_trait_catalog(sender, **kwargs):
+    """Recharge le catalogue des traits (tous process) une fois la modification validée"""
+    from .traits import catalog
+    transaction.on_commit(catalog.invalidate)
+
+
+@receiver(post_save, sender=Resource)
+@receiver(post_delete, sender=Resource)
+def invalidate_resource_counts(sender, **kwargs):
+    """Recalcule les compteurs du catalogue de ressources une fois la modification validée"""
+    from .resources import invalidate_counts
+    transaction.on_commit(invalidate_counts)
+
     
 class CheckedResource(models.Model):
     """Ressources cochées par l'utilisateur"""
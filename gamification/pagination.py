@@ -0,0 +1,38 @@
+import base64
+import json
+
+from django.conf import settings
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def page_size(request):
+    """✅ Taille de page demandée (?limit=), bornée par PAGINATION_SETTINGS"""
+    config = getattr(settings, 'PAGINATION_SETTINGS', {})
+    default = config.get('DEFAULT_PAGE_SIZE', 20)
+    maximum = config.get('MAX_PAGE_SIZE', 100)
+    try:
+        size = int(request.GET.get('limit', default))
+    except (TypeError, ValueError):
+        size = default
+    return min(max(size, 1), maximum)
+
+
+def encode_cursor(*values):
+    """Curseur opaque à partir des valeurs de tri du dernier élément d'une page"""
+    raw = json.dumps(values, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Valeurs de tri encodées dans un curseur (InvalidCursor si illisible)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(str(e))
+    if not isinstance(values, list):
+        raise InvalidCursor('cursor')
+    return values
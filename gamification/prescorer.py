@@ -0,0 +1,139 @@
+import re
+import unicodedata
+from collections import deque, namedtuple
+
+from .keywords import ARTEFACT_KEYWORDS, TRAIT_KEYWORDS, TRAITS
+
+# Résultat du pré-score : évaluation au format de ai.to_result + confiance entre 0 et 1
+Score = namedtuple('Score', ['result', 'confidence'])
+
+# XP de base d'une activité reconnue, avant les XP des traits détectés
+BASE_XP = 20
+
+# Mots « porteurs de sens » : au moins 4 caractères (hors nombres)
+CONTENT_WORD = re.compile(r'[^\W\d_]{4,}')
+# En deçà, la description est trop courte pour se passer du modèle (« peur » couvert à 100 %)
+MIN_CONTENT_WORDS = 3
+MIN_KEYWORDS = 2
+NUMBER_BEFORE = re.compile(r'(\d+)\s*$')
+# Négation (« je n'ai pas lu », « sans projet ») : les mots-clés ne disent plus ce qui a été fait
+NEGATION = re.compile(r"(?<!\w)(?:pas|jamais|aucune?|sans|n(?=['’\s]))(?!\w)")
+
+
+def fold(text):
+    """Minuscules sans accents, même longueur que la forme NFC (positions conservées)"""
+    text = unicodedata.normalize('NFC', text)
+    return ''.join(unicodedata.normalize('NFKD', char)[0].casefold()[:1] for char in text)
+
+
+class KeywordAutomaton:
+    """✅ Automate d'Aho-Corasick : toutes les occurrences de tous les mots-clés en une passe
+
+    Construit une fois au chargement du module (trie + liens d'échec). Une occurrence
+    n'est retenue qu'en début de mot ('lu' ne matche pas 'lumière', 'surmont' matche
+    'surmonté').
+    """
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for payload, pattern in patterns:
+            self._insert(fold(pattern), payload)
+        self._link()
+
+    def _insert(self, pattern, payload):
+        state = 0
+        for char in pattern:
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+        self.output[state].append((payload, len(pattern)))
+
+    def _link(self):
+        # Parcours en largeur : le lien d'échec d'un état pointe vers un état moins profond
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, target in self.goto[state].items():
+                queue.append(target)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[target] = self.goto[fallback].get(char, 0)
+                self.output[target] = self.output[target] + self.output[self.fail[target]]
+
+    def find(self, folded):
+        """Occurrences (payload, début, fin) dans un texte déjà passé par fold()"""
+        state = 0
+        for end, char in enumerate(folded, 1):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for payload, length in self.output[state]:
+                start = end - length
+                if start == 0 or not folded[start - 1].isalnum():
+                    yield payload, start, end
+
+
+AUTOMATON = KeywordAutomaton(
+    [(('trait', key), keyword) for key, keywords in TRAIT_KEYWORDS.items() for keyword in keywords]
+    + [(('artefact', key), keyword) for key, keywords in ARTEFACT_KEYWORDS.items() for keyword in keywords]
+)
+
+
+def score(description):
+    """✅ Estime traits et artéfacts d'une description par mots-clés (sans appel réseau)
+
+    La confiance est la part des mots porteurs de sens couverts par un mot-clé : une
+    description courte et entièrement reconnue (« 2 livres lus, 1 cours udemy ») est
+    sûre, un récit détaillé ne l'est pas et part au modèle. La confiance est nulle (le
+    modèle décide) pour une négation, moins de MIN_CONTENT_WORDS mots porteurs de sens,
+    moins de MIN_KEYWORDS mots-clés distincts ou un trait à HP négatifs.
+    """
+    folded = fold(description)
+    traits = {}
+    # Artéfact : somme des quantités explicites (« 2 livres »), sinon 1 s'il est mentionné
+    quantities = {key: 0 for key in ARTEFACT_KEYWORDS}
+    mentioned = set()
+    keywords = set()
+    covered = [False] * len(folded)
+
+    for (kind, key), start, end in AUTOMATON.find(folded):
+        covered[start:end] = [True] * (end - start)
+        keywords.add((kind, key))
+        if kind == 'trait':
+            traits.setdefault(key, folded[start:end])
+            continue
+        mentioned.add(key)
+        number = NUMBER_BEFORE.search(folded[max(0, start - 12):start])
+        if number:
+            quantities[key] += int(number.group(1))
+    detections = {key: quantity or int(key in mentioned) for key, quantity in quantities.items()}
+
+    words = list(CONTENT_WORD.finditer(folded))
+    matched = sum(1 for word in words if any(covered[word.start():word.end()]))
+    confidence = matched / len(words) if words else 0.0
+    if (len(words) < MIN_CONTENT_WORDS or len(keywords) < MIN_KEYWORDS or NEGATION.search(folded)
+            or any(TRAITS[key][2] < 0 for key in traits)):
+        confidence = 0.0
+
+    personality_traits = []
+    for key, keyword in traits.items():
+        name, _, hp_base, _ = TRAITS[key]
+        personality_traits.append({'name': name, 'hp_amount': hp_base, 'relevance': f'Mot-clé : {keyword}'})
+
+    total_xp = max(0, BASE_XP + sum(TRAITS[key][3] for key in traits))
+    result = {
+        'total_xp': total_xp,
+        'traits_hp': {trait['name']: trait['hp_amount'] for trait in personality_traits},
+        'personality_traits': personality_traits,
+        'detections': detections,
+        'quality_score': round(0.5 + 0.3 * confidence, 2),
+        'feedback': 'Activité reconnue par mots-clés',
+        'is_valid': True,
+    }
+    return Score(result, round(confidence, 3))
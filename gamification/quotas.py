@@ -0,0 +1,99 @@
+import json
+import math
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import JsonResponse
+
+from . import ai
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# Verrou d'un seau : durée de vie (s) et attente maximale avant de continuer sans lui
+LOCK_TIMEOUT = 2
+LOCK_WAIT = 0.05
+
+
+def parse_rate(rate):
+    """'30/hour' -> jetons rechargés par seconde (même syntaxe que les taux DRF)"""
+    count, period = rate.split('/')
+    return int(count) / PERIODS[period.strip()[0]]
+
+
+def _key(user_id):
+    return f'ai:quota:{user_id}'
+
+
+def _acquire(lock_key):
+    deadline = time.monotonic() + LOCK_WAIT
+    while not cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def consume(user_id, cost=1):
+    """✅ Retire `cost` jetons du seau de l'utilisateur ; retourne (accepté, retry_after en s)
+
+    Seau à jetons dans le cache par défaut (partagé entre workers) : USER_QUOTA_BURST
+    jetons au plus, rechargés au rythme USER_QUOTA_RATE. La mise à jour est protégée par
+    un verrou court (cache.add) ; s'il n'est pas obtenu à temps, elle se fait sans lui
+    plutôt que de bloquer la requête.
+    """
+    config = ai.ai_settings()
+    capacity = config.get('USER_QUOTA_BURST', 10)
+    refill = parse_rate(config.get('USER_QUOTA_RATE', '60/hour'))
+    key = _key(user_id)
+    # Une requête plus chère que le seau entier (gros lot) le vide au lieu d'être toujours refusée
+    cost = min(cost, capacity)
+
+    locked = _acquire(f'{key}:lock')
+    try:
+        now = time.time()
+        tokens, updated = cache.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + (now - updated) * refill)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        # Conservé jusqu'à ce que le seau soit de nouveau plein (inutile au-delà)
+        cache.set(key, (tokens, now), timeout=int((capacity - tokens) / refill) + 60)
+    finally:
+        if locked:
+            cache.delete(f'{key}:lock')
+
+    if allowed:
+        return True, 0
+    return False, max(1, math.ceil((cost - tokens) / refill))
+
+
+def ai_quota(cost=None):
+    """✅ Décorateur : quota d'évaluations IA par utilisateur (429 + Retry-After une fois épuisé)
+
+    `cost(data)` : nombre de jetons d'une requête d'après son corps JSON (1 par défaut),
+    par exemple le nombre de descriptions d'un lot.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            tokens = 1
+            if cost is not None:
+                try:
+                    tokens = max(1, cost(json.loads(request.body)))
+                except (ValueError, TypeError, AttributeError):
+                    pass
+
+            allowed, retry_after = consume(request.user.id, tokens)
+            if not allowed:
+                response = JsonResponse({
+                    'success': False,
+                    'error': "Quota d'évaluations IA atteint, réessayez plus tard",
+                    'retry_after': retry_after,
+                }, status=429)
+                response['Retry-After'] = str(retry_after)
+                return response
+            return view_func(request, *args, **kwargs)
+
+        return wrapper
+    return decorator
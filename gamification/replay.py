@@ -0,0 +1,152 @@
+import gzip
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from .fakeprovider import FakeProvider
+
+# Statuts injectés par le fournisseur de rejeu (erreurs transitoires du fournisseur réel)
+INJECTED_STATUSES = (429, 500, 503)
+
+
+def prompt_key(prompt):
+    return hashlib.sha256(prompt.encode()).hexdigest()
+
+
+class Cassette:
+    """✅ Enregistrements prompt / réponse du fournisseur IA, en JSON lines compressé (gzip)
+
+    Chaque ajout est un membre gzip de plus à la fin du fichier : l'enregistrement
+    peut se faire depuis plusieurs threads d'un même process sans réécrire le fichier.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, prompt, response, latency):
+        line = json.dumps({
+            'key': prompt_key(prompt),
+            'prompt': prompt,
+            'response': response,
+            'latency': round(latency, 4),
+            'recorded_at': time.time(),
+        }, ensure_ascii=False)
+        with self._lock, gzip.open(self.path, 'at', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+    def entries(self):
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def by_key(self):
+        """{clé du prompt: [enregistrements]} (plusieurs réponses possibles pour un même prompt)"""
+        grouped = {}
+        for entry in self.entries():
+            grouped.setdefault(entry['key'], []).append(entry)
+        return grouped
+
+
+_cassettes = {}
+_cassettes_lock = threading.Lock()
+
+
+def cassette(path):
+    """Cassette partagée du process pour ce chemin (un verrou d'écriture par fichier)"""
+    with _cassettes_lock:
+        return _cassettes.setdefault(path, Cassette(path))
+
+
+class ReplayProvider(FakeProvider):
+    """✅ Fournisseur local qui rejoue une cassette, avec latence et erreurs simulées
+
+    - `latency` : délai fixe (s) avant chaque réponse ; None = latence enregistrée
+    - `jitter` : délai aléatoire supplémentaire, entre 0 et `jitter` secondes
+    - `error_rate` : part des requêtes en erreur HTTP (429 / 500 / 503)
+    - `corrupt_rate` : part des réponses tronquées (JSON inexploitable)
+    Un prompt absent de la cassette donne un 404. Les réponses d'un même prompt sont
+    servies à tour de rôle ; `seed` rend le tirage des erreurs reproductible.
+    """
+
+    def __init__(self, cassette, address=('127.0.0.1', 0), latency=None, jitter=0.0, error_rate=0.0,
+                 corrupt_rate=0.0, seed=None, token_delay=0.0):
+        super().__init__(address, reply=None, token_delay=token_delay)
+        self.recordings = cassette.by_key()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.corrupt_rate = corrupt_rate
+        self.random = random.Random(seed)
+        self.served = Counter()
+        self._lock = threading.Lock()
+
+    def respond(self, prompt):
+        key = prompt_key(prompt)
+        recordings = self.recordings.get(key)
+        with self._lock:
+            draw, extra = self.random.random(), self.random.uniform(0, self.jitter)
+            status = self.random.choice(INJECTED_STATUSES)
+            entry = recordings[self.served[key] % len(recordings)] if recordings else None
+            self.served[key] += 1
+
+        time.sleep((entry['latency'] if entry and self.latency is None else self.latency or 0) + extra)
+        if entry is None:
+            return 404, 'Prompt absent de la cassette'
+        if draw < self.error_rate:
+            return status, 'Erreur injectée'
+        if draw < self.error_rate + self.corrupt_rate:
+            return 200, entry['response'][:len(entry['response']) // 2]
+        return 200, entry['response']
+
+
+# ==================== BENCHMARK ====================
+
+def percentile(values, fraction):
+    """Percentile au rang le plus proche (valeurs triées)"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))]
+
+
+def run_load(prompts, call, concurrency):
+    """✅ Exécute `call(prompt)` pour chaque prompt avec `concurrency` threads
+
+    Retourne débit, latences p50 / p95 (s) et taux d'échec : `parse_failures` pour les
+    réponses sans JSON exploitable (exceptions dont la classe s'appelle ParseError),
+    `errors` par message pour les autres échecs.
+    """
+    def timed(prompt):
+        started = time.perf_counter()
+        try:
+            call(prompt)
+            outcome = None
+        except Exception as e:
+            outcome = 'parse' if e.__class__.__name__ == 'ParseError' else str(e)
+        return time.perf_counter() - started, outcome
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, prompts))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in results)
+    outcomes = Counter(outcome for _, outcome in results if outcome is not None)
+    parse_failures = outcomes.pop('parse', 0)
+    total = len(results)
+    return {
+        'requests': total,
+        'concurrency': concurrency,
+        'elapsed': round(elapsed, 3),
+        'throughput': round(total / elapsed, 2) if elapsed else 0.0,
+        'p50': round(percentile(latencies, 0.50), 4),
+        'p95': round(percentile(latencies, 0.95), 4),
+        'parse_failures': parse_failures,
+        'parse_failure_rate': round(parse_failures / total, 4) if total else 0.0,
+        'error_rate': round(sum(outcomes.values()) / total, 4) if total else 0.0,
+        'errors': dict(outcomes),
+    }
@@ -0,0 +1,116 @@
+from django.core.cache import cache
+from django.db.models import CharField, Count, Exists, OuterRef, Q
+from django.db.models.functions import Cast
+
+from . import leveling, pagination
+from .models import CheckedResource, Resource
+
+FIELDS = ('id', 'titre', 'auteur', 'type', 'domaine', 'description', 'niveau', 'url', 'image')
+
+# Libellé affiché -> valeur stockée ('Film/Série' -> 'FilmSérie') : le filtre accepte les deux
+TYPE_BY_LABEL = {label: value for value, label in Resource.TYPES}
+TYPES = set(TYPE_BY_LABEL.values())
+
+LEVEL_COUNTS_KEY = 'resources:level_counts'
+LEVEL_COUNTS_TTL = 300
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'off'}
+
+
+def _flag(params, name):
+    """Filtre à trois états : True, False, ou None si le paramètre est absent"""
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    value = value.lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f'{name} invalide')
+
+
+def filtered(user, user_level, params):
+    """✅ Ressources actives filtrées, annotées de `is_checked` (ValueError si un filtre est invalide)
+
+    Filtres : type (valeur ou libellé), domaine, galaxy, unlocked (true : niveau <= user_level,
+    false : verrouillées), checked (true : cochées par l'utilisateur, false : non cochées).
+    """
+    checked = CheckedResource.objects.filter(user=user, resource_id=Cast(OuterRef('pk'), CharField()))
+    resources = Resource.objects.filter(is_active=True).annotate(is_checked=Exists(checked))
+
+    resource_type = params.get('type')
+    if resource_type:
+        resource_type = TYPE_BY_LABEL.get(resource_type, resource_type)
+        if resource_type not in TYPES:
+            raise ValueError('type invalide')
+        resources = resources.filter(type=resource_type)
+
+    if params.get('domaine'):
+        resources = resources.filter(domaine=params['domaine'])
+
+    if params.get('galaxy'):
+        try:
+            galaxy = int(params['galaxy'])
+        except ValueError:
+            raise ValueError('galaxy invalide')
+        if not 1 <= galaxy <= leveling.galaxy(leveling.MAX_LEVEL):
+            raise ValueError('galaxy invalide')
+        first, last = leveling.galaxy_levels(galaxy)
+        resources = resources.filter(niveau__gte=first, niveau__lte=last)
+
+    unlocked = _flag(params, 'unlocked')
+    if unlocked is not None:
+        resources = resources.filter(niveau__lte=user_level) if unlocked else resources.filter(niveau__gt=user_level)
+
+    checked_only = _flag(params, 'checked')
+    if checked_only is not None:
+        resources = resources.filter(is_checked=checked_only)
+
+    return resources
+
+
+def page(resources, cursor, limit):
+    """✅ Une page triée par (niveau, id) après `cursor` : (lignes, curseur suivant ou None)
+
+    Pagination par clé (keyset) : la requête ne lit que `limit + 1` lignes de l'index quelle
+    que soit la position dans le catalogue (pas d'OFFSET). InvalidCursor si le curseur est illisible.
+    """
+    resources = resources.order_by('niveau', 'id')
+    if cursor:
+        try:
+            niveau, resource_id = (int(value) for value in pagination.decode_cursor(cursor))
+        except (TypeError, ValueError):
+            raise pagination.InvalidCursor(cursor)
+        resources = resources.filter(Q(niveau__gt=niveau) | Q(niveau=niveau, id__gt=resource_id))
+
+    rows = list(resources.values(*FIELDS, 'is_checked')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = pagination.encode_cursor(rows[-1]['niveau'], rows[-1]['id']) if has_more else None
+    return rows, next_cursor
+
+
+def level_counts():
+    """{niveau: nombre de ressources actives} (au plus 1000 entrées, en cache)"""
+    counts = cache.get(LEVEL_COUNTS_KEY)
+    if counts is None:
+        counts = dict(
+            Resource.objects.filter(is_active=True).order_by().values_list('niveau').annotate(n=Count('id'))
+        )
+        cache.set(LEVEL_COUNTS_KEY, counts, timeout=LEVEL_COUNTS_TTL)
+    return counts
+
+
+def invalidate_counts():
+    cache.delete(LEVEL_COUNTS_KEY)
+
+
+def counts(user_level):
+    """Ressources débloquées pour ce niveau / total du catalogue, sans parcourir le catalogue"""
+    by_level = level_counts()
+    return {
+        'unlocked': sum(n for niveau, n in by_level.items() if niveau <= user_level),
+        'total': sum(by_level.values()),
+    }
@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from .models import UserDailyStats
+
+DAILY_FIELDS = ('xp_gained', 'hp_gained', 'action_count', 'study_minutes')
+
+PERIODS = {
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+# Au-delà, une série jour par jour devient illisible et coûteuse à sérialiser
+MAX_SERIES_DAYS = 3 * 366
+
+
+def add_daily(user_id, day, create=True, **deltas):
+    """✅ Incrémente atomiquement les compteurs du jour (UPDATE, sinon INSERT)
+
+    create=False pour les suppressions (cascade d'un utilisateur : pas de nouvelle ligne).
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    increments = {field: F(field) + delta for field, delta in deltas.items()}
+    if UserDailyStats.objects.filter(user_id=user_id, day=day).update(**increments) or not create:
+        return
+    try:
+        with transaction.atomic():
+            UserDailyStats.objects.create(user_id=user_id, day=day, **deltas)
+    except IntegrityError:
+        # Une requête concurrente a créé la ligne entre-temps
+        UserDailyStats.objects.filter(user_id=user_id, day=day).update(**increments)
+
+
+def _empty(day):
+    return {'date': day.isoformat(), **{field: 0 for field in DAILY_FIELDS}}
+
+
+def daily(user_id, start, end):
+    """✅ Compteurs jour par jour de start à end inclus (jours sans activité à zéro)
+
+    Un seul parcours de l'index (user, day) ; les jours manquants sont complétés ici.
+    """
+    rows = {
+        row['day']: row
+        for row in UserDailyStats.objects.filter(user_id=user_id, day__range=(start, end))
+        .order_by().values('day', *DAILY_FIELDS)
+    }
+    result = []
+    day = start
+    while day <= end:
+        entry = _empty(day)
+        row = rows.get(day)
+        if row:
+            entry.update({field: row[field] for field in DAILY_FIELDS})
+        result.append(entry)
+        day += timedelta(days=1)
+    return result
+
+
+def series(user_id, start, end, period='day'):
+    """✅ Série 'day', 'week' (semaines ISO, lundi) ou 'month' de start à end inclus
+
+    Les regroupements semaine / mois sont faits par la base sur la même plage d'index.
+    """
+    if period == 'day':
+        return daily(user_id, start, end)
+
+    trunc = PERIODS[period]
+    rows = (
+        UserDailyStats.objects.filter(user_id=user_id, day__range=(start, end))
+        .annotate(bucket=trunc('day')).values('bucket')
+        .annotate(**{field: Sum(field) for field in DAILY_FIELDS})
+        .order_by('bucket')
+    )
+    totals = {row['bucket']: row for row in rows}
+
+    result = []
+    bucket = _bucket_start(start, period)
+    while bucket <= end:
+        entry = _empty(bucket)
+        row = totals.get(bucket)
+        if row:
+            entry.update({field: row[field] or 0 for field in DAILY_FIELDS})
+        result.append(entry)
+        bucket = _next_bucket(bucket, period)
+    return result
+
+
+def _bucket_start(day, period):
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def _next_bucket(bucket, period):
+    if period == 'week':
+        return bucket + timedelta(days=7)
+    return (bucket.replace(day=28) + timedelta(days=4)).replace(day=1)
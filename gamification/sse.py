@@ -0,0 +1,33 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+
+def event(name, data):
+    """Un événement Server-Sent Events (données en JSON)"""
+    return f'event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+
+async def _iterate_async(iterator):
+    # Chaque next() du générateur synchrone (appels réseau bloquants) tourne hors de la boucle
+    step = sync_to_async(next, thread_sensitive=False)
+    try:
+        while True:
+            item = await step(iterator, None)
+            if item is None:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close:
+            await sync_to_async(close, thread_sensitive=False)()
+
+
+def stream_for(request, iterator):
+    """✅ Contenu d'une StreamingHttpResponse transmis au fil de l'eau, en WSGI comme en ASGI
+
+    Django bufferise un itérateur synchrone servi en ASGI (et inversement) : en ASGI,
+    le générateur est donc exposé comme itérateur asynchrone.
+    """
+    return _iterate_async(iterator) if isinstance(request, ASGIRequest) else iterator
@@ -0,0 +1,247 @@
+from datetime import timedelta
+from itertools import groupby
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from .models import (
+    Action, ActivityEvaluation, EvaluationTraitLink, LeaderboardEntry, StudySession, UserChallenge,
+    UserPersonalityTrait, UserSummary
+)
+
+DETECTION_FIELDS = (
+    'books_read', 'academic_articles', 'projects_worked',
+    'online_courses', 'social_contributions', 'networking_events',
+)
+
+COUNTER_FIELDS = DETECTION_FIELDS + (
+    'evaluations_count', 'evaluations_xp', 'evaluations_hp', 'active_challenges', 'completed_challenges',
+    'study_sessions_count', 'study_minutes',
+)
+
+STREAK_FIELDS = ('current_streak', 'longest_streak', 'last_active_day')
+
+# Champs dont dépend la contribution d'une ligne au résumé : une modification qui les
+# touche retire l'ancienne contribution puis ajoute la nouvelle
+TRACKED_FIELDS = {
+    ActivityEvaluation: ('user_id', 'xp_awarded') + DETECTION_FIELDS,
+    EvaluationTraitLink: ('evaluation_id', 'hp_awarded'),
+    StudySession: ('user_id', 'duration_minutes', 'started_at'),
+}
+
+
+def add(user_id, create=True, **deltas):
+    """✅ Incrémente atomiquement des compteurs du résumé (UPDATE, sinon INSERT)
+
+    create=False pour les suppressions : l'utilisateur peut être en cours de suppression
+    (cascade), on ne recrée donc jamais de résumé dans ce cas.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    increments = {field: F(field) + delta for field, delta in deltas.items()}
+    if UserSummary.objects.filter(user_id=user_id).update(**increments) or not create:
+        return
+    try:
+        with transaction.atomic():
+            # Première écriture : on part des valeurs réelles (delta déjà inclus)
+            UserSummary.objects.create(user_id=user_id, **compute(user_id))
+    except IntegrityError:
+        UserSummary.objects.filter(user_id=user_id).update(**increments)
+
+
+def add_evaluation(evaluation, sign=1):
+    """Ajoute (ou retire, sign=-1) une évaluation et ses détections au résumé"""
+    deltas = {field: sign * (getattr(evaluation, field) or 0) for field in DETECTION_FIELDS}
+    add(evaluation.user_id, create=sign > 0, evaluations_count=sign,
+        evaluations_xp=sign * (evaluation.xp_awarded or 0), **deltas)
+
+
+def add_trait_link(link, sign=1):
+    """Ajoute (ou retire, sign=-1) les HP d'un lien évaluation / trait au résumé"""
+    user_id = ActivityEvaluation.objects.filter(pk=link.evaluation_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        add(user_id, create=sign > 0, evaluations_hp=sign * (link.hp_awarded or 0))
+
+
+def add_study_session(session, sign=1):
+    """Ajoute (ou retire, sign=-1) une session d'étude au résumé"""
+    add(session.user_id, create=sign > 0, study_sessions_count=sign,
+        study_minutes=sign * (session.duration_minutes or 0))
+
+
+def changed(old, new):
+    """La modification de `new` (ligne enregistrée : `old`) change-t-elle sa contribution ?"""
+    return any(getattr(old, field) != getattr(new, field) for field in TRACKED_FIELDS[type(new)])
+
+
+def refresh_challenges(user_id, create=True):
+    """Recompte les défis actifs / terminés (le statut change en place, pas de delta fiable)"""
+    counts = _challenge_counts(UserChallenge.objects.filter(user_id=user_id))
+    if not UserSummary.objects.filter(user_id=user_id).update(**counts) and create:
+        get_summary(user_id)
+
+
+def record_active_day(user_id, day):
+    """✅ Prolonge la streak si `day` suit le dernier jour actif, la redémarre sinon
+
+    Un seul UPDATE conditionnel : rien n'est écrit pour une deuxième action le même
+    jour. Une action antidatée (jour antérieur au dernier jour actif) n'est pas prise
+    en compte ici ; `reconcile_summaries` recalcule alors la streak depuis Action.local_date.
+    """
+    streak = Case(
+        When(last_active_day=day - timedelta(days=1), then=F('current_streak') + 1),
+        default=Value(1),
+    )
+    updated = UserSummary.objects.filter(
+        Q(last_active_day__isnull=True) | Q(last_active_day__lt=day), user_id=user_id
+    ).update(current_streak=streak, longest_streak=Greatest('longest_streak', streak), last_active_day=day)
+    if not updated and not UserSummary.objects.filter(user_id=user_id).exists():
+        # Premier passage : l'action est déjà en base, compute() l'inclut
+        get_summary(user_id)
+
+
+def compute_streak(days):
+    """{current_streak, longest_streak, last_active_day} pour une liste de jours triée (doublons permis)"""
+    current = longest = 0
+    previous = None
+    for day in days:
+        if day == previous:
+            continue
+        current = current + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+        longest = max(longest, current)
+        previous = day
+    return {'current_streak': current, 'longest_streak': longest, 'last_active_day': previous}
+
+
+def _active_days(queryset):
+    return queryset.values_list('local_date', flat=True).distinct().order_by('local_date')
+
+
+def get_summary(user_id):
+    """✅ Résumé d'un utilisateur, calculé depuis l'historique s'il n'existe pas encore"""
+    summary = UserSummary.objects.filter(user_id=user_id).first()
+    if summary is not None:
+        return summary
+    try:
+        with transaction.atomic():
+            return UserSummary.objects.create(user_id=user_id, **compute(user_id))
+    except IntegrityError:
+        return UserSummary.objects.get(user_id=user_id)
+
+
+def next_change_seq(user_id):
+    """✅ Incrémente et retourne la séquence de changements de l'utilisateur
+
+    L'UPDATE verrouille la ligne du résumé jusqu'à la fin de la transaction : deux
+    écritures concurrentes ne peuvent pas obtenir le même numéro.
+    """
+    with transaction.atomic():
+        if not UserSummary.objects.filter(user_id=user_id).update(change_seq=F('change_seq') + 1):
+            get_summary(user_id)
+            UserSummary.objects.filter(user_id=user_id).update(change_seq=F('change_seq') + 1)
+        return UserSummary.objects.filter(user_id=user_id).values_list('change_seq', flat=True).get()
+
+
+def _challenge_counts(queryset):
+    return queryset.aggregate(
+        active_challenges=Count('id', filter=Q(status='active')),
+        completed_challenges=Count('id', filter=Q(status='completed')),
+    )
+
+
+def compute(user_id):
+    """Valeurs exactes des compteurs, recalculées depuis les tables brutes"""
+    evaluations = ActivityEvaluation.objects.filter(user_id=user_id).aggregate(
+        evaluations_count=Count('id'), evaluations_xp=Sum('xp_awarded'),
+        **{field: Sum(field) for field in DETECTION_FIELDS}
+    )
+    evaluations.update(EvaluationTraitLink.objects.filter(evaluation__user_id=user_id).aggregate(
+        evaluations_hp=Sum('hp_awarded')
+    ))
+    sessions = StudySession.objects.filter(user_id=user_id).aggregate(
+        study_sessions_count=Count('id'), study_minutes=Sum('duration_minutes')
+    )
+    values = {**evaluations, **sessions, **_challenge_counts(UserChallenge.objects.filter(user_id=user_id))}
+    return {
+        **{field: values[field] or 0 for field in COUNTER_FIELDS},
+        **compute_streak(_active_days(Action.objects.filter(user_id=user_id))),
+    }
+
+
+def _grouped(queryset, **aggregates):
+    return {row.pop('user_id'): row for row in queryset.values('user_id').annotate(**aggregates).order_by()}
+
+
+def reconcile(dry_run=False):
+    """✅ Compare résumés et HP du classement à l'historique, corrige les écarts
+
+    Une agrégation groupée par table pour tous les utilisateurs, puis bulk_update des
+    seules lignes en écart. Retourne (résumés corrigés, résumés créés, entrées HP corrigées).
+    """
+    evaluations = _grouped(ActivityEvaluation.objects.all(), evaluations_count=Count('id'),
+                           evaluations_xp=Sum('xp_awarded'), **{field: Sum(field) for field in DETECTION_FIELDS})
+    trait_hp = {
+        row['user_id']: {'evaluations_hp': row['evaluations_hp']}
+        for row in EvaluationTraitLink.objects.values(user_id=F('evaluation__user_id'))
+        .annotate(evaluations_hp=Sum('hp_awarded')).order_by()
+    }
+    sessions = _grouped(StudySession.objects.all(), study_sessions_count=Count('id'),
+                        study_minutes=Sum('duration_minutes'))
+    challenges = _grouped(UserChallenge.objects.all(),
+                          active_challenges=Count('id', filter=Q(status='active')),
+                          completed_challenges=Count('id', filter=Q(status='completed')))
+
+    active_days = (
+        Action.objects.values_list('user_id', 'local_date').distinct().order_by('user_id', 'local_date')
+    )
+    streaks = {
+        user_id: compute_streak(day for _, day in rows)
+        for user_id, rows in groupby(active_days.iterator(), key=lambda row: row[0])
+    }
+
+    expected = {}
+    for source in (evaluations, trait_hp, sessions, challenges, streaks):
+        for user_id, values in source.items():
+            expected.setdefault(user_id, {}).update(values)
+
+    summaries = {summary.user_id: summary for summary in UserSummary.objects.all()}
+    drifted, missing = [], []
+
+    for user_id, summary in summaries.items():
+        values = expected.get(user_id, {})
+        changed = False
+        for field in COUNTER_FIELDS + STREAK_FIELDS:
+            value = values.get(field) or (None if field == 'last_active_day' else 0)
+            if getattr(summary, field) != value:
+                setattr(summary, field, value)
+                changed = True
+        if changed:
+            drifted.append(summary)
+
+    for user_id, values in expected.items():
+        if user_id not in summaries:
+            missing.append(UserSummary(
+                user_id=user_id,
+                **{f: values.get(f) or 0 for f in COUNTER_FIELDS},
+                **{f: values[f] for f in STREAK_FIELDS if f in values},
+            ))
+
+    hp_by_user = dict(
+        UserPersonalityTrait.objects.values('user_id').annotate(total=Sum('hp')).order_by().values_list('user_id', 'total')
+    )
+    hp_drifted = []
+    for entry in LeaderboardEntry.objects.only('id', 'user_id', 'total_hp'):
+        total = hp_by_user.get(entry.user_id) or 0
+        if entry.total_hp != total:
+            entry.total_hp = total
+            hp_drifted.append(entry)
+
+    if not dry_run:
+        with transaction.atomic():
+            UserSummary.objects.bulk_update(drifted, COUNTER_FIELDS + STREAK_FIELDS, batch_size=1000)
+            UserSummary.objects.bulk_create(missing, batch_size=1000, ignore_conflicts=True)
+            LeaderboardEntry.objects.bulk_update(hp_drifted, ['total_hp'], batch_size=1000)
+
+    return len(drifted), len(missing), len(hp_drifted)
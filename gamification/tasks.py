@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from . import jobs
+
+
+@shared_task(ignore_result=True)
+def evaluate_activity(job_id, description):
+    """Évaluation IA exécutée par un worker Celery (état du job dans le cache)"""
+    jobs.run(job_id, description)
@@ -1,7 +1,31 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+
+import requests
+from asgiref.sync import sync_to_async
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
-from .models import Achievement, Challenge
+from django.utils import timezone
+from .models import (
+    Achievement, Challenge, LeaderboardEntry, LevelHistogram, Action, UserDailyStats, UserProfile,
+    ActivityEvaluation, CheckedResource, EvaluationTraitLink, PersonalityTrait, Resource, StudySession, UserChallenge,
+    UserSummary, UserPersonalityTrait
+)
 from .services import check_achievements
+from . import (
+    ai, awards, fakeprovider, jobs, leaderboard, leveling, llm, prescorer, quotas, replay, resources, summaries,
+    traits, usercache
+)
+from .fakeprovider import FakeProvider
 
 
 class AchievementTestCase(TestCase):
@@ -30,3 +54,1046 @@ class AchievementTestCase(TestCase):
         self.assertTrue(
             profile.achievements.filter(achievement=self.achievement).exists()
         )
+
+
+class LeaderboardEntryTestCase(TestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'player{i}', password='testpass123')
+            for i in range(3)
+        ]
+        for i, user in enumerate(self.users):
+            profile = user.gamification_profile
+            profile.experience_points = (i + 1) * 100
+            profile.save()
+
+    def test_entry_follows_profile(self):
+        """L'entrée de classement suit l'XP du profil"""
+        entry = LeaderboardEntry.objects.get(user=self.users[0])
+        self.assertEqual(entry.experience_points, 100)
+
+    def test_add_hp(self):
+        """Les HP sont incrémentés sans relire les traits"""
+        leaderboard.add_hp(self.users[1], 40)
+        leaderboard.add_hp(self.users[1], 2)
+        self.assertEqual(LeaderboardEntry.objects.get(user=self.users[1]).total_hp, 42)
+
+    def test_get_leaderboard_single_query(self):
+        """Le top N coûte une seule requête"""
+        leaderboard.add_hp(self.users[2], 15)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/leaderboard/')
+        data = response.json()
+        self.assertEqual([row['username'] for row in data], ['player2', 'player1', 'player0'])
+        self.assertEqual(data[0]['total_hp'], 15)
+
+
+class WindowLeaderboardTestCase(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        today = timezone.localdate()
+        UserDailyStats.objects.create(user=self.alice, day=today - timedelta(days=10), xp_gained=500)
+        UserDailyStats.objects.create(user=self.alice, day=today, xp_gained=20)
+        Action.objects.create(user=self.bob, action_type='day_validated', points=100)
+
+    def test_action_feeds_daily_bucket(self):
+        """Une action alimente le compteur du jour"""
+        stats = UserDailyStats.objects.get(user=self.bob, day=timezone.localdate())
+        self.assertEqual(stats.xp_gained, 100)
+
+    def test_window_lengths(self):
+        """La même table sert les fenêtres de 7 et 30 jours"""
+        weekly = self.client.get('/api/leaderboard/weekly/').json()
+        self.assertEqual([(r['username'], r['weekly_points']) for r in weekly], [('bob', 100), ('alice', 20)])
+
+        monthly = self.client.get('/api/leaderboard/monthly/').json()
+        self.assertEqual([(r['username'], r['monthly_points']) for r in monthly], [('alice', 520), ('bob', 100)])
+
+        custom = self.client.get('/api/leaderboard/window/', {'days': 1}).json()
+        self.assertEqual(custom[0]['points'], 100)
+
+
+class UserRankTestCase(TestCase):
+    def setUp(self):
+        self.users = []
+        for username, xp, level in [('a', 50, 1), ('b', 80, 1), ('c', 150, 2), ('d', 900, 4)]:
+            user = User.objects.create_user(username=username, password='testpass123')
+            profile = user.gamification_profile
+            profile.experience_points = xp
+            profile.level = level
+            profile.save()
+            self.users.append(user)
+
+    def test_histogram_follows_levels(self):
+        """L'histogramme suit les changements de niveau"""
+        self.assertEqual(dict(LevelHistogram.objects.values_list('level', 'users')), {1: 2, 2: 1, 4: 1})
+
+    def test_exact_rank(self):
+        """Le rang exact correspond au comptage des joueurs devant"""
+        rank = leaderboard.user_rank(self.users[0], approximate=False)
+        self.assertEqual((rank['rank'], rank['total_users']), (4, 4))
+        self.assertEqual(leaderboard.user_rank(self.users[1], approximate=False)['rank'], 3)
+        self.assertEqual(leaderboard.user_rank(self.users[3], approximate=False)['rank'], 1)
+
+    def test_approximate_rank(self):
+        """Le mode approché reste dans le bon niveau sans comptage"""
+        with self.assertNumQueries(2):
+            rank = leaderboard.user_rank(self.users[2], approximate=True)
+        self.assertEqual(rank['rank'], 2)
+        self.assertTrue(rank['approximate'])
+
+    def test_deleted_user_leaves_histogram(self):
+        """Supprimer un joueur le retire de l'histogramme"""
+        self.users[3].delete()
+        self.assertEqual(leaderboard.user_rank(self.users[2])['total_users'], 3)
+
+
+class LevelingTestCase(TestCase):
+    @staticmethod
+    def loop_level(total_xp):
+        """Ancienne implémentation itérative, conservée comme référence"""
+        level = 1
+        cumulative_xp = 0
+        while True:
+            xp_for_next = level * (level + 1) * 50
+            if cumulative_xp + xp_for_next > total_xp:
+                break
+            cumulative_xp += xp_for_next
+            level += 1
+        return min(level, 1000)
+
+    def test_matches_loop(self):
+        """La recherche dichotomique donne le même niveau que la boucle"""
+        samples = list(range(0, 2000, 7)) + [leveling.xp_for_level(l) + d for l in (2, 10, 500, 999, 1000) for d in (-1, 0, 1)]
+        samples.append(10 ** 12)
+        for xp in samples:
+            self.assertEqual(leveling.level_for_xp(xp), self.loop_level(xp), xp)
+
+    def test_progress(self):
+        """XP restante, galaxie et niveau dans la galaxie"""
+        progress = leveling.level_progress(leveling.xp_for_level(101) + 5)
+        self.assertEqual(progress['level'], 101)
+        self.assertEqual((progress['galaxy'], progress['level_in_galaxy']), (2, 1))
+        self.assertEqual(progress['xp_to_next_level'], 101 * 102 * 50 - 5)
+        self.assertEqual(leveling.xp_to_next_level(10 ** 12), 0)
+
+
+class RelevelProfilesTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='releveled', password='testpass123')
+        profile = self.user.gamification_profile
+        profile.experience_points = leveling.xp_for_level(150)
+        profile.level = 150
+        profile.save()
+        # Niveau obsolète (ancienne courbe) écrit directement en base
+        UserProfile.objects.filter(pk=profile.pk).update(level=50)
+        LeaderboardEntry.objects.filter(user=self.user).update(level=50)
+
+    def test_dry_run_reports_galaxy_changes(self):
+        """Le dry-run compte les changements de galaxie sans rien écrire"""
+        out = StringIO()
+        call_command('relevel_profiles', '--dry-run', stdout=out)
+        self.assertIn('Changements de galaxie: 1 (montée: 1, descente: 0)', out.getvalue())
+        self.assertEqual(UserProfile.objects.get(user=self.user).level, 50)
+
+    def test_relevel_writes_levels(self):
+        """Profil, entrée de classement et histogramme sont re-nivelés, cache utilisateur invalidé"""
+        version = usercache.user_version(self.user.id)
+        call_command('relevel_profiles', '--chunk-size', '1', stdout=StringIO())
+        self.assertNotEqual(usercache.user_version(self.user.id), version)
+        self.assertEqual(UserProfile.objects.get(user=self.user).level, 150)
+        self.assertEqual(LeaderboardEntry.objects.get(user=self.user).level, 150)
+        self.assertEqual(LevelHistogram.objects.get(level=150).users, 1)
+
+
+class UserDataEvaluationsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='testpass123')
+        traits = [PersonalityTrait.objects.create(name=f'Trait {i}') for i in range(2)]
+        for i in range(5):
+            evaluation = ActivityEvaluation.objects.create(
+                user=self.user, description=f'Activité {i}', ai_feedback='ok', books_read=1, projects_worked=i,
+                xp_awarded=10
+            )
+            for trait in traits:
+                EvaluationTraitLink.objects.create(evaluation=evaluation, trait=trait, hp_awarded=5, relevance='-')
+        self.client.login(username='reader', password='testpass123')
+
+    def test_cursor_pagination(self):
+        """Les pages s'enchaînent par curseur et les détections couvrent tout l'historique"""
+        first = self.client.get('/api/get-user-data/', {'limit': 3}).json()
+        self.assertEqual(first['evaluationsCount'], 5)
+        self.assertEqual(first['detections']['booksRead'], 5)
+        self.assertEqual(first['detections']['projectsWorked'], 10)
+        self.assertEqual((first['evaluationsXP'], first['evaluationsHP']), (50, 50))
+        self.assertEqual(len(first['evaluations']), 3)
+        self.assertEqual(len(first['evaluations'][0]['traits']), 2)
+
+        second = self.client.get('/api/get-user-data/', {'limit': 3, 'cursor': first['evaluationsNextCursor']}).json()
+        self.assertEqual(len(second['evaluations']), 2)
+        self.assertIsNone(second['evaluationsNextCursor'])
+        ids = [e['id'] for e in first['evaluations'] + second['evaluations']]
+        self.assertEqual(len(set(ids)), 5)
+
+    def test_query_count_independent_of_page(self):
+        """Le nombre de requêtes ne dépend pas du nombre d'évaluations"""
+        self.client.get('/api/get-user-data/')
+        with self.assertNumQueries(7):
+            self.client.get('/api/get-user-data/', {'limit': 5})
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/get-user-data/', {'cursor': 'nope'})
+        self.assertEqual(response.status_code, 400)
+
+
+class UserSummaryTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='summarized', password='testpass123')
+        self.challenge = Challenge.objects.create(
+            title='Défi', description='-', challenge_type='daily', difficulty='easy',
+            target_value=1, start_date=timezone.now(), end_date=timezone.now() + timedelta(days=1)
+        )
+
+    def test_counters_follow_writes(self):
+        """Évaluations, sessions et défis mettent le résumé à jour à l'écriture"""
+        evaluation = ActivityEvaluation.objects.create(user=self.user, description='-', ai_feedback='-',
+                                                       books_read=2, networking_events=1)
+        StudySession.objects.create(user=self.user, title='Maths', duration_minutes=45, started_at=timezone.now())
+        user_challenge = UserChallenge.objects.create(user=self.user, challenge=self.challenge)
+
+        summary = UserSummary.objects.get(user=self.user)
+        self.assertEqual((summary.evaluations_count, summary.books_read, summary.networking_events), (1, 2, 1))
+        self.assertEqual((summary.study_sessions_count, summary.study_minutes), (1, 45))
+        self.assertEqual((summary.active_challenges, summary.completed_challenges), (1, 0))
+
+        user_challenge.status = 'completed'
+        user_challenge.save()
+        evaluation.delete()
+        summary.refresh_from_db()
+        self.assertEqual((summary.active_challenges, summary.completed_challenges), (0, 1))
+        self.assertEqual((summary.evaluations_count, summary.books_read), (0, 0))
+
+    def test_updates_replace_the_stored_contribution(self):
+        """Une évaluation ou une session modifiée remplace sa contribution, même après un changement d'utilisateur"""
+        other = User.objects.create_user(username='other', password='testpass123')
+        evaluation = ActivityEvaluation.objects.create(user=self.user, description='-', ai_feedback='-',
+                                                       books_read=1, xp_awarded=10)
+        session = StudySession.objects.create(user=self.user, title='Maths', duration_minutes=30,
+                                              started_at=timezone.now())
+
+        evaluation.books_read, evaluation.xp_awarded = 3, 25
+        evaluation.save()
+        session.duration_minutes = 50
+        session.save()
+        summary = UserSummary.objects.get(user=self.user)
+        self.assertEqual((summary.evaluations_count, summary.books_read, summary.evaluations_xp), (1, 3, 25))
+        self.assertEqual((summary.study_sessions_count, summary.study_minutes), (1, 50))
+        self.assertEqual(UserDailyStats.objects.get(user=self.user).study_minutes, 50)
+
+        session.user = other
+        session.save()
+        summary.refresh_from_db()
+        self.assertEqual((summary.study_sessions_count, summary.study_minutes), (0, 0))
+        self.assertEqual(UserSummary.objects.get(user=other).study_minutes, 50)
+        self.assertEqual(UserDailyStats.objects.get(user=other).study_minutes, 50)
+        self.assertEqual(summaries.reconcile(dry_run=True), (0, 0, 0))
+
+    def test_evaluation_totals(self):
+        """XP et HP des évaluations suivent award_traits et les suppressions"""
+        evaluation = ActivityEvaluation.objects.create(user=self.user, description='-', ai_feedback='-',
+                                                       xp_awarded=40)
+        traits.award_traits(self.user, evaluation, [('Discipline', 20, '-'), ('Curiosité', 15, '-')])
+        summary = UserSummary.objects.get(user=self.user)
+        self.assertEqual((summary.evaluations_xp, summary.evaluations_hp), (40, 35))
+
+        UserSummary.objects.filter(user=self.user).update(evaluations_xp=0, evaluations_hp=0)
+        self.assertEqual(summaries.reconcile(), (1, 0, 0))
+        summary.refresh_from_db()
+        self.assertEqual((summary.evaluations_xp, summary.evaluations_hp), (40, 35))
+
+        evaluation.delete()
+        summary.refresh_from_db()
+        self.assertEqual((summary.evaluations_xp, summary.evaluations_hp), (0, 0))
+
+    def test_reconcile_fixes_drift(self):
+        """La réconciliation corrige un résumé et un total HP faux"""
+        ActivityEvaluation.objects.create(user=self.user, description='-', ai_feedback='-', online_courses=3)
+        UserSummary.objects.filter(user=self.user).update(online_courses=99)
+        LeaderboardEntry.objects.filter(user=self.user).update(total_hp=7)
+
+        self.assertEqual(summaries.reconcile(dry_run=True), (1, 0, 1))
+        self.assertEqual(summaries.reconcile(), (1, 0, 1))
+        self.assertEqual(UserSummary.objects.get(user=self.user).online_courses, 3)
+        self.assertEqual(LeaderboardEntry.objects.get(user=self.user).total_hp, 0)
+        self.assertEqual(summaries.reconcile(), (0, 0, 0))
+
+    def test_user_deletion(self):
+        """La suppression en cascade d'un utilisateur ne recrée pas son résumé"""
+        ActivityEvaluation.objects.create(user=self.user, description='-', ai_feedback='-')
+        UserChallenge.objects.create(user=self.user, challenge=self.challenge)
+        self.user.delete()
+        self.assertFalse(UserSummary.objects.exists())
+
+
+class StreakTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='streaker', password='testpass123')
+        self.today = timezone.localdate()
+
+    def act(self, days_ago):
+        Action.objects.create(user=self.user, action_type='study', local_date=self.today - timedelta(days=days_ago))
+
+    def test_streak_follows_actions(self):
+        """Jours consécutifs prolongés, deuxième action du jour ignorée, trou = redémarrage"""
+        for days_ago in (6, 5, 4, 2, 1, 0, 0):
+            self.act(days_ago)
+        summary = UserSummary.objects.get(user=self.user)
+        self.assertEqual((summary.current_streak, summary.longest_streak, summary.last_active_day),
+                         (3, 3, self.today))
+        self.assertEqual(summaries.compute_streak([self.today - timedelta(days=d) for d in (6, 5, 4, 2, 1, 0)]),
+                         {'current_streak': 3, 'longest_streak': 3, 'last_active_day': self.today})
+
+    def test_api_get_streak(self):
+        self.client.login(username='streaker', password='testpass123')
+        self.act(1)
+        self.assertEqual(self.client.get('/api/get-streak/').json()['streak'], 0)
+
+        self.client.post('/api/validate-day/')
+        data = self.client.get('/api/get-streak/').json()
+        self.assertEqual((data['streak'], data['longest_streak'], data['last_active_day']),
+                         (2, 2, self.today.isoformat()))
+
+    def test_reconcile_recomputes_backdated_streak(self):
+        """Une action antidatée comble un trou : la réconciliation recalcule la streak"""
+        self.act(0)
+        self.act(2)
+        self.act(1)
+        self.assertEqual(UserSummary.objects.get(user=self.user).current_streak, 1)
+        summaries.reconcile()
+        self.assertEqual(UserSummary.objects.get(user=self.user).current_streak, 3)
+
+
+class DailyStatsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='charted', password='testpass123')
+        self.client.login(username='charted', password='testpass123')
+        self.today = timezone.localdate()
+
+    def test_counters_follow_writes(self):
+        """Actions, HP de traits et sessions d'étude alimentent la ligne du jour"""
+        self.client.post('/api/validate-day-planning/')
+        Action.objects.create(user=self.user, action_type='study', points=15)
+        session = StudySession.objects.create(user=self.user, title='Maths', duration_minutes=40,
+                                              started_at=timezone.now())
+
+        stats = UserDailyStats.objects.get(user=self.user, day=self.today)
+        self.assertEqual((stats.xp_gained, stats.hp_gained, stats.action_count, stats.study_minutes),
+                         (15, 90, 2, 40))
+        session.delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.study_minutes, 0)
+
+    def test_heatmap_and_series(self):
+        UserDailyStats.objects.create(user=self.user, day=self.today, xp_gained=10, action_count=1)
+        UserDailyStats.objects.create(user=self.user, day=self.today - timedelta(days=40), xp_gained=5)
+
+        days = self.client.get('/api/dashboard/heatmap/').json()['days']
+        self.assertEqual(len(days), 365)
+        self.assertEqual(days[-1], {'date': self.today.isoformat(), 'xp_gained': 10, 'hp_gained': 0,
+                                    'action_count': 1, 'study_minutes': 0})
+
+        series = self.client.get('/api/dashboard/series/', {'period': 'month'}).json()['series']
+        self.assertEqual(sum(point['xp_gained'] for point in series), 15)
+        self.assertEqual(series[-1]['date'], self.today.replace(day=1).isoformat())
+
+        weeks = self.client.get('/api/dashboard/series/', {
+            'period': 'week', 'start': (self.today - timedelta(days=13)).isoformat(),
+            'end': self.today.isoformat()}).json()['series']
+        self.assertEqual(weeks[-1]['xp_gained'], 10)
+        self.assertEqual(self.client.get('/api/dashboard/series/', {'period': 'year'}).status_code, 400)
+
+
+class SyncUserDataTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='syncer', password='testpass123')
+        self.trait = PersonalityTrait.objects.create(name='Discipline')
+        self.user_trait = UserPersonalityTrait.objects.create(user=self.user, trait=self.trait, hp=10)
+        ActivityEvaluation.objects.create(user=self.user, description='Ancienne', ai_feedback='-')
+        self.client.login(username='syncer', password='testpass123')
+
+    def test_only_changes_since_seq(self):
+        """Le sync ne renvoie que les évaluations et traits modifiés après le seq connu"""
+        seq = self.client.get('/api/get-user-data/').json()['syncSeq']
+        self.assertTrue(seq > 0)
+
+        nothing = self.client.get('/api/sync/', {'since': seq}).json()
+        self.assertEqual((nothing['evaluations'], nothing['traitsHP'], nothing['reset']), ([], {}, False))
+
+        evaluation = ActivityEvaluation.objects.create(user=self.user, description='Nouvelle', ai_feedback='-')
+        EvaluationTraitLink.objects.create(evaluation=evaluation, trait=self.trait, hp_awarded=5, relevance='-')
+        self.user_trait.hp += 5
+        self.user_trait.save()
+
+        delta = self.client.get('/api/sync/', {'since': seq}).json()
+        self.assertEqual([e['description'] for e in delta['evaluations']], ['Nouvelle'])
+        self.assertEqual(delta['evaluations'][0]['traits'][0]['hpAwarded'], 5)
+        self.assertEqual(delta['traitsHP'], {'Discipline': 15})
+        self.assertEqual(delta['profile']['evaluationsCount'], 2)
+        self.assertTrue(delta['seq'] > seq)
+
+    def test_unknown_seq_requests_reset(self):
+        self.assertTrue(self.client.get('/api/sync/').json()['reset'])
+        self.assertTrue(self.client.get('/api/sync/', {'since': 10 ** 9}).json()['reset'])
+
+
+class UserCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cached', password='testpass123')
+        self.client.login(username='cached', password='testpass123')
+
+    def test_reads_cached_until_write(self):
+        """Les lectures restent en cache jusqu'à une écriture de l'utilisateur"""
+        self.assertEqual(self.client.get('/api/get-user-data/').json()['totalXP'], 0)
+
+        # Écriture hors endpoint : la réponse en cache est conservée
+        UserProfile.objects.filter(user=self.user).update(experience_points=40)
+        self.assertEqual(self.client.get('/api/get-user-data/').json()['totalXP'], 0)
+
+        self.client.post('/api/validate-day/')
+        self.assertEqual(self.client.get('/api/get-user-data/').json()['totalXP'], 140)
+
+    def test_cache_is_per_user(self):
+        self.client.get('/api/get-user-data/')
+        User.objects.create_user(username='other', password='testpass123')
+        self.client.login(username='other', password='testpass123')
+        self.assertEqual(self.client.get('/api/get-user-data/').json()['user']['username'], 'other')
+
+
+class AwardTraitsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='awarded', password='testpass123')
+        PersonalityTrait.objects.create(name='Discipline')
+        UserPersonalityTrait.objects.create(user=self.user, trait=PersonalityTrait.objects.get(name='Discipline'), hp=10)
+
+    def evaluation(self):
+        return ActivityEvaluation.objects.create(user=self.user, description='-', ai_feedback='-')
+
+    def test_merges_duplicates_and_increments(self):
+        """Un trait présent plusieurs fois donne un seul lien et un seul incrément"""
+        gained = traits.award_traits(self.user, self.evaluation(), [
+            ('Discipline', 30, 'Sport: Discipline'), ('Résilience', 20, 'Sport: Résilience'),
+            ('Discipline', 5, 'Lecture: Discipline'),
+        ])
+        self.assertEqual(gained, {'Discipline': 35, 'Résilience': 20})
+        hp = dict(UserPersonalityTrait.objects.filter(user=self.user).values_list('trait__name', 'hp'))
+        self.assertEqual(hp, {'Discipline': 45, 'Résilience': 20})
+        self.assertEqual(EvaluationTraitLink.objects.filter(trait__name='Discipline').get().relevance,
+                         'Sport: Discipline | Lecture: Discipline')
+        self.assertEqual(LeaderboardEntry.objects.get(user=self.user).total_hp, 55)
+
+    def test_query_count_independent_of_trait_count(self):
+        """Le nombre de requêtes ne dépend pas du nombre de traits"""
+        small = [(f'Trait {i}', 1, '-') for i in range(2)]
+        large = [(f'Trait {i}', 1, '-') for i in range(2, 22)]
+        traits.catalog.entries()
+        UserDailyStats.objects.create(user=self.user, day=timezone.localdate())
+        evaluation = self.evaluation()
+        with self.assertNumQueries(15):
+            traits.award_traits(self.user, evaluation, small)
+        evaluation = self.evaluation()
+        with self.assertNumQueries(15):
+            traits.award_traits(self.user, evaluation, large)
+
+    def test_daily_activity_with_shared_traits(self):
+        """Deux activités partageant un trait ne cassent plus la contrainte d'unicité des liens"""
+        self.client.login(username='awarded', password='testpass123')
+        response = self.client.post('/api/save-daily-activity/', {'activities': [{'id': 1}, {'id': 2}]},
+                                    content_type='application/json')
+        self.assertEqual(response.json()['traits_hp'], {'Résilience': 30, 'Discipline': 90})
+
+
+class TraitCatalogTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cataloged', password='testpass123')
+        self.discipline = PersonalityTrait.objects.create(name='Discipline')
+        self.resilience = PersonalityTrait.objects.create(name='Résilience')
+
+    def test_normalize_name(self):
+        self.assertEqual(traits.normalize_name('  RÉSILIENCE '), 'resilience')
+        self.assertEqual(traits.normalize_name('Prise  de\tRisque'), 'prise de risque')
+
+    def test_lookups_need_no_queries(self):
+        """Variantes d'accent / de casse résolues vers le trait existant sans requête"""
+        traits.catalog.entries()
+        with self.assertNumQueries(0):
+            resolved = traits.catalog.resolve(['resilience', 'DISCIPLINE', 'Résilience'])
+        self.assertEqual(resolved['resilience'], (self.resilience.id, 'Résilience'))
+        self.assertEqual(resolved['DISCIPLINE'], (self.discipline.id, 'Discipline'))
+
+    def test_award_variants_share_one_trait(self):
+        gained = traits.award_traits(
+            self.user, ActivityEvaluation.objects.create(user=self.user, description='-', ai_feedback='-'),
+            [('resilience', 10, 'a'), ('Résilience', 5, 'b')],
+        )
+        self.assertEqual(gained, {'Résilience': 15})
+        self.assertEqual(PersonalityTrait.objects.count(), 2)
+
+    def test_change_invalidates_catalog(self):
+        traits.catalog.entries()
+        with self.captureOnCommitCallbacks(execute=True):
+            PersonalityTrait.objects.create(name='Curiosité')
+        self.assertIsNotNone(traits.catalog.get('curiosite'))
+
+    def test_merge_duplicates(self):
+        """Les doublons historiques sont fusionnés sans perte de HP"""
+        duplicate = PersonalityTrait.objects.create(name='discipline')
+        UserPersonalityTrait.objects.create(user=self.user, trait=self.discipline, hp=10)
+        UserPersonalityTrait.objects.create(user=self.user, trait=duplicate, hp=7)
+
+        self.assertEqual(traits.merge_duplicates(dry_run=True), (1, 1))
+        self.assertEqual(traits.merge_duplicates(), (1, 1))
+        self.assertFalse(PersonalityTrait.objects.filter(pk=duplicate.pk).exists())
+        self.assertEqual(UserPersonalityTrait.objects.get(user=self.user, trait=self.discipline).hp, 17)
+
+
+class AwardXPTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='earner', password='testpass123')
+
+    def test_award_recomputes_level_and_keeps_other_columns(self):
+        """L'XP est ajoutée sur la valeur en base et les colonnes JSON ne sont pas réécrites"""
+        UserProfile.objects.filter(user=self.user).update(experience_points=250, acquired_skills=['python'])
+
+        profile = awards.award_xp(self.user, 60, points=10)
+        self.assertEqual((profile.experience_points, profile.total_points, profile.level), (310, 10, 2))
+
+        stored = UserProfile.objects.get(user=self.user)
+        self.assertEqual(stored.experience_points, 310)
+        self.assertEqual(stored.acquired_skills, ['python'])
+        self.assertEqual(LeaderboardEntry.objects.get(user=self.user).level, 2)
+
+    def test_validate_day_endpoint(self):
+        self.client.login(username='earner', password='testpass123')
+        self.client.post('/api/validate-day/')
+        response = self.client.post('/api/validate-day/').json()
+        self.assertEqual(response['level'], leveling.level_for_xp(200))
+        self.assertEqual(UserProfile.objects.get(user=self.user).total_points, 200)
+
+
+class BatchEventsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='batcher', password='testpass123')
+        self.client.login(username='batcher', password='testpass123')
+
+    def post(self, events):
+        return self.client.post('/api/batch/', {'events': events}, content_type='application/json')
+
+    def test_mixed_events_in_one_request(self):
+        """Les événements sont appliqués dans l'ordre, XP et Actions écrits une seule fois"""
+        response = self.post([
+            {'type': 'activity', 'data': {'activities': [{'id': 1}]}},
+            {'type': 'time_block', 'data': {'title': 'Maths', 'xp_amount': 20}},
+            {'type': 'toggle', 'data': {'status': 'done'}},
+            {'type': 'activity', 'data': {'activities': []}},
+            {'type': 'planning'},
+            {'type': 'validate_day'},
+            {'type': 'unknown'},
+        ]).json()
+
+        self.assertEqual([r['success'] for r in response['results']], [True, True, True, False, True, True, False])
+        self.assertEqual(response['results'][3]['error'], 'Aucune activité fournie')
+        self.assertEqual(response['experience_points'], 50 + 20 + 100)
+        self.assertEqual(Action.objects.filter(user=self.user).count(), 5)
+        self.assertEqual(UserDailyStats.objects.get(user=self.user).xp_gained, 50 + 20 + 100)
+        self.assertEqual(UserSummary.objects.get(user=self.user).evaluations_count, 3)
+
+    def test_rejects_empty_batch(self):
+        self.assertEqual(self.post([]).status_code, 400)
+
+    def test_single_endpoints_unchanged(self):
+        """Les endpoints unitaires gardent leur format de réponse"""
+        response = self.client.post('/api/add-block/', {'title': 'Lecture'}, content_type='application/json').json()
+        self.assertEqual((response['success'], response['total_xp']), (True, 30))
+        self.assertEqual(UserDailyStats.objects.get(user=self.user).xp_gained, 30)
+
+
+class IdempotencyTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='retrier', password='testpass123')
+        self.client.login(username='retrier', password='testpass123')
+
+    def post(self, key, body):
+        return self.client.post('/api/add-block/', body, content_type='application/json',
+                                HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay_does_not_award_twice(self):
+        """Un retry avec la même clé rejoue la réponse sans rien réécrire"""
+        first = self.post('abc', {'title': 'Lecture'})
+        replay = self.post('abc', {'title': 'Lecture'})
+        self.assertEqual(replay.json(), first.json())
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(UserProfile.objects.get(user=self.user).experience_points, 30)
+        self.assertEqual(Action.objects.filter(user=self.user).count(), 1)
+
+        self.post('other', {'title': 'Lecture'})
+        self.assertEqual(UserProfile.objects.get(user=self.user).experience_points, 60)
+
+    def test_key_reused_with_other_body(self):
+        self.post('abc', {'title': 'Lecture'})
+        self.assertEqual(self.post('abc', {'title': 'Sport'}).status_code, 422)
+
+
+AI_REPLY = """Voici l'analyse : {"isValid": true, "xpAmount": 80, "qualityScore": 0.9, "feedback": "Bien",
+"personalityTraits": [{"name": "Discipline", "hpAmount": 30, "relevance": "Régularité"}],
+"detections": {"booksRead": 1}}"""
+
+
+@override_settings(AI_SETTINGS={'JOB_BACKEND': 'eager'})
+class EvaluationJobsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['ai'].clear()
+        self.user = User.objects.create_user(username='evaluated', password='testpass123')
+        self.client.login(username='evaluated', password='testpass123')
+
+    def submit(self, description='Lu un livre pendant deux heures'):
+        return self.client.post('/api/evaluate-activity/jobs/', {'description': description},
+                                content_type='application/json')
+
+    def test_job_result_matches_sync_format(self):
+        with mock.patch.object(ai, 'complete', return_value=AI_REPLY):
+            response = self.submit()
+        self.assertEqual(response.status_code, 202)
+
+        data = self.client.get(response.json()['status_url']).json()
+        self.assertEqual(data['status'], jobs.DONE)
+        self.assertEqual((data['total_xp'], data['traits_hp'], data['detections']),
+                         (80, {'Discipline': 30}, {'booksRead': 1}))
+
+    def test_failed_job_and_foreign_job(self):
+        with mock.patch.object(ai, 'complete', return_value='pas de JSON'):
+            job_url = self.submit().json()['status_url']
+        response = self.client.get(job_url)
+        self.assertEqual((response.status_code, response.json()['error']), (400, 'Could not parse AI response'))
+
+        User.objects.create_user(username='other', password='testpass123')
+        self.client.login(username='other', password='testpass123')
+        self.assertEqual(self.client.get(job_url).status_code, 404)
+
+    def test_thread_backend_returns_before_evaluation(self):
+        with override_settings(AI_SETTINGS={'JOB_BACKEND': 'thread'}), \
+                mock.patch.object(ai, 'complete', return_value=AI_REPLY):
+            job = jobs.submit(self.user.id, 'Séance de sport')
+            self.assertEqual(job['status'], jobs.PENDING)
+            for _ in range(100):
+                if jobs.get(job['id'])['status'] == jobs.DONE:
+                    break
+                time.sleep(0.01)
+        self.assertEqual(jobs.get(job['id'])['result']['total_xp'], 80)
+
+
+class EvaluationCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['ai'].clear()
+
+    def test_repeat_descriptions_hit_the_cache(self):
+        """Même description à la casse / aux espaces près : un seul appel au fournisseur"""
+        with mock.patch.object(ai, 'complete', return_value=AI_REPLY) as complete:
+            first = ai.evaluate('Lu un livre  pendant deux heures.')
+            second = ai.evaluate('lu un livre pendant deux heures')
+        self.assertEqual(complete.call_count, 1)
+        self.assertEqual((first['cached'], second['cached']), (False, True))
+        self.assertEqual(second['traits_hp'], {'Discipline': 30})
+        self.assertEqual(ai.cache_stats(), {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_prompt_version_and_failures(self):
+        with mock.patch.object(ai, 'complete', return_value='pas de JSON'):
+            with self.assertRaises(ai.AIError):
+                ai.evaluate('Séance de sport')
+        self.assertIsNone(caches['ai'].get(ai.result_key('Séance de sport')))
+
+        key = ai.result_key('Séance de sport')
+        with mock.patch.object(ai, 'PROMPT_VERSION', ai.PROMPT_VERSION + 1):
+            self.assertNotEqual(ai.result_key('Séance de sport'), key)
+
+
+class BatchEvaluationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['ai'].clear()
+
+    def reply(self, *xp_amounts):
+        return json.dumps([{'index': i, 'isValid': True, 'xpAmount': xp, 'personalityTraits': []}
+                           for i, xp in reversed(list(enumerate(xp_amounts, 1)))])
+
+    def test_one_call_for_the_batch(self):
+        """Cache et doublons exclus du prompt, réponse remise dans l'ordre des descriptions"""
+        with mock.patch.object(ai, 'complete', return_value=AI_REPLY):
+            ai.evaluate('Déjà évaluée')
+        with mock.patch.object(ai, 'complete', return_value=self.reply(10, 20)) as complete:
+            results = ai.evaluate_batch(['Sport', 'Déjà évaluée', 'Lecture', 'sport'])
+        self.assertEqual(complete.call_count, 1)
+        self.assertIn('[2] Lecture', complete.call_args[0][0])
+        self.assertEqual([r['total_xp'] for r in results], [10, 80, 20, 10])
+        self.assertEqual([r['cached'] for r in results], [False, True, False, False])
+        self.assertEqual(ai.evaluate('Lecture')['total_xp'], 20)
+
+    def test_fallback_to_individual_calls(self):
+        replies = ['pas un tableau', AI_REPLY, 'toujours pas de JSON']
+        with mock.patch.object(ai, 'complete', side_effect=replies) as complete:
+            results = ai.evaluate_batch(['Sport', 'Lecture'])
+        self.assertEqual(complete.call_count, 3)
+        self.assertEqual((results[0]['total_xp'], results[1]['success']), (80, False))
+
+    @override_settings(AI_SETTINGS={'JOB_BACKEND': 'eager', 'BATCH_MAX_ITEMS': 2})
+    def test_batch_endpoint(self):
+        User.objects.create_user(username='batcher', password='testpass123')
+        self.client.login(username='batcher', password='testpass123')
+        with mock.patch.object(ai, 'complete', return_value=self.reply(10, 20)):
+            response = self.client.post('/api/evaluate-activity/batch/', {'descriptions': ['Sport', 'Lecture']},
+                                        content_type='application/json')
+        results = self.client.get(response.json()['status_url']).json()['results']
+        self.assertEqual([r['total_xp'] for r in results], [10, 20])
+        response = self.client.post('/api/evaluate-activity/batch/', {'descriptions': ['a', 'b', 'c']},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class PrescorerTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['ai'].clear()
+
+    def test_automaton_matches_word_starts(self):
+        automaton = prescorer.KeywordAutomaton([('he', 'he'), ('she', 'she'), ('hers', 'hers')])
+        self.assertEqual(sorted(automaton.find('she hers')), [('he', 4, 6), ('hers', 4, 8), ('she', 0, 3)])
+        self.assertEqual(list(automaton.find('ushers')), [])
+
+    def test_score(self):
+        estimate = prescorer.score('Lu 2 livres et suivi 1 cours Udemy')
+        self.assertEqual(estimate.confidence, 0.75)
+        self.assertEqual((estimate.result['detections']['booksRead'], estimate.result['detections']['onlineCourses']),
+                         (2, 1))
+        self.assertEqual(prescorer.score('Séance de sport').confidence, 0.0)
+
+    def test_short_or_negative_descriptions_defer_to_the_model(self):
+        """Un mot-clé isolé ou un trait à HP négatifs n'est jamais attribué sans le modèle"""
+        for description in ('peur', 'colère', 'Lu un livre', "Beaucoup de colère et d'anxiété après 2 livres lus"):
+            self.assertEqual(prescorer.score(description).confidence, 0.0, description)
+
+    def test_negation_defers_to_the_model(self):
+        for description in ('Je n ai pas lu de livre', "Je n'ai jamais fini le cours Udemy",
+                            'Aucun livre lu', 'Semaine sans projet'):
+            self.assertEqual(prescorer.score(description).confidence, 0.0, description)
+        self.assertGreater(prescorer.score('Lu 2 livres, passé 1 cours Udemy').confidence, 0)
+
+    def test_confident_score_skips_the_provider(self):
+        with mock.patch.object(ai, 'complete', return_value=AI_REPLY) as complete:
+            quick = ai.evaluate('Lu 2 livres et suivi 1 cours Udemy')
+            slow = ai.evaluate('Lu un livre pendant deux heures')
+        self.assertEqual(complete.call_count, 1)
+        self.assertEqual((quick['source'], slow['source']), ('keywords', 'llm'))
+
+        with override_settings(AI_SETTINGS={'PRESCORE_THRESHOLD': 1.1}), \
+                mock.patch.object(ai, 'complete', return_value=AI_REPLY) as complete:
+            self.assertEqual(ai.evaluate('Lu 2 livres et suivi 1 cours Udemy')['source'], 'llm')
+        self.assertEqual(complete.call_count, 1)
+
+
+class StubProvider(BaseHTTPRequestHandler):
+    """Fournisseur local : répond avec les statuts de `script` (puis 200)"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server
+        server.requests.append(self.client_address)
+        self.rfile.read(int(self.headers['Content-Length']))
+        status = server.script.pop(0) if server.script else 200
+        body = json.dumps({'choices': [{'message': {'content': 'ok'}}]} if status == 200 else {}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class LLMClientTestCase(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubProvider)
+        self.server.requests, self.server.script = [], []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.client = llm.LLMClient({
+            'API_URL': f'http://127.0.0.1:{self.server.server_port}/', 'MAX_RETRIES': 2,
+            'BREAKER_THRESHOLD': 2, 'BREAKER_COOLDOWN': 60,
+        }, sleep=lambda seconds: None)
+
+    def test_retries_on_one_kept_alive_connection(self):
+        self.server.script = [503, 500]
+        self.assertEqual(self.client.chat('Bonjour', 'key'), 'ok')
+        self.assertEqual(self.client.chat('Bonjour', 'key'), 'ok')
+        self.assertEqual(len(self.server.requests), 4)
+        self.assertEqual(len(set(self.server.requests)), 1)
+
+    def test_client_errors_are_not_retried(self):
+        self.server.script = [401]
+        with self.assertRaises(llm.ProviderError):
+            self.client.chat('Bonjour', 'key')
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_only_connection_errors_are_retried(self):
+        """Une connexion refusée est rejouée, un délai de lecture dépassé ne l'est pas"""
+        with mock.patch.object(self.client.session, 'post', side_effect=requests.ReadTimeout) as post:
+            with self.assertRaises(llm.ProviderError):
+                self.client.chat('Bonjour', 'key')
+        self.assertEqual(post.call_count, 1)
+
+        with mock.patch.object(self.client.session, 'post', side_effect=requests.ConnectTimeout) as post:
+            with self.assertRaises(llm.ProviderError):
+                self.client.chat('Bonjour', 'key')
+        self.assertEqual(post.call_count, 3)
+
+    def test_breaker_fails_fast_then_recovers(self):
+        """Après deux appels en échec, le disjoncteur refuse sans requête réseau"""
+        self.server.script = [500] * 6
+        for _ in range(2):
+            with self.assertRaises(llm.ProviderError):
+                self.client.chat('Bonjour', 'key')
+        with self.assertRaises(llm.CircuitOpenError):
+            self.client.chat('Bonjour', 'key')
+        self.assertEqual((len(self.server.requests), self.client.breaker.state), (6, 'open'))
+
+        self.client.breaker.opened_at -= 60
+        self.assertEqual(self.client.chat('Bonjour', 'key'), 'ok')
+        self.assertEqual(self.client.breaker.state, 'closed')
+
+
+class StreamingEvaluationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['ai'].clear()
+        self.provider = FakeProvider().start()
+        self.addCleanup(self.provider.stop)
+        self.user = User.objects.create_user(username='streamer', password='testpass123')
+        settings_patch = override_settings(AI_SETTINGS={'API_URL': self.provider.url, 'MAX_RETRIES': 0})
+        settings_patch.enable()
+        self.addCleanup(settings_patch.disable)
+        env_patch = mock.patch.dict(os.environ, {'PERPLEXITY_API_KEY': 'local'})
+        env_patch.start()
+        self.addCleanup(env_patch.stop)
+
+    def events(self, chunks):
+        body = ''.join(chunk.decode() if isinstance(chunk, bytes) else chunk for chunk in chunks)
+        return [(block.split('\n')[0][len('event: '):], json.loads(block.split('\n')[1][len('data: '):]))
+                for block in body.strip().split('\n\n')]
+
+    def test_client_relays_provider_tokens(self):
+        chunks = list(llm.LLMClient({'API_URL': self.provider.url}).stream_chat('Bonjour', 'key'))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(''.join(chunks), fakeprovider.default_reply('Bonjour'))
+
+    def test_stream_ends_with_parsed_result(self):
+        self.client.login(username='streamer', password='testpass123')
+        response = self.client.post('/api/evaluate-activity/stream/', {'description': 'Séance de sport'},
+                                    content_type='application/json')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = self.events(response.streaming_content)
+        self.assertEqual(events[0][0], 'start')
+        self.assertEqual(''.join(data['text'] for name, data in events if name == 'token'),
+                         fakeprovider.default_reply(ai.build_prompt('Séance de sport')))
+        self.assertEqual(events[-1][0], 'result')
+        self.assertEqual((events[-1][1]['total_xp'], events[-1][1]['source']), (60, 'llm'))
+        self.assertEqual(ai.evaluate('Séance de sport')['source'], 'cache')
+
+    def test_unparsable_stream_ends_with_error(self):
+        self.provider.reply = 'pas de JSON'
+        self.client.login(username='streamer', password='testpass123')
+        response = self.client.post('/api/evaluate-activity/stream/', {'description': 'Séance de sport'},
+                                    content_type='application/json')
+        self.assertEqual(self.events(response.streaming_content)[-1],
+                         ('error', {'success': False, 'error': 'Could not parse AI response', 'status': 400,
+                                    'retry_after': None}))
+
+    async def test_asgi_streams_asynchronously(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.post('/api/evaluate-activity/stream/', {'description': 'Séance de sport'},
+                                                 content_type='application/json')
+        self.assertTrue(response.is_async)
+        events = self.events([chunk async for chunk in response.streaming_content])
+        self.assertEqual((events[0][0], events[-1][0]), ('start', 'result'))
+
+
+class ReplayTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['ai'].clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cassette.jsonl.gz')
+        env_patch = mock.patch.dict(os.environ, {'PERPLEXITY_API_KEY': 'local'})
+        env_patch.start()
+        self.addCleanup(env_patch.stop)
+
+    def record(self, *descriptions):
+        upstream = FakeProvider().start()
+        with override_settings(AI_SETTINGS={'API_URL': upstream.url, 'RECORD_CASSETTE': self.path}):
+            results = [ai.evaluate(description, use_cache=False) for description in descriptions]
+        upstream.stop()
+        return results
+
+    def test_replay_through_evaluate_and_confirm(self):
+        recorded = self.record('Séance de sport')
+        provider = replay.ReplayProvider(replay.Cassette(self.path), latency=0).start()
+        self.addCleanup(provider.stop)
+
+        User.objects.create_user(username='replayer', password='testpass123')
+        self.client.login(username='replayer', password='testpass123')
+        with override_settings(AI_SETTINGS={'API_URL': provider.url, 'MAX_RETRIES': 0}):
+            data = self.client.post('/api/evaluate-activity/', {'description': 'Séance de sport'},
+                                    content_type='application/json').json()
+            missing = self.client.post('/api/evaluate-activity/', {'description': 'Jamais enregistrée'},
+                                       content_type='application/json')
+        self.assertEqual((data['total_xp'], data['traits_hp']), (recorded[0]['total_xp'], recorded[0]['traits_hp']))
+        self.assertEqual(missing.status_code, 400)
+
+        response = self.client.post('/api/confirm-evaluation/', {
+            'description': 'Séance de sport', 'xp_amount': data['total_xp'], 'quality_score': data['quality_score'],
+            'feedback': data['feedback'], 'personality_traits': data['personality_traits'],
+            'detections': data['detections'],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_benchmark_reports_parse_failures_and_errors(self):
+        self.record('Séance de sport', 'Méditation')
+        self.assertEqual(len(replay.Cassette(self.path).entries()), 2)
+
+        out = StringIO()
+        call_command('benchmark_ai', self.path, requests=40, concurrency=4, latency=0, corrupt_rate=0.5, seed=3,
+                     json=True, stdout=out)
+        stats = json.loads(out.getvalue())
+        self.assertEqual((stats['requests'], stats['error_rate']), (40, 0.0))
+        self.assertTrue(0 < stats['parse_failure_rate'] < 1)
+        self.assertLessEqual(stats['p50'], stats['p95'])
+
+        out = StringIO()
+        call_command('benchmark_ai', self.path, requests=10, concurrency=2, latency=0, error_rate=1, retries=0,
+                     json=True, stdout=out)
+        self.assertEqual(json.loads(out.getvalue())['error_rate'], 1.0)
+
+
+class AdmissionControlTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['ai'].clear()
+        self.user = User.objects.create_user(username='quota', password='testpass123')
+        self.client.login(username='quota', password='testpass123')
+
+    def test_limiter_sheds_load_while_slots_are_busy(self):
+        provider = FakeProvider(token_delay=0.01).start()
+        self.addCleanup(provider.stop)
+        client = llm.LLMClient({'API_URL': provider.url, 'MAX_CONCURRENCY': 1, 'ADMISSION_WAIT': 0,
+                                'OVERLOAD_RETRY_AFTER': 3})
+        stream = client.stream_chat('Bonjour', 'key')
+        next(stream)
+        with self.assertRaises(llm.OverloadedError) as raised:
+            client.chat('Bonjour', 'key')
+        self.assertEqual((raised.exception.status, raised.exception.retry_after), (503, 3))
+
+        stream.close()
+        self.assertTrue(client.chat('Bonjour', 'key'))
+        self.assertEqual(client.limiter.rejected, 1)
+
+    def test_overload_maps_to_503_with_retry_after(self):
+        with mock.patch.object(ai, 'complete', side_effect=ai.AIError('Service IA saturé', 503, retry_after=5)):
+            response = self.client.post('/api/evaluate-activity/', {'description': 'Séance de sport'},
+                                        content_type='application/json')
+        self.assertEqual((response.status_code, response['Retry-After']), (503, '5'))
+
+    @override_settings(AI_SETTINGS={'JOB_BACKEND': 'eager', 'USER_QUOTA_RATE': '1/hour', 'USER_QUOTA_BURST': 2})
+    def test_user_quota(self):
+        def evaluate(description='Séance de sport'):
+            return self.client.post('/api/evaluate-activity/', {'description': description},
+                                    content_type='application/json')
+
+        with mock.patch.object(ai, 'complete', return_value=AI_REPLY):
+            self.assertEqual([evaluate().status_code for _ in range(2)], [200, 200])
+            response = evaluate()
+            self.assertEqual(response.status_code, 429)
+            self.assertTrue(0 < int(response['Retry-After']) <= 3600)
+
+            User.objects.create_user(username='other', password='testpass123')
+            self.client.login(username='other', password='testpass123')
+            response = self.client.post('/api/evaluate-activity/batch/', {'descriptions': ['Sport', 'Lecture', 'Yoga']},
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(evaluate().status_code, 429)
+
+        tokens, updated = cache.get(quotas._key(self.user.id))
+        cache.set(quotas._key(self.user.id), (tokens, updated - 3600))
+        self.assertEqual(quotas.consume(self.user.id), (True, 0))
+
+
+class ResourceCatalogTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='testpass123')
+        UserProfile.objects.update_or_create(user=self.user, defaults={'level': 150})
+        self.client.login(username='reader', password='testpass123')
+        levels = [1, 1, 50, 120, 150, 151, 300]
+        types = ['Livre', 'Article', 'Livre', 'FilmSérie', 'Livre', 'Livre', 'Podcast']
+        self.resources = [
+            Resource.objects.create(titre=f'R{i}', auteur='-', niveau=level, type=resource_type)
+            for i, (level, resource_type) in enumerate(zip(levels, types))
+        ]
+        Resource.objects.create(titre='Inactive', auteur='-', niveau=1, is_active=False)
+        CheckedResource.objects.create(user=self.user, resource_id=str(self.resources[2].id))
+
+    def get(self, url='/api/resources/all/', **params):
+        return self.client.get(url, params)
+
+    def ids(self, **params):
+        return [r['id'] for r in self.get(**params).json()['resources']]
+
+    def test_keyset_pages_cover_catalog_in_order(self):
+        seen, cursor = [], None
+        while True:
+            data = self.get(limit=2, **({'cursor': cursor} if cursor else {})).json()
+            seen += [r['id'] for r in data['resources']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, [r.id for r in self.resources])
+        self.assertEqual((data['total_resources'], data['unlocked_resources']), (7, 5))
+        self.assertEqual(self.get(cursor='pas-un-curseur').status_code, 400)
+
+    def test_filters(self):
+        r = self.resources
+        self.assertEqual(self.ids(type='Livre', unlocked='true'), [r[0].id, r[2].id, r[4].id])
+        self.assertEqual(self.ids(type='Film/Série'), [r[3].id])
+        self.assertEqual(self.ids(unlocked='false'), [r[5].id, r[6].id])
+        self.assertEqual(self.ids(galaxy=2), [r[3].id, r[4].id, r[5].id])
+        self.assertEqual(self.ids(checked='true'), [r[2].id])
+        self.assertEqual(self.get(type='Inconnu').status_code, 400)
+
+        data = self.get('/api/resources/', checked='false', domaine='Autre', limit=1).json()
+        self.assertEqual(([x['id'] for x in data['resources']], data['has_more']), ([r[0].id], True))
+        self.assertEqual(data['counts'], {'unlocked': 5, 'total': 7})
+
+    def test_counts_follow_catalog_changes(self):
+        self.assertEqual(resources.counts(150)['total'], 7)
+        with self.captureOnCommitCallbacks(execute=True):
+            Resource.objects.create(titre='Nouvelle', auteur='-', niveau=2)
+        self.assertEqual(resources.counts(150), {'unlocked': 6, 'total': 8})
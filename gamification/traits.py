@@ -0,0 +1,239 @@
+import time
+import unicodedata
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from . import leaderboard, rollups, summaries, usercache
+from .models import ActivityEvaluation, EvaluationTraitLink, PersonalityTrait, UserPersonalityTrait
+
+CATALOG_VERSION_KEY = 'traits:catalog:version'
+
+
+def normalize_name(name):
+    """Clé de comparaison d'un nom de trait : sans accents, casse ni espaces superflus
+
+    'Résilience', 'resilience ' et 'RÉSILIENCE' donnent tous 'resilience'.
+    """
+    text = unicodedata.normalize('NFKD', str(name))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.casefold().split())
+
+
+class TraitCatalog:
+    """✅ Catalogue en mémoire {nom normalisé: (id, nom canonique)} des PersonalityTrait
+
+    Chargé une fois par process puis servi sans requête. Une version partagée dans le
+    cache (incrémentée à chaque modification de trait) invalide les copies des autres
+    process. En cas de doublons historiques ('Discipline' / 'discipline'), le trait
+    le plus ancien est le nom canonique.
+    """
+
+    def __init__(self):
+        self._entries = None
+        self._version = None
+
+    def _shared_version(self):
+        version = cache.get(CATALOG_VERSION_KEY)
+        if version is None:
+            cache.add(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+            version = cache.get(CATALOG_VERSION_KEY)
+        return version
+
+    def _load(self):
+        entries = {}
+        for trait_id, name in PersonalityTrait.objects.order_by('id').values_list('id', 'name'):
+            entries.setdefault(normalize_name(name), (trait_id, name))
+        return entries
+
+    def entries(self):
+        version = self._shared_version()
+        if self._entries is None or version != self._version:
+            self._entries = self._load()
+            self._version = version
+        return self._entries
+
+    def get(self, name):
+        """(id, nom canonique) d'un trait, ou None s'il n'existe pas"""
+        return self.entries().get(normalize_name(name))
+
+    def invalidate(self):
+        """Oublie le catalogue local et celui des autres process"""
+        try:
+            cache.incr(CATALOG_VERSION_KEY)
+        except ValueError:
+            cache.set(CATALOG_VERSION_KEY, time.time_ns(), timeout=None)
+        self._entries = None
+
+    def _publish(self, created):
+        """Après commit : ajoute les traits créés au catalogue local, invalide les autres"""
+        try:
+            version = cache.incr(CATALOG_VERSION_KEY)
+        except ValueError:
+            self.invalidate()
+            return
+        if self._entries is not None and version == self._version + 1:
+            for key, entry in created.items():
+                self._entries.setdefault(key, entry)
+            self._version = version
+        else:
+            self._entries = None
+
+    def resolve(self, names, category='behavioral'):
+        """✅ {nom demandé: (id, nom canonique)}, en créant les traits vraiment inconnus
+
+        Les variantes d'accent / de casse d'un trait existant lui sont rattachées :
+        aucune requête tant que tous les noms sont connus. Les traits créés n'entrent
+        dans le catalogue qu'au commit (un rollback ne laisse pas d'id orphelin).
+        """
+        entries = self.entries()
+        missing = {}
+        for name in names:
+            key = normalize_name(name)
+            if key and key not in entries:
+                missing.setdefault(key, ' '.join(str(name).split()))
+
+        created = {}
+        if missing:
+            # bulk_create ne déclenche pas post_save : le catalogue est complété ici
+            PersonalityTrait.objects.bulk_create(
+                [PersonalityTrait(name=name, category=category) for name in missing.values()],
+                ignore_conflicts=True,
+            )
+            for trait_id, name in PersonalityTrait.objects.filter(name__in=missing.values()).order_by().values_list('id', 'name'):
+                created[normalize_name(name)] = (trait_id, name)
+            transaction.on_commit(lambda: self._publish(created))
+
+        resolved = {}
+        for name in names:
+            key = normalize_name(name)
+            entry = entries.get(key) or created.get(key)
+            if entry:
+                resolved[name] = entry
+        return resolved
+
+
+catalog = TraitCatalog()
+
+
+def _merge(awards):
+    """Regroupe les attributions par trait canonique (un seul lien par couple évaluation / trait)
+
+    Retourne {trait_id: [nom canonique, hp, [pertinences]]}.
+    """
+    awards = [(name, hp, relevance) for name, hp, relevance in awards if name and normalize_name(name)]
+    resolved = catalog.resolve([name for name, _, _ in awards])
+
+    merged = {}
+    for name, hp, relevance in awards:
+        trait_id, canonical = resolved[name]
+        entry = merged.setdefault(trait_id, [canonical, 0, []])
+        entry[1] += int(hp or 0)
+        if relevance and relevance not in entry[2]:
+            entry[2].append(relevance)
+    return merged
+
+
+def award_traits(user, evaluation, awards):
+    """✅ Attribue des HP de traits pour une évaluation, en un nombre fixe de requêtes
+
+    `awards` : itérable de (nom du trait, hp, pertinence). Les doublons d'un même trait
+    (y compris variantes d'accent / de casse) sont additionnés. Dans une seule transaction :
+    - résolution des traits par le catalogue en mémoire (bulk_create des traits inconnus)
+    - bulk_create des liens évaluation / trait
+    - upsert des HP utilisateur : INSERT des lignes manquantes puis un seul
+      UPDATE hp = hp + CASE trait_id ..., sans lecture-modification-écriture
+    - incrément du total HP du classement, des HP d'évaluation du résumé et des HP du jour
+
+    Retourne {nom canonique du trait: hp attribués}.
+    """
+    with transaction.atomic():
+        merged = _merge(awards)
+        if not merged:
+            return {}
+        deltas = {trait_id: hp for trait_id, (_, hp, _) in merged.items()}
+
+        EvaluationTraitLink.objects.bulk_create([
+            EvaluationTraitLink(
+                evaluation=evaluation,
+                trait_id=trait_id,
+                hp_awarded=hp,
+                relevance=' | '.join(relevances),
+            )
+            for trait_id, (_, hp, relevances) in merged.items()
+        ])
+
+        # bulk_create / update() ne déclenchent pas les signaux : séquence de sync posée ici
+        seq = summaries.next_change_seq(user.id)
+        UserPersonalityTrait.objects.bulk_create(
+            [UserPersonalityTrait(user=user, trait_id=trait_id, hp=0, change_seq=seq) for trait_id in deltas],
+            ignore_conflicts=True,
+        )
+        UserPersonalityTrait.objects.filter(user=user, trait_id__in=deltas.keys()).update(
+            hp=F('hp') + Case(
+                *[When(trait_id=trait_id, then=Value(hp)) for trait_id, hp in deltas.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+            change_seq=seq,
+            updated_at=timezone.now(),
+        )
+        ActivityEvaluation.objects.filter(pk=evaluation.pk).update(change_seq=seq)
+
+        leaderboard.add_hp(user, sum(deltas.values()))
+        summaries.add(user.id, evaluations_hp=sum(deltas.values()))
+        rollups.add_daily(user.id, timezone.localdate(), hp_gained=sum(deltas.values()))
+
+    return {name: hp for name, hp, _ in merged.values()}
+
+
+def merge_duplicates(dry_run=False):
+    """✅ Fusionne les traits qui ne diffèrent que par les accents / la casse / les espaces
+
+    Les HP utilisateur et les liens d'évaluation des doublons sont reportés sur le trait
+    le plus ancien, puis les doublons sont supprimés. Le total HP de chaque utilisateur
+    est inchangé. Retourne (groupes fusionnés, traits supprimés).
+    """
+    groups = {}
+    for trait_id, name in PersonalityTrait.objects.order_by('id').values_list('id', 'name'):
+        groups.setdefault(normalize_name(name), []).append(trait_id)
+    groups = [ids for ids in groups.values() if len(ids) > 1]
+    removed = sum(len(ids) - 1 for ids in groups)
+    if dry_run or not groups:
+        return len(groups), removed
+
+    touched_users = set()
+    with transaction.atomic():
+        for canonical_id, *duplicate_ids in groups:
+            for row in UserPersonalityTrait.objects.filter(trait_id__in=duplicate_ids):
+                target = UserPersonalityTrait.objects.filter(user_id=row.user_id, trait_id=canonical_id).first()
+                if target is None:
+                    row.trait_id = canonical_id
+                    row.save()
+                else:
+                    target.hp += row.hp
+                    target.save()
+                    row.delete()
+                touched_users.add(row.user_id)
+
+            for link in EvaluationTraitLink.objects.filter(trait_id__in=duplicate_ids):
+                target = EvaluationTraitLink.objects.filter(evaluation_id=link.evaluation_id,
+                                                            trait_id=canonical_id).first()
+                if target is None:
+                    link.trait_id = canonical_id
+                    link.save()
+                else:
+                    target.hp_awarded += link.hp_awarded
+                    if link.relevance and link.relevance not in target.relevance:
+                        target.relevance = ' | '.join(filter(None, [target.relevance, link.relevance]))
+                    target.save()
+                    link.delete()
+
+            PersonalityTrait.objects.filter(id__in=duplicate_ids).delete()
+
+    for user_id in touched_users:
+        usercache.bump_user_version(user_id)
+    catalog.invalidate()
+    return len(groups), removed
@@ -31,6 +31,7 @@ urlpatterns = [
     # ==================== API - GET DATA (SOURCE UNIQUE DE VÉRITÉ) ====================
 
     path('api/get-user-data/', views.api_get_user_data, name='api_get_user_data'),
+    path('api/sync/', views.api_sync_user_data, name='api_sync_user_data'),
 
     # ==================== API - DAILY ACTIVITIES & STREAK ====================
 
@@ -40,6 +41,11 @@ urlpatterns = [
     # ==================== API - IA EVALUATION ====================
 
     path('api/evaluate-activity/', views.api_evaluate_activity, name='api_evaluate_activity'),
+    path('api/evaluate-activity/stream/', views.api_stream_evaluation, name='api_stream_evaluation'),
+    path('api/evaluate-activity/jobs/', views.api_submit_evaluation_job, name='api_submit_evaluation_job'),
+    path('api/evaluate-activity/batch/', views.api_submit_batch_evaluation_job, name='api_submit_batch_evaluation_job'),
+    path('api/evaluate-activity/jobs/<str:job_id>/', views.api_get_evaluation_job, name='api_get_evaluation_job'),
+    path('api/ai/cache-stats/', views.get_ai_cache_stats, name='api_ai_cache_stats'),
     path('api/confirm-evaluation/', views.api_confirm_evaluation, name='api_confirm_evaluation'),
 
     # ==================== API - LEGACY (COMPATIBILITY) ====================
@@ -48,6 +54,7 @@ urlpatterns = [
     path('api/add-time-block/', views.api_add_time_block, name='api_add_time_block'),
     path('api/toggle-time-block/', views.api_toggle_time_block, name='api_toggle_time_block'),
     path('api/validate-day/', views.api_validate_day, name='api_validate_day'),
+    path('api/batch/', views.api_batch_events, name='api_batch_events'),
     path('api/validate-day-planning/', views.api_validate_day_planning, name='api_validate_day_planning'),
 
     # ==================== API - SKILLS ====================
@@ -72,6 +79,7 @@ urlpatterns = [
     path('api/leaderboard/', views.get_leaderboard, name='api_leaderboard'),
     path('api/leaderboard/weekly/', views.get_leaderboard_weekly, name='api_leaderboard_weekly'),
     path('api/leaderboard/monthly/', views.get_leaderboard_monthly, name='api_leaderboard_monthly'),
+    path('api/leaderboard/window/', views.get_leaderboard_window, name='api_leaderboard_window'),
     path('api/leaderboard/simple/', views.get_leaderboard_simple, name='api_leaderboard_simple'),
     path('api/leaderboard/user-rank/', views.get_user_rank, name='api_user_rank'),
 
@@ -92,6 +100,8 @@ urlpatterns = [
     # ==================== API - DASHBOARD ====================
 
     path('api/dashboard/stats/', views.get_dashboard_stats, name='api_dashboard_stats'),
+    path('api/dashboard/heatmap/', views.get_activity_heatmap, name='api_activity_heatmap'),
+    path('api/dashboard/series/', views.get_activity_series, name='api_activity_series'),
 
     # ==================== API - RESOURCES ====================
 
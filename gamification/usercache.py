@@ -0,0 +1,92 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+
+def _version_key(user_id):
+    return f'user:{user_id}:version'
+
+
+def user_version(user_id):
+    """✅ Version courante de l'état d'un utilisateur (initialisée à la première lecture)
+
+    La valeur initiale est un horodatage : si la clé est évincée du cache, la nouvelle
+    version ne retombe jamais sur une ancienne et les anciennes réponses deviennent orphelines.
+    """
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_user_version(user_id):
+    """✅ Invalide toutes les réponses en cache d'un utilisateur"""
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def _response_key(request, name, user_id):
+    path = hashlib.md5(f'{request.get_host()}{request.get_full_path()}'.encode()).hexdigest()
+    return f'user:{user_id}:{user_version(user_id)}:{name}:{path}'
+
+
+def cached_per_user(view_func):
+    """✅ Met en cache la réponse d'une vue GET par utilisateur et par version
+
+    À placer juste au-dessus de la fonction (sous @api_view / @login_required) pour
+    que request.user soit authentifié. Seules les réponses 200 sont conservées.
+    """
+    name = view_func.__name__
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        user = request.user
+        if not user.is_authenticated or request.method != 'GET':
+            return view_func(request, *args, **kwargs)
+
+        key = _response_key(request, name, user.id)
+        cached = cache.get(key)
+        if cached is not None:
+            kind, payload, content_type = cached
+            if kind == 'drf':
+                return Response(payload)
+            return HttpResponse(payload, content_type=content_type)
+
+        response = view_func(request, *args, **kwargs)
+        if response.status_code == 200:
+            if isinstance(response, Response):
+                entry = ('drf', response.data, None)
+            else:
+                entry = ('raw', response.content, response.get('Content-Type'))
+            cache.set(key, entry, timeout=getattr(settings, 'USER_CACHE_TIMEOUT', 300))
+        return response
+
+    return wrapper
+
+
+def invalidates_user_cache(view_func):
+    """✅ Incrémente la version de l'utilisateur après une écriture
+
+    Y compris en cas d'erreur : les vues d'écriture peuvent avoir enregistré une partie
+    des données avant d'échouer.
+    """
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            if request.user.is_authenticated:
+                bump_user_version(request.user.id)
+
+    return wrapper
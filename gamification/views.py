@@ -1,38 +1,36 @@
 from django.shortcuts import render, redirect
+from django.urls import reverse
 from django.views.generic import TemplateView, ListView
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login
 from django.utils.decorators import method_decorator
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
 
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework import status
 
-from django.db.models import Q, Sum, Count, Avg
+from django.db.models import Q, Count, Avg, Prefetch
 from django.utils import timezone
 from datetime import timedelta, datetime
 
 import json
-import requests
-import os
 import time
-import re
 import csv
 from io import StringIO
 from dotenv import load_dotenv
 
 from .models import (
     UserProfile, Skill, UserSkill, Achievement, UserAchievement,
-    Challenge, UserChallenge, StudySession, Action, PersonalityTrait,
+    Challenge, UserChallenge, StudySession, Action,
     UserPersonalityTrait, ActivityEvaluation, EvaluationTraitLink,
     ActivityArtifact, Resource, CheckedResource,
-    StudySubject, StudyChapter, StudySection
+    StudySubject, StudyChapter, StudySection, UserSummary
 )
 
 from .serializers import (
@@ -44,24 +42,15 @@ from .serializers import (
     UserRankSerializer, ResourceSerializer,
     StudySubjectSerializer, StudyChapterSerializer, StudySectionSerializer
 )
+from . import (
+    activities, ai, awards, idempotency, jobs, leaderboard, leveling, pagination, quotas, resources, rollups,
+    sse, summaries, traits, usercache
+)
 
 load_dotenv()
 
 # ==================== HELPER FUNCTIONS ====================
 
-def calculate_level_from_xp(total_xp):
-    """✅ Calcule le level en fonction du total XP"""
-    level = 1
-    cumulative_xp = 0
-    while True:
-        xp_for_next = level * (level + 1) * 50
-        if cumulative_xp + xp_for_next > total_xp:
-            break
-        cumulative_xp += xp_for_next
-        level += 1
-    return min(level, 1000)
-
-
 # ==================== ERROR HANDLERS ====================
 
 def handler404(request, exception=None):
@@ -136,9 +125,9 @@ class DashboardView(TemplateView):
         try:
             profile = UserProfile.objects.get(user=self.request.user)
             context['profile'] = profile
-            context['active_challenges'] = UserChallenge.objects.filter(user=self.request.user, status='active').count()
-            context['completed_challenges'] = UserChallenge.objects.filter(user=self.request.user,
-                                                                           status='completed').count()
+            summary = summaries.get_summary(self.request.user.id)
+            context['active_challenges'] = summary.active_challenges
+            context['completed_challenges'] = summary.completed_challenges
             context['recent_achievements'] = UserAchievement.objects.filter(user=self.request.user).order_by(
                 '-unlocked_at')[:5]
             context['top_skills'] = UserSkill.objects.filter(user=self.request.user).order_by('-experience')[:3]
@@ -213,16 +202,10 @@ class LeaderboardView(TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        leaderboard = UserProfile.objects.all().order_by('-experience_points')[:50]
-        context['leaderboard'] = leaderboard
-        try:
-            user_profile = UserProfile.objects.get(user=self.request.user)
-            total_users = UserProfile.objects.count()
-            rank = UserProfile.objects.filter(experience_points__gt=user_profile.experience_points).count() + 1
-            context['user_rank'] = rank
-            context['total_users'] = total_users
-        except UserProfile.DoesNotExist:
-            pass
+        context['leaderboard'] = UserProfile.objects.all().order_by('-experience_points')[:50]
+        rank = leaderboard.user_rank(self.request.user)
+        context['user_rank'] = rank['rank']
+        context['total_users'] = rank['total_users']
         return context
 
 
@@ -249,6 +232,7 @@ def skills_page(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@usercache.cached_per_user
 def get_profile(request):
     """✅ Récupère le profil utilisateur"""
     try:
@@ -281,6 +265,7 @@ def get_profile(request):
             'galaxy': profile.galaxy,
             'level_in_galaxy': profile.level_in_galaxy,
             'galaxy_name': profile.galaxy_name,
+            'xp_to_next_level': leveling.xp_to_next_level(profile.experience_points),
             'created_at': profile.created_at.isoformat() if profile.created_at else None,
             'updated_at': profile.updated_at.isoformat() if profile.updated_at else None
         }
@@ -294,6 +279,7 @@ def get_profile(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@usercache.invalidates_user_cache
 def update_profile(request):
     """✅ Met à jour le profil utilisateur"""
     try:
@@ -344,6 +330,7 @@ def update_profile(request):
 
 @require_http_methods(['GET'])
 @login_required
+@usercache.cached_per_user
 def api_get_profile_images(request):
     """
     ✅ NOUVELLE FONCTION - Récupère les URLs des images de profil et de couverture
@@ -389,6 +376,7 @@ def api_get_profile_images(request):
 
 @require_http_methods(['POST'])
 @login_required
+@usercache.invalidates_user_cache
 def api_upload_profile_image(request):
     """✅ Upload l'image de profil (VERSION AMÉLIORÉE)"""
     try:
@@ -440,6 +428,7 @@ def api_upload_profile_image(request):
 
 @require_http_methods(['POST'])
 @login_required
+@usercache.invalidates_user_cache
 def api_upload_cover_image(request):
     """✅ Upload l'image de couverture (VERSION AMÉLIORÉE)"""
     try:
@@ -490,12 +479,56 @@ def api_upload_cover_image(request):
 
 # ==================== API ENDPOINTS - GET USER DATA ====================
 
+def _evaluations_with_traits(queryset):
+    """Évaluations avec leurs liens de traits préchargés (2 requêtes quelle que soit la page)"""
+    return queryset.prefetch_related(
+        Prefetch('gamification_detected_traits', queryset=EvaluationTraitLink.objects.select_related('trait'))
+    )
+
+
+def _serialize_evaluation(eval_obj):
+    """Format JSON d'une évaluation (traits préchargés via _evaluations_with_traits)"""
+    eval_traits = []
+    for link in eval_obj.gamification_detected_traits.all():
+        eval_traits.append({
+            'name': link.trait.name,
+            'category': link.trait.get_category_display(),
+            'hpAwarded': link.hp_awarded,
+            'relevance': link.relevance
+        })
+
+    return {
+        'id': eval_obj.id,
+        'description': eval_obj.description,
+        'isValid': eval_obj.is_valid,
+        'xpAwarded': eval_obj.xp_awarded,
+        'qualityScore': eval_obj.quality_score,
+        'feedback': eval_obj.ai_feedback,
+        'type': 'ia',
+        'traits': eval_traits,
+        'detections': {
+            'booksRead': eval_obj.books_read or 0,
+            'academicArticles': eval_obj.academic_articles or 0,
+            'projectsWorked': eval_obj.projects_worked or 0,
+            'onlineCourses': eval_obj.online_courses or 0,
+            'socialContributions': eval_obj.social_contributions or 0,
+            'networkingEvents': eval_obj.networking_events or 0
+        },
+        'createdAt': eval_obj.created_at.isoformat() if eval_obj.created_at else None
+    }
+
+
 @login_required
 @require_http_methods(["GET"])
+@usercache.cached_per_user
 def api_get_user_data(request):
     """
     ✅ Récupère les données utilisateur COMPLÈTES
     Retourne: XP, Level, Traits HP, Évaluations, IMAGES, DÉTECTIONS
+
+    Les évaluations sont paginées par curseur : ?limit= (PAGINATION_SETTINGS) et
+    ?cursor= (valeur evaluationsNextCursor de la page précédente). syncSeq sert de point
+    de départ à /api/sync/.
     """
     try:
         user = request.user
@@ -514,65 +547,37 @@ def api_get_user_data(request):
             profile_image_url = None
             cover_image_url = None
 
-        # 2. RÉCUPÉRER LES TRAITS ET LEURS HP
-        traits_hp = {}
-        user_traits = UserPersonalityTrait.objects.filter(user=user)
-        for user_trait in user_traits:
-            traits_hp[user_trait.trait.name] = user_trait.hp
-
-        # 3. RÉCUPÉRER LES DÉTECTIONS CUMULÉES DEPUIS ActivityEvaluation
-        detections = {
-            'booksRead': 0,
-            'academicArticles': 0,
-            'projectsWorked': 0,
-            'onlineCourses': 0,
-            'socialContributions': 0,
-            'networkingEvents': 0
-        }
+        # 2. RÉCUPÉRER LES TRAITS ET LEURS HP (une seule requête avec jointure)
+        traits_hp = dict(
+            UserPersonalityTrait.objects.filter(user=user).values_list('trait__name', 'hp')
+        )
 
-        # 4. RÉCUPÉRER LES ÉVALUATIONS
-        evaluations_list = []
-        activity_evals = ActivityEvaluation.objects.filter(user=user).order_by('-created_at')
-
-        for eval_obj in activity_evals:
-            # Cumule les détections
-            detections['booksRead'] += eval_obj.books_read or 0
-            detections['academicArticles'] += eval_obj.academic_articles or 0
-            detections['projectsWorked'] += eval_obj.projects_worked or 0
-            detections['onlineCourses'] += eval_obj.online_courses or 0
-            detections['socialContributions'] += eval_obj.social_contributions or 0
-            detections['networkingEvents'] += eval_obj.networking_events or 0
-
-            # Traits de cette évaluation
-            eval_traits = []
-            trait_links = EvaluationTraitLink.objects.filter(evaluation=eval_obj)
-            for link in trait_links:
-                eval_traits.append({
-                    'name': link.trait.name,
-                    'category': link.trait.get_category_display(),
-                    'hpAwarded': link.hp_awarded,
-                    'relevance': link.relevance
-                })
-
-            evaluations_list.append({
-                'id': eval_obj.id,
-                'description': eval_obj.description,
-                'isValid': eval_obj.is_valid,
-                'xpAwarded': eval_obj.xp_awarded,
-                'qualityScore': eval_obj.quality_score,
-                'feedback': eval_obj.ai_feedback,
-                'type': 'ia',
-                'traits': eval_traits,
-                'detections': {
-                    'booksRead': eval_obj.books_read or 0,
-                    'academicArticles': eval_obj.academic_articles or 0,
-                    'projectsWorked': eval_obj.projects_worked or 0,
-                    'onlineCourses': eval_obj.online_courses or 0,
-                    'socialContributions': eval_obj.social_contributions or 0,
-                    'networkingEvents': eval_obj.networking_events or 0
-                },
-                'createdAt': eval_obj.created_at.isoformat() if eval_obj.created_at else None
-            })
+        # 3. DÉTECTIONS CUMULÉES : lues dans le résumé utilisateur (tenu à jour à l'écriture)
+        summary = summaries.get_summary(user.id)
+        detections = summary.detections()
+        user_evals = ActivityEvaluation.objects.filter(user=user)
+
+        # 4. RÉCUPÉRER UNE PAGE D'ÉVALUATIONS (curseur sur created_at, id)
+        limit = pagination.page_size(request)
+        activity_evals = _evaluations_with_traits(user_evals.order_by('-created_at', '-id'))
+
+        cursor = request.GET.get('cursor')
+        if cursor:
+            try:
+                cursor_created_at, cursor_id = pagination.decode_cursor(cursor)
+                cursor_created_at = datetime.fromisoformat(cursor_created_at)
+            except (pagination.InvalidCursor, TypeError, ValueError):
+                return JsonResponse({'success': False, 'error': 'Curseur invalide'}, status=400)
+            activity_evals = activity_evals.filter(
+                Q(created_at__lt=cursor_created_at) | Q(created_at=cursor_created_at, id__lt=cursor_id)
+            )
+
+        page = list(activity_evals[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+        next_cursor = pagination.encode_cursor(page[-1].created_at.isoformat(), page[-1].id) if has_more else None
+
+        evaluations_list = [_serialize_evaluation(eval_obj) for eval_obj in page]
 
         # ✅ AJOUTER LES IMAGES ET DÉTECTIONS À LA RÉPONSE
         response_data = {
@@ -581,6 +586,11 @@ def api_get_user_data(request):
             'level': level,
             'traitsHP': traits_hp,
             'evaluations': evaluations_list,
+            'evaluationsCount': summary.evaluations_count,
+            'evaluationsXP': summary.evaluations_xp,
+            'evaluationsHP': summary.evaluations_hp,
+            'evaluationsNextCursor': next_cursor,
+            'syncSeq': summary.change_seq,
             'detections': detections,
             'acquired_skills': profile.acquired_skills or [],
             'discovered_categories': profile.discovered_categories or [],
@@ -603,156 +613,80 @@ def api_get_user_data(request):
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 
-# ==================== API ENDPOINTS - DAILY ACTIVITIES ====================
-
-@require_http_methods(["POST"])
-@require_http_methods(["POST"])
 @login_required
-def api_save_daily_activity(request):
-    """✅ Sauvegarde les activités quotidiennes - VERSION AMÉLIORÉE avec support barèmes sommeil"""
-    try:
-        data = json.loads(request.body)
-        activities = data.get('activities', [])
-        if not activities:
-            return JsonResponse({'success': False, 'error': 'Aucune activité fournie'}, status=400)
+@require_http_methods(["GET"])
+def api_sync_user_data(request):
+    """
+    ✅ Sync incrémental : uniquement ce qui a changé depuis ?since=<syncSeq>
 
+    - evaluations : évaluations créées ou complétées depuis `since` (par ordre de séquence,
+      au plus PAGINATION_SETTINGS ; hasMore = rappeler avec le nouveau seq)
+    - traitsHP : seulement les traits dont les HP ont changé
+    - profile : XP, niveau, détections et compteurs courants (une seule ligne)
+    - reset = true : le client doit recharger /api/get-user-data/ (since absent ou inconnu)
+    """
+    try:
         user = request.user
-        profile, _ = UserProfile.objects.get_or_create(user=user)
+        try:
+            since = int(request.GET.get('since', 0))
+        except (TypeError, ValueError):
+            return JsonResponse({'success': False, 'error': 'Paramètre since invalide'}, status=400)
 
-        # Map de scoring de base - utilisé si le frontend n'envoie pas de HP calculés
-        FALLBACK_SCORING_MAP = {
-            1: {'xp': 50, 'traits': {'Résilience': 30, 'Discipline': 50}},
-            2: {'xp': 40, 'traits': {'Discipline': 40}},
-            3: {'xp': 60, 'traits': {'Discipline': 35, 'Apprentissage': 50}},
-            4: {'xp': 45, 'traits': {'Discipline': 45}},
-            5: {'xp': 35, 'traits': {'Discipline': 35}},
-            6: {'xp': 70, 'traits': {'Discipline': 50, 'Accomplissement': 40}},
-            7: {'xp': 55, 'traits': {'Discipline': 45}},
-            8: {'xp': 30, 'traits': {'Discipline': 30}},
-            9: {'xp': 50, 'traits': {'Discipline': 40, 'Ambition': 30}},
-            10: {'xp': 60, 'traits': {'Discipline': 50}},
-            11: {'xp': 40, 'traits': {'Apprentissage': 40}},
-            12: {'xp': 35, 'traits': {'Discipline': 35}},
-            13: {'xp': 65, 'traits': {'Discipline': 50, 'Ambition': 40}},
-            14: {'xp': 45, 'traits': {'Discipline': 40}},
-            15: {'xp': 50, 'traits': {'Discipline': 50}},
-            16: {'xp': 55, 'traits': {'Discipline': 45, 'Ambition': 35}},
-            17: {'xp': 40, 'traits': {'Résilience': 35}},
-            18: {'xp': 45, 'traits': {'Discipline': 45}},
-            19: {'xp': 70, 'traits': {'Discipline': 60, 'Ambition': 50}},
-            20: {'xp': 50, 'traits': {'Discipline': 50}},
-            21: {'xp': 60, 'traits': {'Discipline': 50, 'Apprentissage': 40}},
-            22: {'xp': 55, 'traits': {'Discipline': 45, 'Ambition': 35}},
-            23: {'xp': 75, 'traits': {'Discipline': 60, 'Accomplissement': 50}},
+        summary = summaries.get_summary(user.id)
+        profile, _ = UserProfile.objects.get_or_create(user=user)
+        response_data = {
+            'success': True,
+            'seq': summary.change_seq,
+            'reset': since <= 0 or since > summary.change_seq,
+            'hasMore': False,
+            'profile': {
+                'totalXP': profile.experience_points,
+                'level': profile.level,
+                'evaluationsCount': summary.evaluations_count,
+                'evaluationsXP': summary.evaluations_xp,
+                'evaluationsHP': summary.evaluations_hp,
+                'detections': summary.detections(),
+            },
+            'traitsHP': {},
+            'evaluations': [],
         }
-
-        total_xp = 0
-        traits_hp_gained = {}
-        eval_description = f"Activités quotidiennes: {len(activities)} activités"
-
-        evaluation = ActivityEvaluation.objects.create(
-            user=user,
-            description=eval_description,
-            is_valid=True,
-            ai_feedback="Activités quotidiennes enregistrées"
+        if response_data['reset'] or since == summary.change_seq:
+            return JsonResponse(response_data)
+
+        limit = pagination.page_size(request)
+        changed_evals = list(_evaluations_with_traits(
+            ActivityEvaluation.objects.filter(user=user, change_seq__gt=since).order_by('change_seq')
+        )[:limit + 1])
+        if len(changed_evals) > limit:
+            changed_evals = changed_evals[:limit]
+            response_data['hasMore'] = True
+            response_data['seq'] = changed_evals[-1].change_seq
+
+        response_data['evaluations'] = [_serialize_evaluation(eval_obj) for eval_obj in changed_evals]
+        response_data['traitsHP'] = dict(
+            UserPersonalityTrait.objects.filter(user=user, change_seq__gt=since).values_list('trait__name', 'hp')
         )
+        return JsonResponse(response_data)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
-        for activity in activities:
-            activity_id = activity.get('id')
-            activity_name = activity.get('name', f'Activité {activity_id}')
-            
-            # ✅ NOUVEAU: Si le frontend envoie les HP calculés (pour sommeil/sieste avec barèmes)
-            if 'hp' in activity and 'traits' in activity:
-                hp_total = activity.get('hp', 0)
-                traits_from_frontend = activity.get('traits', [])
-                
-                # Calculer la somme des HP de base des traits
-                base_hp_sum = sum(t.get('hp', 0) for t in traits_from_frontend)
-                
-                # Appliquer le ratio aux traits
-                for trait_info in traits_from_frontend:
-                    trait_name = trait_info.get('name')
-                    base_trait_hp = trait_info.get('hp', 0)
-                    
-                    if trait_name and base_hp_sum > 0:
-                        # Calculer le HP proportionnel basé sur le HP total calculé
-                        # Exemple: Si sommeil devrait donner 200 HP base mais donne 150 HP réel
-                        # Et un trait vaut 120 HP base, il recevra (120/200) * 150 = 90 HP
-                        hp_amount = int((base_trait_hp / base_hp_sum) * hp_total)
-                        
-                        traits_hp_gained[trait_name] = traits_hp_gained.get(trait_name, 0) + hp_amount
-                        
-                        trait, _ = PersonalityTrait.objects.get_or_create(
-                            name=trait_name,
-                            defaults={'category': 'behavioral'}
-                        )
-
-                        EvaluationTraitLink.objects.create(
-                            evaluation=evaluation,
-                            trait=trait,
-                            hp_awarded=hp_amount,
-                            relevance=f"{activity_name}: {trait_name}"
-                        )
-
-                        user_trait, created = UserPersonalityTrait.objects.get_or_create(
-                            user=user,
-                            trait=trait
-                        )
-
-                        user_trait.hp += hp_amount
-                        user_trait.save()
-                        
-            # ✅ ANCIEN: Fallback pour les activités qui utilisent le scoring map
-            elif activity_id in FALLBACK_SCORING_MAP:
-                scoring = FALLBACK_SCORING_MAP[activity_id]
-                total_xp += scoring['xp']
-
-                for trait_name, hp_amount in scoring['traits'].items():
-                    traits_hp_gained[trait_name] = traits_hp_gained.get(trait_name, 0) + hp_amount
-
-                    trait, _ = PersonalityTrait.objects.get_or_create(
-                        name=trait_name,
-                        defaults={'category': 'behavioral'}
-                    )
-
-                    EvaluationTraitLink.objects.create(
-                        evaluation=evaluation,
-                        trait=trait,
-                        hp_awarded=hp_amount,
-                        relevance=f"{activity_name}: {trait_name}"
-                    )
-
-                    user_trait, created = UserPersonalityTrait.objects.get_or_create(
-                        user=user,
-                        trait=trait
-                    )
-
-                    user_trait.hp += hp_amount
-                    user_trait.save()
-
-        evaluation.xp_awarded = 0
-        evaluation.save()
-
-        profile.experience_points += total_xp
-        profile.level = calculate_level_from_xp(profile.experience_points)
-        profile.total_points += total_xp
-        profile.save()
 
-        Action.objects.create(
-            user=user,
-            action_type='quotidien',
-            description=eval_description,
-            points=0
-        )
+# ==================== API ENDPOINTS - DAILY ACTIVITIES ====================
 
-        return JsonResponse({
-            'success': True,
-            'message': 'Activités enregistrées',
-            'total_xp': total_xp,
-            'traits_hp': traits_hp_gained,
-            'level': profile.level,
-            'evaluation_id': evaluation.id
-        })
+@require_http_methods(["POST"])
+@require_http_methods(["POST"])
+@login_required
+@usercache.invalidates_user_cache
+@idempotency.idempotent
+def api_save_daily_activity(request):
+    """✅ Sauvegarde les activités quotidiennes - VERSION AMÉLIORÉE avec support barèmes sommeil"""
+    try:
+        result, profile = activities.apply(request.user, activities.daily_activities, json.loads(request.body))
+        return JsonResponse({'success': True, **result, 'level': profile.level})
+    except activities.ActivityError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -763,24 +697,26 @@ def api_save_daily_activity(request):
 @require_http_methods(["GET"])
 @login_required
 def api_get_streak(request):
-    """✅ Récupère la streak de l'utilisateur"""
+    """✅ Récupère la streak de l'utilisateur (lecture d'une ligne du résumé, tenue à jour à chaque action)"""
     try:
         user = request.user
-        profile, _ = UserProfile.objects.get_or_create(user=user)
-
-        today = timezone.now().date()
-        streak = 0
-        current_date = today
+        fields = (*summaries.STREAK_FIELDS, 'user__gamification_profile__experience_points')
+        row = UserSummary.objects.filter(user=user).values(*fields).first()
+        if row is None:
+            # Premier accès : résumé calculé depuis l'historique
+            summaries.get_summary(user.id)
+            row = UserSummary.objects.filter(user=user).values(*fields).get()
 
-        while True:
-            actions = Action.objects.filter(user=user, created_at__date=current_date)
-            if actions.exists():
-                streak += 1
-                current_date -= timedelta(days=1)
-            else:
-                break
+        today = timezone.localdate()
+        streak = row['current_streak'] if row['last_active_day'] == today else 0
 
-        return JsonResponse({'success': True, 'streak': streak, 'last_activity': profile.experience_points})
+        return JsonResponse({
+            'success': True,
+            'streak': streak,
+            'longest_streak': row['longest_streak'],
+            'last_active_day': row['last_active_day'].isoformat() if row['last_active_day'] else None,
+            'last_activity': row['user__gamification_profile__experience_points'] or 0,
+        })
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -791,67 +727,13 @@ def api_get_streak(request):
 
 @require_http_methods(["POST"])
 @login_required
+@usercache.invalidates_user_cache
+@idempotency.idempotent
 def api_validate_day_planning(request):
     """✅ Valide le planning de la journée"""
     try:
-        data = json.loads(request.body)
-        user = request.user
-        profile, _ = UserProfile.objects.get_or_create(user=user)
-
-        hp_rewards = {
-            'Discipline': 25,
-            'Organisation': 20,
-            'Exécution': 20,
-            'Accomplissement': 15,
-            'Ambition': 10
-        }
-
-        evaluation = ActivityEvaluation.objects.create(
-            user=user,
-            description="Planning validé",
-            is_valid=True,
-            xp_awarded=0,
-            ai_feedback="Planning de la journée validé"
-        )
-
-        traits_hp_gained = {}
-
-        for trait_name, hp_amount in hp_rewards.items():
-            traits_hp_gained[trait_name] = hp_amount
-
-            trait, _ = PersonalityTrait.objects.get_or_create(
-                name=trait_name,
-                defaults={'category': 'behavioral'}
-            )
-
-            EvaluationTraitLink.objects.create(
-                evaluation=evaluation,
-                trait=trait,
-                hp_awarded=hp_amount,
-                relevance=f"Planning validé: {trait_name}"
-            )
-
-            user_trait, created = UserPersonalityTrait.objects.get_or_create(
-                user=user,
-                trait=trait
-            )
-
-            user_trait.hp += hp_amount
-            user_trait.save()
-
-        Action.objects.create(
-            user=user,
-            action_type='day_validated',
-            description="Planning validé",
-            points=0
-        )
-
-        return JsonResponse({
-            'success': True,
-            'hp_gained': 90,
-            'traits_hp': traits_hp_gained,
-            'evaluation_id': evaluation.id
-        })
+        result, profile = activities.apply(request.user, activities.validate_planning, {})
+        return JsonResponse({'success': True, **result, 'level': profile.level})
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -862,12 +744,16 @@ def api_validate_day_planning(request):
 
 @require_http_methods(["POST"])
 @login_required
+@quotas.ai_quota()
 def api_evaluate_activity(request):
     """✅ Évalue une activité avec l'IA - VERSION CORRIGÉE
     
     Cette fonction ANALYSE SEULEMENT l'activité et retourne les résultats.
     Elle NE DOIT PAS enregistrer en base de données.
     L'enregistrement se fait uniquement via api_confirm_evaluation().
+
+    ⚠️ Appel synchrone (bloque le worker pendant l'appel IA) : préférer
+    api_submit_evaluation_job() + api_get_evaluation_job().
     """
     try:
         data = json.loads(request.body)
@@ -879,10 +765,6 @@ def api_evaluate_activity(request):
 
         profile, _ = UserProfile.objects.get_or_create(user=user)
 
-        api_key = os.getenv('PERPLEXITY_API_KEY')
-        if not api_key:
-            return JsonResponse({'success': False, 'error': 'PERPLEXITY_API_KEY not configured'}, status=400)
-
         # 🔍 DEBUG
         print("\n" + "=" * 100)
         print("📊 ANALYSE IA (SANS ENREGISTREMENT)")
@@ -890,100 +772,24 @@ def api_evaluate_activity(request):
         print(f"   Description: {description[:100]}...")
         print("=" * 100)
 
-        prompt = f"""Analyse cette activité et retourne UNIQUEMENT du JSON (pas de texte avant/après):
-
-Activité: {description}
-
-Retourne ce JSON valide:
-{{
-"isValid": true,
-"xpAmount": 100,
-"qualityScore": 0.8,
-"feedback": "Analyse courte",
-"personalityTraits": [
-{{"name": "Discipline", "hpAmount": 35, "relevance": "Effort soutenu"}}
-],
-"detections": {{
-"booksRead": 0,
-"academicArticles": 0,
-"projectsWorked": 0,
-"onlineCourses": 0,
-"socialContributions": 0,
-"networkingEvents": 0
-}}
-}}"""
-
-        headers = {'Authorization': f'Bearer {api_key}'}
-        payload = {
-            'model': 'sonar',
-            'messages': [{'role': 'user', 'content': prompt}]
-        }
-
-        print("📤 Appel API Perplexity...")
-        response = requests.post(
-            'https://api.perplexity.ai/chat/completions',
-            json=payload,
-            headers=headers,
-            timeout=30
-        )
-
-        if response.status_code != 200:
-            print(f"❌ Erreur API: {response.status_code}")
-            return JsonResponse({'success': False, 'error': f'API error: {response.status_code}'}, status=400)
-
-        result = response.json()
-        content = result['choices'][0]['message']['content']
-        
-        print("📥 Réponse IA reçue")
-
-        json_match = re.search(r'\{.*\}', content, re.DOTALL)
-        if not json_match:
-            print("❌ Impossible de parser la réponse")
-            return JsonResponse({'success': False, 'error': 'Could not parse AI response'}, status=400)
+        try:
+            result = ai.evaluate(description)
+        except ai.AIError as e:
+            print(f"❌ {e}")
+            response = JsonResponse({'success': False, 'error': str(e)}, status=e.status)
+            if e.retry_after:
+                response['Retry-After'] = str(e.retry_after)
+            return response
 
-        evaluation_data = json.loads(json_match.group())
-        
-        # 📊 Calculer les totaux pour affichage
-        total_xp = evaluation_data.get('xpAmount', 50) if evaluation_data.get('isValid') else 0
-        
-        # Convertir les traits au format attendu par le frontend
-        traits_for_frontend = []
-        traits_hp_dict = {}
-        
-        for trait_data in evaluation_data.get('personalityTraits', []):
-            trait_name = trait_data.get('name')
-            hp_amount = trait_data.get('hpAmount', 0)
-            relevance = trait_data.get('relevance', '')
-            
-            traits_for_frontend.append({
-                'name': trait_name,
-                'hp_amount': hp_amount,  # Note: hp_amount (pas hpAmount) pour le frontend
-                'relevance': relevance
-            })
-            
-            traits_hp_dict[trait_name] = hp_amount
-        
         print(f"\n✅ ANALYSE TERMINÉE (AUCUN ENREGISTREMENT)")
-        print(f"   XP calculé: {total_xp}")
-        print(f"   Traits détectés: {len(traits_for_frontend)}")
-        for trait in traits_for_frontend:
-            print(f"      - {trait['name']}: {trait['hp_amount']} HP")
-        print(f"   Artéfacts: {evaluation_data.get('detections', {})}")
+        print(f"   XP calculé: {result['total_xp']}")
+        print(f"   Traits détectés: {len(result['personality_traits'])}")
+        print(f"   Artéfacts: {result['detections']}")
         print("=" * 100 + "\n")
 
         # ✅ RETOURNE SEULEMENT LES DONNÉES (PAS D'ENREGISTREMENT!)
-        return JsonResponse({
-            'success': True,
-            'total_xp': total_xp,
-            'traits_hp': traits_hp_dict,  # Pour l'affichage du total HP
-            'personality_traits': traits_for_frontend,  # Pour l'enregistrement ultérieur
-            'detections': evaluation_data.get('detections', {}),
-            'quality_score': evaluation_data.get('qualityScore', 0.5),
-            'feedback': evaluation_data.get('feedback', ''),
-            'is_valid': evaluation_data.get('isValid', True),
-            'level': profile.level,
-            # ⚠️ PAS d'evaluation_id car rien n'a été créé en base!
-        })
+        # ⚠️ PAS d'evaluation_id car rien n'a été créé en base!
+        return JsonResponse({'success': True, **result, 'level': profile.level})
         
     except Exception as e:
         print("\n❌ ERREUR DANS api_evaluate_activity:")
@@ -992,8 +798,130 @@ Retourne ce JSON valide:
         traceback.print_exc()
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
+
+@require_http_methods(["POST"])
+@login_required
+@quotas.ai_quota()
+def api_stream_evaluation(request):
+    """✅ Évalue une activité en streaming (Server-Sent Events) - analyse seule, sans enregistrement
+
+    Même corps que api_evaluate_activity. Événements : 'start' (immédiat), 'token' pour
+    chaque fragment de la réponse du modèle ({"text": ...}), puis 'result' (format de
+    api_evaluate_activity) ou 'error' ({"success": false, "error", "status"}).
+    Servi en ASGI (gamification_config.asgi) sans bloquer la boucle d'événements.
+    """
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'JSON invalide'}, status=400)
+    description = data.get('description', '') if isinstance(data, dict) else ''
+    if not description:
+        return JsonResponse({'success': False, 'error': 'Description vide'}, status=400)
+
+    level = UserProfile.objects.filter(user=request.user).values_list('level', flat=True).first() or 1
+
+    def events():
+        yield sse.event('start', {'success': True})
+        for name, payload in ai.stream_evaluation(description):
+            if name == 'token':
+                yield sse.event(name, {'text': payload})
+            elif name == 'result':
+                yield sse.event(name, {'success': True, **payload, 'level': level})
+            else:
+                yield sse.event(name, {'success': False, **payload})
+
+    response = StreamingHttpResponse(sse.stream_for(request, events()), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Désactive le buffering des proxys (nginx) pour que chaque événement parte tout de suite
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_http_methods(["POST"])
+@login_required
+@quotas.ai_quota()
+def api_submit_evaluation_job(request):
+    """✅ Soumet une évaluation IA en tâche de fond et retourne tout de suite l'id du job (202)
+
+    Même corps que api_evaluate_activity ; le résultat se lit via api_get_evaluation_job().
+    """
+    try:
+        data = json.loads(request.body)
+        description = data.get('description', '')
+        if not description:
+            return JsonResponse({'success': False, 'error': 'Description vide'}, status=400)
+
+        job = jobs.submit(request.user.id, description)
+        return JsonResponse({
+            'success': True,
+            'job_id': job['id'],
+            'status': job['status'],
+            'status_url': reverse('gamification:api_get_evaluation_job', args=[job['id']]),
+        }, status=202)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+
+@require_http_methods(["POST"])
+@login_required
+@quotas.ai_quota(cost=lambda data: len(data.get('descriptions') or []))
+def api_submit_batch_evaluation_job(request):
+    """✅ Évalue plusieurs activités en un seul appel IA (job en tâche de fond, 202)
+
+    Corps : {"descriptions": ["...", "..."]}. Le résultat du job contient `results`, une
+    entrée par description au format de api_evaluate_activity (+ index / success).
+    """
+    try:
+        data = json.loads(request.body)
+        descriptions = data.get('descriptions')
+        max_items = ai.ai_settings().get('BATCH_MAX_ITEMS', 10)
+
+        if not isinstance(descriptions, list) or not descriptions:
+            return JsonResponse({'success': False, 'error': 'descriptions doit être une liste non vide'}, status=400)
+        if len(descriptions) > max_items:
+            return JsonResponse({'success': False, 'error': f'Maximum {max_items} descriptions par lot'}, status=400)
+        if not all(isinstance(description, str) and description.strip() for description in descriptions):
+            return JsonResponse({'success': False, 'error': 'Description vide'}, status=400)
+
+        job = jobs.submit(request.user.id, descriptions)
+        return JsonResponse({
+            'success': True,
+            'job_id': job['id'],
+            'status': job['status'],
+            'status_url': reverse('gamification:api_get_evaluation_job', args=[job['id']]),
+        }, status=202)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+
+@require_http_methods(["GET"])
+@login_required
+def api_get_evaluation_job(request, job_id):
+    """✅ État d'un job d'évaluation ; une fois terminé, résultat au format de api_evaluate_activity"""
+    job = jobs.get(job_id)
+    if job is None or job['user_id'] != request.user.id:
+        return JsonResponse({'success': False, 'error': 'Job introuvable'}, status=404)
+
+    if job['status'] == jobs.FAILED:
+        response = JsonResponse({'success': False, 'job_id': job_id, 'status': job['status'], 'error': job['error']},
+                                status=job.get('error_status', 400))
+        if job.get('retry_after'):
+            response['Retry-After'] = str(job['retry_after'])
+        return response
+    if job['status'] != jobs.DONE:
+        return JsonResponse({'success': True, 'job_id': job_id, 'status': job['status']})
+
+    level = UserProfile.objects.filter(user=request.user).values_list('level', flat=True).first() or 1
+    return JsonResponse({'success': True, 'job_id': job_id, 'status': job['status'], **job['result'], 'level': level})
+
 @require_http_methods(["POST"])
 @login_required
+@usercache.invalidates_user_cache
+@idempotency.idempotent
 def api_confirm_evaluation(request):
     """✅ Confirme une évaluation IA - VERSION CORRIGÉE
     
@@ -1043,80 +971,40 @@ def api_confirm_evaluation(request):
         print(f"✅ Évaluation créée (ID: {evaluation.id})")
         
         # ✅ METTRE À JOUR LE PROFIL UTILISATEUR (XP)
-        profile, _ = UserProfile.objects.get_or_create(user=user)
-        old_xp = profile.experience_points
-        profile.experience_points += xp_amount
-        profile.level = calculate_level_from_xp(profile.experience_points)
-        profile.save()
-        print(f"✅ Profil mis à jour: XP {old_xp} → {profile.experience_points} (Niveau {profile.level})")
+        profile = awards.award_xp(user, xp_amount)
+        print(f"✅ Profil mis à jour: XP +{xp_amount} → {profile.experience_points} (Niveau {profile.level})")
         
         # Compteurs
-        traits_processed = 0
         traits_errors = []
-        total_hp_awarded = 0
         
-        # ✅ TRAITER LES TRAITS
+        # ✅ VALIDER LES TRAITS
+        trait_awards = []
         for trait_index, trait_data in enumerate(personality_traits):
-            try:
-                trait_name = trait_data.get('name')
-                hp_amount = trait_data.get('hp_amount', 0)
-                relevance = trait_data.get('relevance', 'Détecté par IA')
-                
-                print(f"\n🔹 Trait #{trait_index+1}: {trait_name}")
-                print(f"   HP: {hp_amount} (type: {type(hp_amount)})")
-                
-                # Vérifier que hp_amount est bien un nombre
-                if not isinstance(hp_amount, (int, float)):
-                    error_msg = f"hp_amount invalide pour {trait_name}: {hp_amount} (type: {type(hp_amount)})"
-                    print(f"   ⚠️  {error_msg}")
-                    traits_errors.append(error_msg)
-                    hp_amount = 0
-                
-                if not trait_name:
-                    error_msg = f"Nom de trait manquant à l'index {trait_index}"
-                    print(f"   ❌ {error_msg}")
-                    traits_errors.append(error_msg)
-                    continue
-                
-                # Créer ou récupérer le trait
-                trait, trait_created = PersonalityTrait.objects.get_or_create(
-                    name=trait_name,
-                    defaults={'category': 'behavioral'}
-                )
-                print(f"   {'🆕' if trait_created else '✓'} Trait {'créé' if trait_created else 'existant'}")
-                
-                # Créer le lien évaluation-trait
-                eval_link = EvaluationTraitLink.objects.create(
-                    evaluation=evaluation,
-                    trait=trait,
-                    hp_awarded=hp_amount,
-                    relevance=relevance
-                )
-                print(f"   ✓ Lien créé (ID: {eval_link.id})")
-                
-                # Mettre à jour le trait utilisateur
-                user_trait, ut_created = UserPersonalityTrait.objects.get_or_create(
-                    user=user,
-                    trait=trait
-                )
-                old_hp = user_trait.hp
-                user_trait.hp += hp_amount
-                user_trait.save()
-                print(f"   ✓ UserTrait mis à jour: {old_hp} → {user_trait.hp} (+{hp_amount})")
-                
-                total_hp_awarded += hp_amount
-                traits_processed += 1
-                print(f"   ✅ Trait traité avec succès (Total: {traits_processed}/{len(personality_traits)})")
-                
-            except Exception as trait_error:
-                error_msg = f"Erreur trait {trait_name}: {str(trait_error)}"
+            trait_name = trait_data.get('name')
+            hp_amount = trait_data.get('hp_amount', 0)
+            relevance = trait_data.get('relevance', 'Détecté par IA')
+
+            # Vérifier que hp_amount est bien un nombre
+            if not isinstance(hp_amount, (int, float)):
+                error_msg = f"hp_amount invalide pour {trait_name}: {hp_amount} (type: {type(hp_amount)})"
+                print(f"   ⚠️  {error_msg}")
                 traits_errors.append(error_msg)
+                hp_amount = 0
+
+            if not trait_name:
+                error_msg = f"Nom de trait manquant à l'index {trait_index}"
                 print(f"   ❌ {error_msg}")
-                import traceback
-                traceback.print_exc()
-                # Continue avec les autres traits
+                traits_errors.append(error_msg)
                 continue
-        
+
+            trait_awards.append((trait_name, int(hp_amount), relevance))
+
+        # ✅ ENREGISTRER TOUS LES TRAITS EN UNE FOIS (liens + HP utilisateur + classement)
+        traits_hp_awarded = traits.award_traits(user, evaluation, trait_awards)
+        traits_processed = len(trait_awards)
+        total_hp_awarded = sum(traits_hp_awarded.values())
+        print(f"✅ {len(traits_hp_awarded)} traits enregistrés (+{total_hp_awarded} HP)")
+
         # ✅ CRÉER UNE ACTION
         Action.objects.create(
             user=user,
@@ -1185,12 +1073,13 @@ def api_confirm_evaluation(request):
 
 @require_http_methods(["POST"])
 @login_required
+@usercache.invalidates_user_cache
+@idempotency.idempotent
 def api_save_challenge_data(request):
     """✅ Sauvegarde les données de défi"""
     try:
         data = json.loads(request.body)
         user = request.user
-        profile, _ = UserProfile.objects.get_or_create(user=user)
 
         evaluation = ActivityEvaluation.objects.create(
             user=user,
@@ -1200,10 +1089,8 @@ def api_save_challenge_data(request):
             ai_feedback="Défi validé"
         )
 
-        profile.experience_points += data.get('xp_amount', 50)
-        profile.level = calculate_level_from_xp(profile.experience_points)
-        profile.total_points += data.get('xp_amount', 50)
-        profile.save()
+        xp_amount = data.get('xp_amount', 50)
+        profile = awards.award_xp(user, xp_amount, points=xp_amount)
 
         Action.objects.create(
             user=user,
@@ -1226,39 +1113,13 @@ def api_save_challenge_data(request):
 
 @require_http_methods(["POST"])
 @login_required
+@usercache.invalidates_user_cache
+@idempotency.idempotent
 def api_add_time_block(request):
     """✅ Ajoute un bloc de temps"""
     try:
-        data = json.loads(request.body)
-        user = request.user
-        profile, _ = UserProfile.objects.get_or_create(user=user)
-
-        evaluation = ActivityEvaluation.objects.create(
-            user=user,
-            description=f"Bloc de temps: {data.get('title', 'Sans titre')}",
-            is_valid=True,
-            xp_awarded=data.get('xp_amount', 30),
-            ai_feedback="Bloc de temps enregistré"
-        )
-
-        profile.experience_points += data.get('xp_amount', 30)
-        profile.level = calculate_level_from_xp(profile.experience_points)
-        profile.total_points += data.get('xp_amount', 30)
-        profile.save()
-
-        Action.objects.create(
-            user=user,
-            action_type='time_block',
-            description=f"Bloc: {data.get('title', 'Sans titre')}",
-            points=data.get('xp_amount', 30)
-        )
-
-        return JsonResponse({
-            'success': True,
-            'total_xp': data.get('xp_amount', 30),
-            'level': profile.level,
-            'evaluation_id': evaluation.id
-        })
+        result, profile = activities.apply(request.user, activities.time_block, json.loads(request.body))
+        return JsonResponse({'success': True, **result, 'level': profile.level})
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -1270,18 +1131,8 @@ def api_add_time_block(request):
 def api_toggle_time_block(request):
     """✅ Bascule l'état d'un bloc de temps"""
     try:
-        data = json.loads(request.body)
-        user = request.user
-        status = data.get('status', 'completed')
-
-        Action.objects.create(
-            user=user,
-            action_type='time_block_toggled',
-            description=f"Bloc de temps: {status}",
-            points=0
-        )
-
-        return JsonResponse({'success': True, 'status': status})
+        result, profile = activities.apply(request.user, activities.toggle_time_block, json.loads(request.body))
+        return JsonResponse({'success': True, **result, 'level': profile.level})
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -1290,25 +1141,46 @@ def api_toggle_time_block(request):
 
 @require_http_methods(["POST"])
 @login_required
+@usercache.invalidates_user_cache
+@idempotency.idempotent
 def api_validate_day(request):
     """✅ Valide la journée"""
     try:
-        user = request.user
-        profile, _ = UserProfile.objects.get_or_create(user=user)
+        result, profile = activities.apply(request.user, activities.validate_day, {})
+        return JsonResponse({'success': True, **result, 'level': profile.level})
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
-        profile.experience_points += 100
-        profile.level = calculate_level_from_xp(profile.experience_points)
-        profile.total_points += 100
-        profile.save()
 
-        Action.objects.create(
-            user=user,
-            action_type='day_validated',
-            description="Journée validée",
-            points=100
-        )
+@require_http_methods(["POST"])
+@login_required
+@usercache.invalidates_user_cache
+@idempotency.idempotent
+def api_batch_events(request):
+    """
+    ✅ Applique une file d'événements en un seul aller-retour et une seule transaction
+    Body: {"events": [{"type": "activity|time_block|toggle|validate_day|planning", "data": {...}}, ...]}
+    Retourne un résultat par événement (dans l'ordre) + l'état final du profil.
+    """
+    try:
+        events = json.loads(request.body).get('events', [])
+        if not isinstance(events, list) or not events:
+            return JsonResponse({'success': False, 'error': 'Aucun événement fourni'}, status=400)
+        if len(events) > activities.BATCH_MAX_EVENTS:
+            return JsonResponse({
+                'success': False,
+                'error': f'Trop d\'événements (max {activities.BATCH_MAX_EVENTS})'
+            }, status=400)
 
-        return JsonResponse({'success': True, 'total_xp': 100, 'level': profile.level})
+        results, profile = activities.apply_batch(request.user, events)
+        return JsonResponse({
+            'success': all(item['success'] for item in results),
+            'results': results,
+            'experience_points': profile.experience_points,
+            'level': profile.level,
+        })
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -1319,6 +1191,7 @@ def api_validate_day(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@usercache.invalidates_user_cache
 def add_skill(request):
     """
     ✅ Ajoute une compétence à l'utilisateur
@@ -1370,6 +1243,7 @@ def add_skill(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@usercache.invalidates_user_cache
 def add_category(request):
     """Ajouter une catégorie"""
     try:
@@ -1397,6 +1271,7 @@ def add_category(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@usercache.invalidates_user_cache
 def add_domain(request):
     """Ajouter un domaine"""
     try:
@@ -1474,43 +1349,29 @@ def get_domain_progress(request, domain):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_leaderboard(request):
-    """✅ Récupère le classement global AVEC les photos ET les HP (OPTIMISÉ)"""
+    """✅ Récupère le classement global AVEC les photos ET les HP (classement matérialisé)"""
     try:
-        # ✅ OPTIMISATION : Utiliser select_related et prefetch_related pour éviter N+1
-        leaderboard = UserProfile.objects.select_related('user').all().order_by('-experience_points')[:50]
-        
+        # ✅ OPTIMISATION : une seule lecture indexée, HP déjà agrégés dans LeaderboardEntry
         data = []
 
-        for idx, profile in enumerate(leaderboard, 1):
+        for idx, entry in enumerate(leaderboard.top_entries(50), 1):
             profile_image_url = None
-            if profile.profile_image:
+            if entry.profile.profile_image:
                 try:
-                    profile_image_url = request.build_absolute_uri(profile.profile_image.url)
+                    profile_image_url = request.build_absolute_uri(entry.profile.profile_image.url)
                 except Exception as e:
-                    print(f'⚠️ Erreur image pour {profile.user.username}: {e}')
+                    print(f'⚠️ Erreur image pour {entry.user.username}: {e}')
                     profile_image_url = None
 
-            # ✅ CALCULER LES HP DEPUIS LES TRAITS (déjà chargés en mémoire)
-            total_hp = 0
-            try:
-                traits = UserPersonalityTrait.objects.filter(user=profile.user)
-                for trait in traits:
-                    # Vérifier que l'attribut hp existe et n'est pas None
-                    if hasattr(trait, 'hp') and trait.hp is not None:
-                        total_hp += int(trait.hp)
-            except Exception as e:
-                print(f'⚠️ Erreur HP pour {profile.user.username}: {e}')
-                total_hp = 0
-
             data.append({
                 'rank': idx,
-                'username': profile.user.username,
-                'user_id': profile.user.id,
-                'level': profile.level,
-                'experience_points': profile.experience_points,
-                'total_points': profile.total_points,
-                'total_hp': total_hp,  # ✅ HP totaux
-                'badges_count': profile.badges_count,
+                'username': entry.user.username,
+                'user_id': entry.user_id,
+                'level': entry.level,
+                'experience_points': entry.experience_points,
+                'total_points': entry.total_points,
+                'total_hp': entry.total_hp,  # ✅ HP totaux
+                'badges_count': entry.badges_count,
                 'profile_image_url': profile_image_url
             })
 
@@ -1523,51 +1384,36 @@ def get_leaderboard(request):
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-@api_view(['GET'])
-@permission_classes([AllowAny])
-def get_leaderboard_weekly(request):
-    """✅ Récupère le classement hebdomadaire AVEC HP"""
-    try:
-        one_week_ago = timezone.now() - timedelta(days=7)
-        weekly_data = []
-
-        profiles = UserProfile.objects.select_related('user').all()
-
-        for profile in profiles:
-            weekly_points = Action.objects.filter(
-                user=profile.user,
-                created_at__gte=one_week_ago
-            ).aggregate(Sum('points'))['points__sum'] or 0
-
-            profile_image_url = None
-            if profile.profile_image:
-                try:
-                    profile_image_url = request.build_absolute_uri(profile.profile_image.url)
-                except Exception:
-                    profile_image_url = None
+def _window_leaderboard(request, days, points_key):
+    """Construit le classement d'une fenêtre glissante de N jours (compteurs journaliers)"""
+    result = []
 
-            # ✅ CALCULER LES HP DEPUIS LES TRAITS
-            total_hp = 0
+    for idx, (entry, points) in enumerate(leaderboard.window_ranking(days, 50), 1):
+        profile_image_url = None
+        if entry.profile.profile_image:
             try:
-                traits = UserPersonalityTrait.objects.filter(user=profile.user)
-                for trait in traits:
-                    if hasattr(trait, 'hp') and trait.hp is not None:
-                        total_hp += int(trait.hp)
+                profile_image_url = request.build_absolute_uri(entry.profile.profile_image.url)
             except Exception:
-                total_hp = 0
+                profile_image_url = None
+
+        result.append({
+            'rank': idx,
+            'user_id': entry.user_id,
+            'username': entry.user.username,
+            points_key: points,
+            'total_hp': entry.total_hp,
+            'profile_image_url': profile_image_url
+        })
 
-            weekly_data.append({
-                'user_id': profile.user.id,
-                'username': profile.user.username,
-                'weekly_points': weekly_points,
-                'total_hp': total_hp,
-                'profile_image_url': profile_image_url
-            })
+    return result
 
-        weekly_data.sort(key=lambda x: x['weekly_points'], reverse=True)
-        result = [{'rank': idx, **u} for idx, u in enumerate(weekly_data[:50], 1)]
 
-        return Response(result)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_leaderboard_weekly(request):
+    """✅ Récupère le classement hebdomadaire AVEC HP"""
+    try:
+        return Response(_window_leaderboard(request, 7, 'weekly_points'))
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -1580,50 +1426,31 @@ def get_leaderboard_weekly(request):
 def get_leaderboard_monthly(request):
     """✅ Récupère le classement mensuel AVEC HP"""
     try:
-        one_month_ago = timezone.now() - timedelta(days=30)
-        monthly_data = []
-
-        profiles = UserProfile.objects.select_related('user').all()
-
-        for profile in profiles:
-            monthly_points = Action.objects.filter(
-                user=profile.user,
-                created_at__gte=one_month_ago
-            ).aggregate(Sum('points'))['points__sum'] or 0
-
-            profile_image_url = None
-            if profile.profile_image:
-                try:
-                    profile_image_url = request.build_absolute_uri(profile.profile_image.url)
-                except Exception:
-                    profile_image_url = None
-
-            # ✅ CALCULER LES HP DEPUIS LES TRAITS
-            total_hp = 0
-            try:
-                traits = UserPersonalityTrait.objects.filter(user=profile.user)
-                for trait in traits:
-                    if hasattr(trait, 'hp') and trait.hp is not None:
-                        total_hp += int(trait.hp)
-            except Exception:
-                total_hp = 0
+        return Response(_window_leaderboard(request, 30, 'monthly_points'))
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        print(f'❌ ERREUR LEADERBOARD MONTHLY: {str(e)}')
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-            monthly_data.append({
-                'user_id': profile.user.id,
-                'username': profile.user.username,
-                'monthly_points': monthly_points,
-                'total_hp': total_hp,
-                'profile_image_url': profile_image_url
-            })
 
-        monthly_data.sort(key=lambda x: x['monthly_points'], reverse=True)
-        result = [{'rank': idx, **u} for idx, u in enumerate(monthly_data[:50], 1)]
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_leaderboard_window(request):
+    """✅ Classement sur une fenêtre personnalisée : ?days=N (1-365)"""
+    try:
+        days = int(request.GET.get('days', 7))
+    except ValueError:
+        return Response({'error': 'days doit être un entier'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= days <= 365:
+        return Response({'error': 'days doit être entre 1 et 365'}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(result)
+    try:
+        return Response(_window_leaderboard(request, days, 'points'))
     except Exception as e:
         import traceback
         traceback.print_exc()
-        print(f'❌ ERREUR LEADERBOARD MONTHLY: {str(e)}')
+        print(f'❌ ERREUR LEADERBOARD WINDOW: {str(e)}')
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
@@ -1631,42 +1458,35 @@ def get_leaderboard_monthly(request):
 @permission_classes([AllowAny])
 def get_leaderboard_simple(request):
     """Récupère le top 10 du classement AVEC HP"""
-    leaderboard = UserProfile.objects.all().order_by('-experience_points')[:10]
     data = []
-    
-    for p in leaderboard:
-        # Calculer les HP
-        total_hp = sum([trait.hp for trait in UserPersonalityTrait.objects.filter(user=p.user)])
+
+    for entry in leaderboard.top_entries(10):
         data.append({
-            'username': p.user.username,
-            'level': p.level,
-            'points': p.experience_points,
-            'total_hp': total_hp
+            'username': entry.user.username,
+            'level': entry.level,
+            'points': entry.experience_points,
+            'total_hp': entry.total_hp
         })
-    
+
     return Response(data)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_user_rank(request):
-    """Récupère le rang de l'utilisateur"""
-    try:
-        profile = UserProfile.objects.get(user=request.user)
-        total_users = UserProfile.objects.count()
-        rank = UserProfile.objects.filter(experience_points__gt=profile.experience_points).count() + 1
-        percentile = ((total_users - rank) / total_users * 100) if total_users > 0 else 0
+    """Récupère le rang de l'utilisateur (?approximate=1 pour le mode approché)"""
+    approximate = request.GET.get('approximate')
+    if approximate is not None:
+        approximate = approximate.lower() in ('1', 'true', 'yes')
 
-        data = {
-            'rank': rank,
-            'total_users': total_users,
-            'percentile': percentile,
-            'experience_points': profile.experience_points
-        }
+    return Response(leaderboard.user_rank(request.user, approximate=approximate))
 
-        return Response(data)
-    except UserProfile.DoesNotExist:
-        return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_ai_cache_stats(request):
+    """Compteurs hits / misses du cache des évaluations IA"""
+    return Response(ai.cache_stats())
 
 
 # ==================== API ENDPOINTS - ACHIEVEMENTS ====================
@@ -1693,6 +1513,7 @@ def get_active_challenges(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@usercache.invalidates_user_cache
 def complete_challenge(request, challenge_id):
     """Complète un défi"""
     try:
@@ -1721,6 +1542,7 @@ def get_study_sessions(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@usercache.invalidates_user_cache
 def create_study_session(request):
     """Crée une session d'étude"""
     serializer = StudySessionSerializer(data=request.data)
@@ -1734,14 +1556,12 @@ def create_study_session(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@usercache.cached_per_user
 def get_dashboard_stats(request):
     """Récupère les stats du dashboard"""
     try:
         profile = UserProfile.objects.get(user=request.user)
-        active_challenges = UserChallenge.objects.filter(user=request.user, status='active')
-        completed_challenges = UserChallenge.objects.filter(user=request.user, status='completed')
-        study_sessions = StudySession.objects.filter(user=request.user)
-        total_study_time = study_sessions.aggregate(Sum('duration_minutes'))['duration_minutes__sum'] or 0
+        summary = summaries.get_summary(request.user.id)
         recent_achievements = UserAchievement.objects.filter(user=request.user)[:5]
         top_skills = UserSkill.objects.filter(user=request.user).order_by('-experience')[:3]
 
@@ -1750,10 +1570,10 @@ def get_dashboard_stats(request):
             'experience_points': profile.experience_points,
             'total_points': profile.total_points,
             'badges_count': profile.badges_count,
-            'active_challenges_count': active_challenges.count(),
-            'completed_challenges_count': completed_challenges.count(),
-            'study_sessions_count': study_sessions.count(),
-            'total_study_time_minutes': total_study_time,
+            'active_challenges_count': summary.active_challenges,
+            'completed_challenges_count': summary.completed_challenges,
+            'study_sessions_count': summary.study_sessions_count,
+            'total_study_time_minutes': summary.study_minutes,
             'recent_achievements': [a.achievement.name for a in recent_achievements],
             'top_skills': [s.skill.name for s in top_skills]
         }
@@ -1763,53 +1583,100 @@ def get_dashboard_stats(request):
         return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
 
 
-# ==================== API ENDPOINTS - RESOURCES ====================
-
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+def get_activity_heatmap(request):
+    """✅ Heatmap d'activité jour par jour : ?year=AAAA, sinon les 365 derniers jours"""
+    today = timezone.localdate()
+    year = request.GET.get('year')
+    if year:
+        try:
+            start = datetime(int(year), 1, 1).date()
+        except ValueError:
+            return Response({'error': 'year doit être une année valide'}, status=status.HTTP_400_BAD_REQUEST)
+        end = start.replace(month=12, day=31)
+    else:
+        start, end = today - timedelta(days=364), today
+
+    return Response({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'days': rollups.daily(request.user.id, start, end),
+    })
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+def get_activity_series(request):
+    """✅ Série d'activité : ?period=day|week|month&start=AAAA-MM-JJ&end=AAAA-MM-JJ
+
+    Par défaut : jusqu'à aujourd'hui, 30 jours pour 'day', un an pour 'week' / 'month'.
+    """
+    period = request.GET.get('period', 'day')
+    if period != 'day' and period not in rollups.PERIODS:
+        return Response({'error': 'period doit valoir day, week ou month'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        end = datetime.strptime(request.GET['end'], '%Y-%m-%d').date() if request.GET.get('end') else timezone.localdate()
+        if request.GET.get('start'):
+            start = datetime.strptime(request.GET['start'], '%Y-%m-%d').date()
+        else:
+            start = end - timedelta(days=29 if period == 'day' else 364)
+    except ValueError:
+        return Response({'error': 'start / end doivent être au format AAAA-MM-JJ'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if start > end:
+        return Response({'error': 'start doit précéder end'}, status=status.HTTP_400_BAD_REQUEST)
+    if (end - start).days >= rollups.MAX_SERIES_DAYS:
+        return Response({'error': f'Plage limitée à {rollups.MAX_SERIES_DAYS} jours'}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'period': period,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'series': rollups.series(request.user.id, start, end, period),
+    })
+
+
+# ==================== API ENDPOINTS - RESOURCES ====================
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])  # ✅ CORRIGÉ : Authentification obligatoire
 def api_get_all_resources(request):
-    """✅ CORRIGÉ : Récupère TOUTES les ressources actives avec le niveau utilisateur
-    et les ressources cochées."""
+    """✅ Une page des ressources actives avec le niveau utilisateur et l'état coché
+
+    Paramètres : type, domaine, galaxy, unlocked, checked (filtres), limit et cursor
+    (pagination par (niveau, id) : passer `next_cursor` pour la page suivante).
+    """
     try:
         # ✅ Récupérer le profil utilisateur
         profile, _ = UserProfile.objects.get_or_create(user=request.user)
         user_level = profile.level
-        
-        # ✅ Récupérer toutes les ressources actives
-        resources = Resource.objects.filter(is_active=True).order_by('niveau')
-        
-        # ✅ Récupérer les ressources cochées par l'utilisateur
-        checked_resources = CheckedResource.objects.filter(user=request.user).values_list('resource_id', flat=True)
-        checked_list = list(checked_resources)
+
+        try:
+            rows, next_cursor = resources.page(
+                resources.filtered(request.user, user_level, request.GET),
+                request.GET.get('cursor'),
+                pagination.page_size(request),
+            )
+        except pagination.InvalidCursor:
+            return Response({'success': False, 'error': 'Curseur invalide'}, status=400)
+        except ValueError as e:
+            return Response({'success': False, 'error': str(e)}, status=400)
 
         # ✅ Formatter les ressources
-        data = [
-            {
-                'id': r.id,
-                'titre': r.titre,
-                'auteur': r.auteur,
-                'type': r.type,
-                'domaine': r.domaine,
-                'description': r.description,
-                'niveau': r.niveau,
-                'url': r.url,
-                'image': r.image,
-                'is_unlocked': r.niveau <= user_level  # ✅ Info si débloqué
-            }
-            for r in resources
-        ]
+        data = [{**row, 'is_unlocked': row['niveau'] <= user_level} for row in rows]
+        counts = resources.counts(user_level)
 
         return Response({
             'success': True,
             'resources': data,
             'user_level': user_level,  # ✅ CORRIGÉ : Niveau utilisateur inclus
-            'checked_resources': checked_list,  # ✅ CORRIGÉ : Ressources cochées
-            'total_resources': len(data)
+            'checked_resources': [row['id'] for row in rows if row['is_checked']],  # cochées de la page
+            'total_resources': counts['total'],
+            'unlocked_resources': counts['unlocked'],
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
         })
     except Exception as e:
         import traceback
@@ -1894,6 +1761,7 @@ def api_search_resources(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@usercache.invalidates_user_cache
 def remove_skill(request):
     """✅ Supprime une compétence de l'utilisateur"""
     try:
@@ -1944,6 +1812,7 @@ def remove_skill(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@usercache.invalidates_user_cache
 def remove_category(request):
     """✅ Supprime une catégorie découverte"""
     try:
@@ -1989,6 +1858,7 @@ def remove_category(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@usercache.invalidates_user_cache
 def remove_domain(request):
     """✅ Supprime un domaine exploré"""
     try:
@@ -2156,40 +2026,32 @@ def delete_study_section(request, section_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def api_get_resources(request):
-    """Récupère toutes les ressources accessibles avec les cases cochées"""
+    """Récupère une page des ressources (mêmes filtres et pagination que api_get_all_resources)"""
     try:
         profile, _ = UserProfile.objects.get_or_create(user=request.user)
         user_level = profile.level
-        
-        # Récupérer toutes les ressources actives
-        all_resources = Resource.objects.filter(is_active=True).order_by('niveau')
-        
-        # Récupérer les ressources cochées par l'utilisateur
-        checked_resources = CheckedResource.objects.filter(user=request.user).values_list('resource_id', flat=True)
-        checked_list = list(checked_resources)
-        
-        # Formatter les ressources
-        resources_list = []
-        for resource in all_resources:
-            resources_list.append({
-                'id': resource.id,
-                'titre': resource.titre,
-                'auteur': resource.auteur,
-                'type': resource.type,
-                'domaine': resource.domaine,
-                'description': resource.description,
-                'niveau': resource.niveau,
-                'url': resource.url,
-                'image': resource.image,
-            })
-        
+
+        try:
+            rows, next_cursor = resources.page(
+                resources.filtered(request.user, user_level, request.GET),
+                request.GET.get('cursor'),
+                pagination.page_size(request),
+            )
+        except pagination.InvalidCursor:
+            return Response({'success': False, 'error': 'Curseur invalide'}, status=400)
+        except ValueError as e:
+            return Response({'success': False, 'error': str(e)}, status=400)
+
         return Response({
             'success': True,
-            'resources': resources_list,
+            'resources': rows,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
+            'counts': resources.counts(user_level),
             'user': {
                 'name': request.user.get_full_name() or request.user.username,
                 'level': user_level,
-                'checked_resources': checked_list  
+                'checked_resources': [row['id'] for row in rows if row['is_checked']]
             }
         })
     except Exception as e:
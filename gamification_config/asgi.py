@@ -1,5 +1,11 @@
 """
 ASGI config for gamification_config project.
+
+Point d'entrée pour les réponses en streaming (api/evaluate-activity/stream/, Server-Sent
+Events) : chaque événement est envoyé dès qu'il est produit, sans occuper un worker par
+connexion. À servir avec un serveur ASGI, par exemple :
+
+    uvicorn gamification_config.asgi:application
 """
 
 import os
@@ -0,0 +1,12 @@
+"""
+Celery config for gamification_config project.
+"""
+
+import os
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gamification_config.settings')
+
+app = Celery('gamification_config')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -1,4 +1,5 @@
 import os
+from corsheaders.defaults import default_headers
 import dj_database_url
 import math
 from pathlib import Path
@@ -181,6 +182,7 @@ CORS_ALLOWED_ORIGINS = config(
 )
 
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 # ✅ CHANGE 3: added PythonAnywhere to CSRF trusted origins
 CSRF_TRUSTED_ORIGINS = [
@@ -263,12 +265,47 @@ if not DEBUG:
     # use django-csp package if needed
 
 # Cache configuration
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'gamification-cache',
+# LocMemCache est propre à chaque process : avec plusieurs workers, définir REDIS_URL
+# pour que l'invalidation du cache par utilisateur soit partagée.
+REDIS_URL = config('REDIS_URL', default='')
+
+# Alias 'ai' : résultats d'évaluation IA adressés par contenu (TTL + éviction LRU ;
+# avec Redis, l'éviction suit maxmemory-policy, à régler sur allkeys-lru).
+AI_RESULT_CACHE_TTL = config('AI_RESULT_CACHE_TTL', default=7 * 24 * 3600, cast=int)
+AI_RESULT_CACHE_MAX_ENTRIES = config('AI_RESULT_CACHE_MAX_ENTRIES', default=10000, cast=int)
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+        'ai': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'ai',
+            'TIMEOUT': AI_RESULT_CACHE_TTL,
+        },
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'gamification-cache',
+        },
+        'ai': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'gamification-ai-cache',
+            'TIMEOUT': AI_RESULT_CACHE_TTL,
+            'OPTIONS': {'MAX_ENTRIES': AI_RESULT_CACHE_MAX_ENTRIES},
+        },
+    }
+
+# Cache des lectures par utilisateur (invalidé par version, TTL de sécurité)
+USER_CACHE_TIMEOUT = config('USER_CACHE_TIMEOUT', default=300, cast=int)
+
+# Durée de conservation des réponses rejouables (en-tête Idempotency-Key)
+IDEMPOTENCY_TTL = config('IDEMPOTENCY_TTL', default=24 * 3600, cast=int)
 
 # Email configuration
 EMAIL_BACKEND = config(
@@ -371,6 +408,7 @@ GAMIFICATION_SETTINGS = {
     'MAX_LEVEL': 1000,
     'TOTAL_GALAXIES': 10,
     'LEVELS_PER_GALAXY': 100,
+    'XP_CURVE_VERSION': int(os.getenv('XP_CURVE_VERSION', '1')),
 }
 
 # ====== STUDY TRACKER SETTINGS ======
@@ -489,6 +527,12 @@ PAGINATION_SETTINGS = {
     'MAX_PAGE_SIZE': 100,
 }
 
+# ====== RANK ======
+RANK_SETTINGS = {
+    # Au-delà de ce nombre de joueurs, le rang est interpolé dans le niveau (pas de comptage)
+    'APPROXIMATE_ABOVE_USERS': int(os.getenv('RANK_APPROXIMATE_ABOVE_USERS', 100000)),
+}
+
 # ====== API SETTINGS ======
 API_SETTINGS = {
     'THROTTLE_ENABLED': True,
@@ -510,3 +554,44 @@ cloudinary.config(
 )
 
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+
+# ====== AI EVALUATION ======
+AI_SETTINGS = {
+    'API_URL': os.getenv('PERPLEXITY_API_URL', 'https://api.perplexity.ai/chat/completions'),
+    'MODEL': os.getenv('PERPLEXITY_MODEL', 'sonar'),
+    'TIMEOUT': int(os.getenv('AI_TIMEOUT', 30)),
+    'CONNECT_TIMEOUT': int(os.getenv('AI_CONNECT_TIMEOUT', 5)),
+    # Client HTTP : connexions keep-alive, tentatives avec backoff + jitter (erreurs de connexion,
+    # 429 / 5xx ; jamais après un délai de lecture dépassé), disjoncteur
+    'POOL_SIZE': int(os.getenv('AI_POOL_SIZE', 10)),
+    'MAX_RETRIES': int(os.getenv('AI_MAX_RETRIES', 2)),
+    'BACKOFF_BASE': float(os.getenv('AI_BACKOFF_BASE', 0.5)),
+    'BACKOFF_MAX': float(os.getenv('AI_BACKOFF_MAX', 8)),
+    'BREAKER_THRESHOLD': int(os.getenv('AI_BREAKER_THRESHOLD', 5)),
+    'BREAKER_COOLDOWN': int(os.getenv('AI_BREAKER_COOLDOWN', 30)),
+    # Appels simultanés au fournisseur par process ; au-delà d'ADMISSION_WAIT s d'attente : 503 + Retry-After
+    'MAX_CONCURRENCY': int(os.getenv('AI_MAX_CONCURRENCY', 8)),
+    'ADMISSION_WAIT': float(os.getenv('AI_ADMISSION_WAIT', 0.5)),
+    'OVERLOAD_RETRY_AFTER': int(os.getenv('AI_OVERLOAD_RETRY_AFTER', 5)),
+    # Quota par utilisateur (seau à jetons dans le cache) : rechargement et capacité ; au-delà : 429
+    'USER_QUOTA_RATE': os.getenv('AI_USER_QUOTA_RATE', '60/hour'),
+    'USER_QUOTA_BURST': int(os.getenv('AI_USER_QUOTA_BURST', 10)),
+    # 'celery' (workers séparés), 'thread' (pool dans le process web) ou 'eager' (synchrone, tests).
+    # L'état des jobs est dans le cache par défaut : sans REDIS_URL (LocMemCache, propre à chaque
+    # process), un suivi servi par un autre worker ne trouverait pas le job, d'où 'eager' par défaut.
+    # 'thread' sans REDIS_URL n'est sûr qu'avec un seul worker.
+    'JOB_BACKEND': os.getenv('AI_JOB_BACKEND', 'celery' if REDIS_URL else 'eager'),
+    'JOB_THREADS': int(os.getenv('AI_JOB_THREADS', 4)),
+    'JOB_TTL': int(os.getenv('AI_JOB_TTL', 3600)),
+    # Nombre maximal de descriptions évaluées en un seul appel (api/evaluate-activity/batch/)
+    'BATCH_MAX_ITEMS': int(os.getenv('AI_BATCH_MAX_ITEMS', 10)),
+    # Confiance minimale du pré-score par mots-clés pour se passer du modèle (> 1 : désactivé)
+    'PRESCORE_THRESHOLD': float(os.getenv('AI_PRESCORE_THRESHOLD', 0.75)),
+    # Fichier .jsonl.gz où enregistrer les échanges avec le fournisseur (rejeu : manage.py benchmark_ai)
+    'RECORD_CASSETTE': os.getenv('AI_RECORD_CASSETTE'),
+}
+
+# ====== CELERY ======
+CELERY_BROKER_URL = REDIS_URL or 'memory://'
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TIMEZONE = TIME_ZONE
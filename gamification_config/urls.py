@@ -22,7 +22,8 @@ urlpatterns = [
 
     # ====== API ENDPOINTS - RESOURCES (AU NIVEAU RACINE) ======
     path('api/resources/', gamification_views.api_get_resources, name='api_get_resources'),
-    path('api/resources/<str:res_type>/', gamification_views.api_get_resources_by_type, name='api_get_resources_by_type'),
+    path('api/resources/all/', gamification_views.api_get_all_resources, name='api_get_all_resources'),
+    path('api/resources/<str:resource_type>/', gamification_views.api_get_resources_by_type, name='api_get_resources_by_type'),
     path('api/search/', gamification_views.api_search_resources, name='api_search_resources'),
     path('api/get-user-data/', gamification_views.api_get_user_data, name='api_get_user_data'),
     path('api/save-data/', gamification_views.api_save_challenge_data, name='api_save_challenge_data'),
@@ -9,6 +9,7 @@ from django.db.models import Avg, Q, F
 from django.utils import timezone
 from datetime import timedelta
 from django.contrib.auth.models import User
+from gamification import leveling
 
 
 # ====== CLASS BASED VIEWS ======
@@ -519,25 +520,17 @@ def get_dashboard_stats(request):
             StudySession.objects.filter(user=request.user).values_list('duration', flat=True)
         ) or 0
 
-        def calculate_level(xp):
-            level = 1
-            required_xp = 100
-            current_xp = xp
-            while current_xp >= required_xp:
-                current_xp -= required_xp
-                level += 1
-                required_xp = level * (level + 1) * 50
-            return level, current_xp, required_xp
-
-        level, current_xp, required_xp = calculate_level(user_profile.total_xp)
+        progress = leveling.level_progress(user_profile.total_xp)
 
         return Response({
             'status': 'success',
             'data': {
                 'total_xp': user_profile.total_xp,
-                'level': level,
-                'current_xp': current_xp,
-                'xp_to_next_level': required_xp,
+                'level': progress['level'],
+                'current_xp': progress['xp_in_level'],
+                # Coût total du niveau suivant (sens historique) ; XP qu'il reste à gagner à part
+                'xp_to_next_level': progress['next_level_xp'] - progress['current_level_xp'],
+                'xp_remaining_to_next_level': progress['xp_to_next_level'],
                 'weekly_xp': user_profile.weekly_xp if user_profile.weekly_xp else 0,
                 'monthly_xp': user_profile.monthly_xp if user_profile.monthly_xp else 0,
                 'total_study_sessions': total_study_sessions,